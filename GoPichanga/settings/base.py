@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,6 +57,41 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'GoPichanga.wsgi.application'
 
+# ---------- Caché y sesiones ----------
+# Sesiones cached_db: se leen de la caché 'sessions' y se escriben también en la
+# BD, así el hot path no consulta django_session y no se pierden si la caché se
+# vacía. La caché de sesiones se elige por entorno:
+#   GP_SESSION_CACHE=locmem (default, un proceso) | file (varios procesos en un nodo)
+#   | redis / memcached (varios nodos; requieren su cliente instalado)
+#   GP_SESSION_CACHE_LOCATION=ruta, URL o host:puerto según el backend
+# Las sesiones vencidas se borran con `manage.py purge_sessions` (ver users).
+_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+_SESSION_CACHE = os.environ.get('GP_SESSION_CACHE', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': _CACHE_BACKENDS[_SESSION_CACHE],
+        'LOCATION': os.environ.get(
+            'GP_SESSION_CACHE_LOCATION',
+            str(BASE_DIR / '.cache' / 'sessions') if _SESSION_CACHE == 'file' else 'gp-sessions',
+        ),
+    },
+}
+if _SESSION_CACHE in ('locmem', 'file'):
+    # el default (300) descartaría sesiones activas; cached_db fija el TTL de cada una
+    CACHES['sessions']['OPTIONS'] = {'MAX_ENTRIES': 20000}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -83,4 +119,31 @@ USE_I18N = True
 
 USE_TZ = True
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Reportes del partner: leer los acumulados diarios de applications.reporting en
+# lugar de recorrer las reservas. Activar después de `manage.py rebuild_rollups`.
+GP_REPORTING_ROLLUPS = False
+
+# Procesos que generan las versiones de las imágenes del álbum (0 = en línea,
+# dentro del request; útil en tests y desarrollo).
+GP_IMAGE_WORKERS = 2
+
+# Segundos que el usuario de la sesión se guarda en la caché por defecto
+# (users.utils.get_session_user). 0 = sin caché: una consulta por request.
+GP_USER_CACHE_TTL = 0
+
+# Pasarela de pagos (applications.payments.gateways). Por defecto el simulador en
+# proceso; OPTIONS se pasan al constructor (latency_ms, failure_rate, decline_rate,
+# max_connections). TIMEOUT acota cada cobro en segundos.
+GP_PAYMENT_GATEWAY = {
+    'BACKEND': 'applications.payments.gateways.SimulatedGateway',
+    'TIMEOUT': 5.0,
+    'OPTIONS': {'latency_ms': (50, 200), 'failure_rate': 0.0, 'max_connections': 8},
+}
+# Segundos que un pago puede quedar PENDING (timeout sin reintento, caída) antes
+# de darlo por vencido y liberar el horario (`manage.py expire_pending_payments`).
+GP_PAYMENT_PENDING_TTL = 15 * 60
+
+# Segundos que vale la cotización firmada del checkout (applications.booking.quotes).
+GP_QUOTE_TTL = 15 * 60
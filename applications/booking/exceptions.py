@@ -6,5 +6,22 @@ class SlotNotAvailable(BookingError):
     """The field is not free for the requested time slot."""
 
 
+class FieldClosed(SlotNotAvailable):
+    """The field does not open during the requested time slot."""
+
+
 class ExtraOutOfStock(BookingError):
     """Requested quantity exceeds available stock for an extra."""
+
+
+class QuoteInvalid(BookingError):
+    """The quote token is corrupt, forged or belongs to another field."""
+
+
+class QuoteExpired(QuoteInvalid):
+    """The quote is too old or the field prices changed since it was issued."""
+
+    def __init__(self, message, quote=None):
+        super().__init__(message)
+        # la cotización vencida (si se pudo leer) para volver a cotizar lo mismo
+        self.quote = quote
@@ -1,13 +1,13 @@
 from dataclasses import dataclass
-from decimal import Decimal
-from datetime import timedelta
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
 from .models import Booking, BookingExtra, BookingStatus
-from .exceptions import BookingError, SlotNotAvailable, ExtraOutOfStock
-from .services import field_is_free, equipment_available_qty, compute_total
+from .exceptions import BookingError, SlotNotAvailable, ExtraOutOfStock, FieldClosed, QuoteExpired
+from .quotes import Quote, build_quote
+from .services import field_is_free, equipment_availability, lock_field
 from applications.field.models import Field, FieldEquipment
+from applications.scheduling.services import is_open
 from applications.users.models import User
 
 @dataclass(frozen=True)
@@ -17,7 +17,13 @@ class ExtraRequest:
 
 class BookingFactory:
     @staticmethod
-    def create(*, user: User, field: Field, start, end, extras: list[ExtraRequest]) -> Booking:
+    def create(*, user: User, field: Field, start=None, end=None, extras: list[ExtraRequest] = (),
+               status: str = BookingStatus.PENDING, quote: Quote | None = None) -> Booking:
+        # Con una cotización (checkout) el horario, los extras y los precios son
+        # los de ella; solo se comprueba que siga vigente bajo el lock.
+        if quote is not None:
+            start, end = quote.start, quote.end
+            extras = [ExtraRequest(fe_id=line.fe_id, quantity=line.quantity) for line in quote.lines]
         if start >= end:
             raise BookingError("La hora fin debe ser posterior a la hora inicio.")
 
@@ -27,54 +33,70 @@ class BookingFactory:
         if timezone.is_naive(end):
             end = timezone.make_aware(end, timezone.get_current_timezone())
 
-        # 1) Campo libre
+        # 0) Horario de atención (calendario materializado, sin tocar Booking)
+        if not is_open(field, start, end):
+            raise FieldClosed("La cancha no atiende en ese horario.")
+
+        # 1) Campo libre (índice en memoria: descarta rápido los choques evidentes)
         if not field_is_free(field, start, end):
             raise SlotNotAvailable("El campo ya está reservado en ese horario.")
 
-        # 2) Carga los extras solicitados (solo los ids pedidos y del mismo field)
-        ids = [e.fe_id for e in extras if e.quantity and e.quantity > 0]
-        fe_map = {fe.id: fe for fe in FieldEquipment.objects.filter(field=field, id__in=ids).select_related('equipment')}
+        # 2) Persistencia atómica, serializada por cancha: solo una escritura a la
+        #    vez pasa de aquí para el mismo field; el resto espera el lock y luego
+        #    ve la reserva ganadora en la re-validación estricta.
+        with transaction.atomic():
+            field = lock_field(field.pk)
+            if quote is not None and quote.pricing_version != field.pricing_version:
+                raise QuoteExpired("Los precios de la cancha cambiaron; revisa el total actualizado.", quote=quote)
+            if not field_is_free(field, start, end, strict=True):
+                raise SlotNotAvailable("El campo ya está reservado en ese horario.")
 
-        # 3) Validación de stock por cada extra
-        extra_payload = []
-        for req in extras:
-            if req.quantity <= 0:
-                continue
-            fe = fe_map.get(req.fe_id)
-            if not fe:
-                raise BookingError("Extra inválido para esta cancha.")
-            available = equipment_available_qty(fe, start, end)
-            if req.quantity > available:
-                raise ExtraOutOfStock(
-                    f"No hay suficiente stock de {fe.equipment.get_type_display()} (disponible {available})."
-                )
-            extra_payload.append({
-                "fe": fe,
-                "quantity": req.quantity,
-                "unit_price": fe.price_per_unit,
-            })
+            # 3) Carga los extras solicitados (solo los ids pedidos y del mismo field)
+            ids = [e.fe_id for e in extras if e.quantity and e.quantity > 0]
+            fe_map = {fe.id: fe for fe in FieldEquipment.objects.filter(field=field, id__in=ids).select_related('equipment')}
 
-        # 4) Total
-        hours = Decimal((end - start) / timedelta(hours=1))
-        total = compute_total(field.price_hour, hours, [
-            {"quantity": e["quantity"], "unit_price": e["unit_price"]} for e in extra_payload
-        ])
+            # 4) Validación de stock por cada extra (una sola consulta para todos)
+            available_by_fe = equipment_availability(fe_map.values(), start, end)
+            extra_payload = []
+            for req in extras:
+                if req.quantity <= 0:
+                    continue
+                fe = fe_map.get(req.fe_id)
+                if not fe:
+                    raise BookingError("Extra inválido para esta cancha.")
+                available = available_by_fe[fe.id]
+                if req.quantity > available:
+                    raise ExtraOutOfStock(
+                        f"No hay suficiente stock de {fe.equipment.get_type_display()} (disponible {available})."
+                    )
+                extra_payload.append((fe, req.quantity))
 
-        # 5) Persistencia atómica
-        with transaction.atomic():
-            booking = Booking.objects.create(
-                user=user,
-                field=field,
-                start=start,
-                end=end,
-                status=BookingStatus.PENDING,
-                total_amount=total,
-            )
-            for e in extra_payload:
-                BookingExtra.objects.create(
+            # 5) Total: el de la cotización o uno nuevo con los precios actuales
+            if quote is None:
+                quote = build_quote(field, start, end, extra_payload)
+            total = quote.total
+
+            # 6) Inserción. En PostgreSQL la restricción de exclusión es la última
+            #    barrera: si salta, es el mismo caso que un solape.
+            try:
+                with transaction.atomic():
+                    booking = Booking.objects.create(
+                        user=user,
+                        field=field,
+                        start=start,
+                        end=end,
+                        status=status,
+                        total_amount=total,
+                    )
+            except IntegrityError:
+                raise SlotNotAvailable("El campo ya está reservado en ese horario.")
+            BookingExtra.objects.bulk_create([
+                BookingExtra(
                     booking=booking,
-                    field_equipment=e["fe"],
-                    quantity=e["quantity"],
-                    unit_price=e["unit_price"],
+                    field_equipment_id=line.fe_id,
+                    quantity=line.quantity,
+                    unit_price=line.unit_price,
                 )
+                for line in quote.lines
+            ])
         return booking
@@ -0,0 +1,109 @@
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+from threading import Lock
+import time as _time
+
+from django.utils import timezone
+
+from .models import Booking, BookingStatus
+
+ACTIVE_STATUSES = [BookingStatus.PENDING, BookingStatus.CONFIRMED]
+
+# Segundos que una ventana cargada se considera fresca. Las invalidaciones por
+# señales solo llegan al proceso que guardó la reserva; el TTL acota lo que
+# otros workers pueden ver desactualizado (para escribir se usa el modo estricto).
+WINDOW_TTL = 60
+# Ventanas (cancha, día) que se guardan como máximo; se descarta la menos usada
+MAX_WINDOWS = 4096
+
+
+class DayIntervals:
+    """
+    Reservas activas de una cancha en un día local, ordenadas por inicio.
+    `max_ends[i]` es el mayor fin entre las i+1 primeras reservas, así el
+    solape se responde con un bisect aunque existan reservas encimadas.
+    """
+    __slots__ = ('starts', 'max_ends', 'loaded_at')
+
+    def __init__(self, intervals):
+        intervals = sorted(intervals)
+        self.starts = [s for s, _ in intervals]
+        self.max_ends = []
+        current = None
+        for _, e in intervals:
+            current = e if current is None or e > current else current
+            self.max_ends.append(current)
+        self.loaded_at = _time.monotonic()
+
+    def overlaps(self, start, end) -> bool:
+        # última reserva que empieza antes de `end`
+        i = bisect_left(self.starts, end) - 1
+        return i >= 0 and self.max_ends[i] > start
+
+
+class FieldIntervalIndex:
+    """
+    Índice en memoria de reservas PENDING/CONFIRMED por (cancha, día local).
+    Las ventanas se cargan bajo demanda (una consulta por día) y se invalidan
+    al guardar o eliminar una Booking de la cancha. Es un LRU acotado a
+    `max_windows`: los días pasados que nadie consulta van saliendo solos.
+    """
+
+    def __init__(self, ttl=WINDOW_TTL, max_windows=MAX_WINDOWS):
+        self.ttl = ttl
+        self.max_windows = max_windows
+        self._days = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _day_bounds(day):
+        tz = timezone.get_current_timezone()
+        d0 = timezone.make_aware(datetime.combine(day, time.min), tz)
+        return d0, d0 + timedelta(days=1)
+
+    def _load(self, field_id, day) -> DayIntervals:
+        d0, d1 = self._day_bounds(day)
+        rows = Booking.objects.filter(
+            field_id=field_id,
+            status__in=ACTIVE_STATUSES,
+            start__lt=d1,
+            end__gt=d0,
+        ).values_list('start', 'end')
+        return DayIntervals(rows)
+
+    def day(self, field_id, day) -> DayIntervals:
+        key = (field_id, day)
+        with self._lock:
+            entry = self._days.get(key)
+            if entry is not None:
+                self._days.move_to_end(key)
+        if entry is None or _time.monotonic() - entry.loaded_at > self.ttl:
+            entry = self._load(field_id, day)
+            with self._lock:
+                self._days[key] = entry
+                self._days.move_to_end(key)
+                while len(self._days) > self.max_windows:
+                    self._days.popitem(last=False)
+        return entry
+
+    def is_free(self, field_id, start, end) -> bool:
+        day = timezone.localtime(start).date()
+        last = timezone.localtime(end - timedelta(microseconds=1)).date()
+        while day <= last:
+            if self.day(field_id, day).overlaps(start, end):
+                return False
+            day += timedelta(days=1)
+        return True
+
+    def invalidate(self, field_id):
+        with self._lock:
+            for key in [k for k in self._days if k[0] == field_id]:
+                del self._days[key]
+
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+
+
+availability_index = FieldIntervalIndex()
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Solo PostgreSQL: impide a nivel de BD dos reservas activas solapadas en la misma
+# cancha. En SQLite la exclusión la garantiza el bloqueo de escritura de
+# booking.services.lock_field.
+CREATE_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE booking_booking
+    ADD CONSTRAINT booking_no_overlap_active
+    EXCLUDE USING gist (
+        field_id WITH =,
+        tstzrange("start", "end", '[)') WITH &&
+    ) WHERE (status IN ('pending', 'confirmed'))
+    """,
+]
+DROP_SQL = [
+    "ALTER TABLE booking_booking DROP CONSTRAINT IF EXISTS booking_no_overlap_active",
+]
+
+
+def _run(statements):
+    def op(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return op
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0002_booking_no_overlap'),
+        ('field', '0017_field_location'),
+        ('users', '0003_alter_partner_options_alter_regular_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-start', '-id'], name='booking_user_start_idx'),
+        ),
+    ]
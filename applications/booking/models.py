@@ -17,7 +17,18 @@ class Booking(models.Model):
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, validators=[MinValueValidator(0)])
 
     class Meta:
-        indexes = [models.Index(fields=['field','start','end','status'])]
+        indexes = [
+            models.Index(fields=['field','start','end','status']),
+            # historial del usuario (más recientes primero, keyset por start/id)
+            models.Index(fields=['user', '-start', '-id'], name='booking_user_start_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # cancha con la que se cargó: si la reserva se mueve hay que invalidar ambas
+        instance._loaded_field_id = instance.__dict__.get('field_id')
+        return instance
 
     def __str__(self):
         return f'Reserva {self.id} · {self.field.name} · {self.start:%Y-%m-%d %H:%M}'
@@ -0,0 +1,177 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from applications.field.models import FieldRate, pricing_committed
+
+from .exceptions import BookingError, QuoteExpired, QuoteInvalid
+from .rates import RateTable, compile_rates, from_cents, to_cents
+
+QUOTE_SALT = 'applications.booking.quote'
+CENT = Decimal('0.01')
+
+
+def money(value) -> Decimal:
+    """Redondeo a céntimos (half-up, como se cobra)."""
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _aware(dt):
+    return timezone.make_aware(dt, timezone.get_current_timezone()) if timezone.is_naive(dt) else dt
+
+
+@lru_cache(maxsize=512)
+def compiled_rates(field_id, pricing_version, terms) -> RateTable:
+    """
+    Tabla de la cancha para una versión de precios; se compila una vez por
+    proceso (una consulta a FieldRate) y la versión nueva la reemplaza sola.
+    """
+    price_hour, has_lights, surcharge, lights_from = terms
+    rates = [
+        (rate.weekday, *rate.minutes, rate.price_hour, rate.band)
+        for rate in FieldRate.objects.filter(field_id=field_id)
+    ]
+    return compile_rates(price_hour, rates,
+                         lights_surcharge=surcharge if has_lights else 0, lights_from=lights_from)
+
+
+def rate_table(field) -> RateTable:
+    """Tarifa compilada de la cancha (franjas + recargo por luces)."""
+    args = (field.pk, field.pricing_version, field.pricing_terms())
+    if not pricing_committed(field.pk, field.pricing_version):
+        # versión de una transacción en curso: puede revertirse, no se cachea
+        return compiled_rates.__wrapped__(*args)
+    return compiled_rates(*args)
+
+
+def base_amount(field, start, end) -> Decimal:
+    """Precio de la cancha en [start, end) según su tarifa, exacto a céntimos."""
+    return from_cents(rate_table(field).cents(start, end))
+
+
+@dataclass(frozen=True)
+class QuoteLine:
+    fe_id: int
+    label: str
+    quantity: int
+    unit_price: Decimal
+
+    @property
+    def subtotal(self) -> Decimal:
+        return self.unit_price * self.quantity
+
+
+@dataclass(frozen=True)
+class Quote:
+    """
+    Precio cerrado de una reserva: cancha, intervalo, extras con su precio
+    unitario y total. Se firma y viaja en el formulario del checkout, así el
+    POST no vuelve a calcular ni a leer los precios; `pricing_version` la
+    invalida si la cancha cambió de precios entre medio.
+    """
+    field_id: int
+    pricing_version: int
+    start: datetime
+    end: datetime
+    base: Decimal
+    lines: tuple = ()
+
+    @property
+    def extras_total(self) -> Decimal:
+        return sum((line.subtotal for line in self.lines), Decimal('0.00'))
+
+    @property
+    def total(self) -> Decimal:
+        return self.base + self.extras_total
+
+    def sign(self) -> str:
+        return signing.dumps({
+            'f': self.field_id,
+            'v': self.pricing_version,
+            's': self.start.isoformat(),
+            'e': self.end.isoformat(),
+            'b': str(self.base),
+            'x': [[l.fe_id, l.label, l.quantity, str(l.unit_price)] for l in self.lines],
+        }, salt=QUOTE_SALT, compress=True)
+
+    @classmethod
+    def from_payload(cls, data):
+        return cls(
+            field_id=data['f'],
+            pricing_version=data['v'],
+            start=datetime.fromisoformat(data['s']),
+            end=datetime.fromisoformat(data['e']),
+            base=Decimal(data['b']),
+            lines=tuple(QuoteLine(fe_id, label, qty, Decimal(price)) for fe_id, label, qty, price in data['x']),
+        )
+
+
+def build_quote(field, start, end, extras=()) -> Quote:
+    """
+    Cotiza `field` en [start, end) con `extras` = [(FieldEquipment, cantidad), ...].
+    Es el único cálculo de precios: lo usan el checkout y BookingFactory.
+    """
+    start, end = _aware(start), _aware(end)
+    if start >= end:
+        raise BookingError("La hora fin debe ser posterior a la hora inicio.")
+    lines = tuple(
+        QuoteLine(fe.id, fe.equipment.get_type_display(), qty, money(fe.price_per_unit))
+        for fe, qty in extras if qty > 0
+    )
+    return Quote(
+        field_id=field.pk,
+        pricing_version=field.pricing_version,
+        start=start,
+        end=end,
+        base=base_amount(field, start, end),
+        lines=lines,
+    )
+
+
+def quote_many(field, intervals, extras=()) -> list[Decimal]:
+    """
+    Totales de muchos intervalos candidatos [(start, end), ...] con la misma
+    canasta de extras, en una llamada: la tarifa se compila una vez y cada
+    intervalo cuesta dos lecturas de arreglo en céntimos enteros.
+    """
+    table = rate_table(field)
+    extras_cents = sum(to_cents(fe.price_per_unit) * qty for fe, qty in extras if qty > 0)
+    return [from_cents(c + extras_cents) for c in table.cents_many(intervals)]
+
+
+def load_quote(token, field, max_age=None) -> Quote:
+    """
+    Verifica la firma y vigencia de `token` para `field`. QuoteExpired si pasó
+    GP_QUOTE_TTL o cambió `field.pricing_version`; QuoteInvalid si no es válido.
+    """
+    max_age = settings.GP_QUOTE_TTL if max_age is None else max_age
+    try:
+        data = signing.loads(token or '', salt=QUOTE_SALT, max_age=max_age)
+    except signing.SignatureExpired:
+        raise QuoteExpired("La cotización venció; revisa el precio actualizado.",
+                           quote=_expired_quote(token))
+    except signing.BadSignature:
+        raise QuoteInvalid("La cotización no es válida.")
+
+    try:
+        quote = Quote.from_payload(data)
+    except (KeyError, TypeError, ValueError, ArithmeticError):
+        raise QuoteInvalid("La cotización no es válida.")
+    if quote.field_id != field.pk:
+        raise QuoteInvalid("La cotización no corresponde a esta cancha.")
+    if quote.pricing_version != field.pricing_version:
+        raise QuoteExpired("Los precios de la cancha cambiaron; revisa el total actualizado.", quote=quote)
+    return quote
+
+
+def _expired_quote(token):
+    """La cotización de un token con firma válida pero vencido (solo para volver a cotizar)."""
+    try:
+        return Quote.from_payload(signing.loads(token, salt=QUOTE_SALT))
+    except (signing.BadSignature, KeyError, TypeError, ValueError, ArithmeticError):
+        return None
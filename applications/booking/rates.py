@@ -0,0 +1,136 @@
+from array import array
+from bisect import bisect_right
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import accumulate
+
+from django.utils import timezone
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+_MINUTE = timedelta(minutes=1)
+BASE_BAND = 'Tarifa base'
+
+
+def to_cents(amount) -> int:
+    return int((Decimal(amount) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+def minute_of_week(dt) -> int:
+    """Minuto de la semana en hora local (lunes 00:00 = 0)."""
+    dt = timezone.localtime(dt) if timezone.is_aware(dt) else dt
+    return dt.weekday() * MINUTES_PER_DAY + dt.hour * 60 + dt.minute
+
+
+class RateTable:
+    """
+    Tarifa de una cancha compilada por minuto de la semana (hora local), en
+    céntimos por hora, guardada como sumas prefijas: el precio de cualquier
+    intervalo son dos lecturas del arreglo y una resta, sin importar cuántas
+    franjas cruce. Todo en enteros; se redondea a céntimos una sola vez.
+    """
+
+    def __init__(self, hourly_cents, bands=None, labels=(BASE_BAND,)):
+        if len(hourly_cents) != MINUTES_PER_WEEK:
+            raise ValueError("La tabla debe tener una tarifa por minuto de la semana.")
+        # prefix[m] = suma de las tarifas de los minutos [0, m)
+        self.prefix = array('q', accumulate(hourly_cents, initial=0))
+        # franjas (para repartir ingresos): solo los minutos donde cambia la franja
+        self.labels = tuple(labels)
+        self.cuts, self.cut_bands = array('l', [0]), array('l', [0])
+        if bands is not None:
+            self.cut_bands[0] = bands[0]
+            for m in range(1, MINUTES_PER_WEEK):
+                if bands[m] != bands[m - 1]:
+                    self.cuts.append(m)
+                    self.cut_bands.append(bands[m])
+
+    @classmethod
+    def flat(cls, price_hour):
+        return cls(array('q', [to_cents(price_hour)]) * MINUTES_PER_WEEK)
+
+    def _sum(self, m0, minutes):
+        """Suma de tarifas de `minutes` minutos desde el minuto de la semana m0 (da la vuelta)."""
+        prefix = self.prefix
+        weeks, rest = divmod(minutes, MINUTES_PER_WEEK)
+        total = weeks * prefix[MINUTES_PER_WEEK]
+        m1 = m0 + rest
+        if m1 <= MINUTES_PER_WEEK:
+            return total + prefix[m1] - prefix[m0]
+        return total + prefix[MINUTES_PER_WEEK] - prefix[m0] + prefix[m1 - MINUTES_PER_WEEK]
+
+    def cents(self, start, end) -> int:
+        """Precio en céntimos de [start, end) (minutos completos)."""
+        minutes = (end - start) // _MINUTE
+        # tarifa por hora sumada por minuto -> /60, redondeo half-up en enteros
+        return (self._sum(minute_of_week(start), minutes) + 30) // 60
+
+    def cents_many(self, intervals) -> list[int]:
+        """Precios en céntimos de muchos [(start, end), ...] en un solo pase."""
+        return [self.cents(s, e) for s, e in intervals]
+
+    def band_shares(self, start, end) -> dict:
+        """
+        {franja: suma de tarifas} de [start, end): recorre solo los cortes de
+        franja que cruza el intervalo (bisect + una resta de prefijos por tramo).
+        """
+        prefix, cuts, cut_bands = self.prefix, self.cuts, self.cut_bands
+        shares = {}
+        m = minute_of_week(start)
+        left = (end - start) // _MINUTE
+        while left > 0:
+            i = bisect_right(cuts, m) - 1
+            stop = cuts[i + 1] if i + 1 < len(cuts) else MINUTES_PER_WEEK
+            step = min(left, stop - m)
+            label = self.labels[cut_bands[i]]
+            shares[label] = shares.get(label, 0) + prefix[m + step] - prefix[m]
+            left -= step
+            m = (m + step) % MINUTES_PER_WEEK
+        return shares
+
+    def split(self, amount_cents, start, end) -> dict:
+        """
+        Reparte `amount_cents` (lo cobrado por la cancha) entre las franjas de
+        [start, end) en proporción a su tarifa. Los céntimos sobrantes del
+        redondeo van a la franja de mayor peso, así la suma es exacta.
+        """
+        shares = self.band_shares(start, end)
+        weight = sum(shares.values())
+        if not weight:
+            return {self.labels[self.cut_bands[0]]: amount_cents} if amount_cents else {}
+        parts = {label: amount_cents * w // weight for label, w in shares.items()}
+        parts[max(shares, key=shares.get)] += amount_cents - sum(parts.values())
+        return parts
+
+
+def _day_minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def compile_rates(price_hour, rates=(), lights_surcharge=0, lights_from=None) -> RateTable:
+    """
+    Compila la tarifa de una cancha: `price_hour` fuera de franjas, cada franja
+    `rates` = [(día 0-6, minuto inicio, minuto fin, precio por hora, nombre), ...]
+    y, si hay `lights_from`, el recargo por luces desde esa hora hasta medianoche.
+    """
+    hourly = array('q', [to_cents(price_hour)]) * MINUTES_PER_WEEK
+    bands = array('B', [0]) * MINUTES_PER_WEEK
+    labels = [BASE_BAND]
+    for weekday, m0, m1, price, label in rates:
+        if label not in labels:
+            labels.append(label)
+        lo, n = weekday * MINUTES_PER_DAY + m0, m1 - m0
+        hourly[lo:lo + n] = array('q', [to_cents(price)]) * n
+        bands[lo:lo + n] = array('B', [labels.index(label)]) * n
+
+    surcharge = to_cents(lights_surcharge)
+    if surcharge and lights_from is not None:
+        first = _day_minutes(lights_from)
+        for day in range(7):
+            for m in range(day * MINUTES_PER_DAY + first, (day + 1) * MINUTES_PER_DAY):
+                hourly[m] += surcharge
+    return RateTable(hourly, bands, labels)
@@ -1,10 +1,40 @@
-from decimal import Decimal
-from django.db.models import Sum
+from datetime import timedelta
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
 from .models import Booking, BookingStatus, BookingExtra
-from applications.field.models import FieldEquipment
+from .intervals import availability_index
+from .quotes import rate_table
+from .timeline import SlotTimeline
+from applications.field.models import Field, FieldEquipment
+from applications.scheduling.calendar import covers
+from applications.scheduling.services import open_masks
 
-def field_is_free(field, start, end) -> bool:
-    """No hay solape si NO existe una reserva (pend/confirm) que cumpla: start < end AND end > start."""
+def lock_field(field_id) -> Field:
+    """
+    Serializa las escrituras de reservas por cancha dentro de la transacción actual.
+    PostgreSQL: SELECT ... FOR UPDATE sobre la fila de Field.
+    SQLite (sin FOR UPDATE): una escritura nula sobre la fila toma el lock de
+    escritura de la BD antes de leer, con el mismo efecto.
+    """
+    if connection.features.has_select_for_update:
+        return Field.objects.select_for_update().get(pk=field_id)
+    Field.objects.filter(pk=field_id).update(price_hour=F('price_hour'))
+    return Field.objects.get(pk=field_id)
+
+def field_is_free(field, start, end, strict=False) -> bool:
+    """
+    No hay solape si NO existe una reserva (pend/confirm) que cumpla: start < end AND end > start.
+    Por defecto responde desde el índice en memoria; con strict=True consulta la BD
+    (usar dentro de la transacción de escritura).
+    """
+    tz = timezone.get_current_timezone()
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start, tz)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end, tz)
+    if not strict:
+        return availability_index.is_free(field.pk, start, end)
     return not Booking.objects.filter(
         field=field,
         status__in=[BookingStatus.PENDING, BookingStatus.CONFIRMED],
@@ -12,17 +42,120 @@ def field_is_free(field, start, end) -> bool:
         end__gt=start,
     ).exists()
 
-def equipment_available_qty(field_equipment: FieldEquipment, start, end) -> int:
-    """Stock disponible del extra (stock físico - cantidad ya reservada en el mismo rango)."""
-    reserved = BookingExtra.objects.filter(
-        field_equipment=field_equipment,
+def peak_usage(intervals) -> int:
+    """
+    Máxima cantidad simultánea para [(start, end, quantity), ...] (barrido lineal).
+    Los intervalos son semiabiertos: uno que termina a las 10:00 no coexiste con
+    otro que empieza a las 10:00 (las salidas se procesan antes que las entradas).
+    """
+    events = []
+    for s, e, q in intervals:
+        events.append((s, 1, q))
+        events.append((e, 0, -q))
+    events.sort(key=lambda ev: (ev[0], ev[1]))
+    current = peak = 0
+    for _, _, delta in events:
+        current += delta
+        if current > peak:
+            peak = current
+    return peak
+
+def equipment_availability(field_equipments, start, end) -> dict:
+    """
+    Stock disponible por FieldEquipment en [start, end) con UNA consulta:
+    stock físico - pico de unidades reservadas a la vez dentro del rango.
+    Devuelve {fe.id: disponible}.
+    """
+    fes = list(field_equipments)
+    usage = {fe.id: [] for fe in fes}
+    rows = BookingExtra.objects.filter(
+        field_equipment_id__in=list(usage),
         booking__status__in=[BookingStatus.PENDING, BookingStatus.CONFIRMED],
         booking__start__lt=end,
         booking__end__gt=start,
-    ).aggregate(q=Sum('quantity'))['q'] or 0
-    return max(0, field_equipment.stock - reserved)
+    ).values_list('field_equipment_id', 'booking__start', 'booking__end', 'quantity')
+    for fe_id, b_start, b_end, qty in rows:
+        # solo interesa la parte del uso que cae dentro del rango pedido
+        usage[fe_id].append((max(b_start, start), min(b_end, end), qty))
+    return {fe.id: max(0, fe.stock - peak_usage(usage[fe.id])) for fe in fes}
+
+def equipment_available_qty(field_equipment: FieldEquipment, start, end) -> int:
+    """Stock disponible del extra (stock físico - pico reservado en el mismo rango)."""
+    return equipment_availability([field_equipment], start, end)[field_equipment.id]
+
+def slot_prices(field, timeline, rows, duration_minutes):
+    """
+    Precio en céntimos de reservar `duration_minutes` desde cada slot del
+    `timeline`, por día; None si el bloque no cabe antes del cierre o pisa un
+    slot ocupado según `rows` (los bits de availability_matrix).
+    """
+    span = duration_minutes // timeline.slot_minutes
+    length = timedelta(minutes=duration_minutes)
+    starts, cells = [], []
+    for day, bits in enumerate(rows):
+        for r in range(timeline.per_day):
+            if r + span <= timeline.per_day and '1' not in bits[r:r + span]:
+                cells.append(len(starts))
+                starts.append(timeline.slot_bounds(day * timeline.per_day + r)[0])
+            else:
+                cells.append(None)
+    prices = rate_table(field).cents_many([(s, s + length) for s in starts])
+    return timeline.per_day_rows([None if c is None else prices[c] for c in cells])
+
+def close_outside_hours(bits, mask, timeline):
+    """Marca con '1' los slots del día (bytearray de availability_matrix) en que la cancha no atiende."""
+    if mask is None:
+        return bits
+    slot = timeline.slot_minutes
+    first = timeline.start_hour * 60
+    for r in range(timeline.per_day):
+        m0 = first + r * slot
+        if not covers(mask, m0, m0 + slot):
+            bits[r] = ord('1')
+    return bits
+
+def availability_matrix(field_ids, date_from, date_to, slot_minutes=30, start_hour=8, end_hour=22,
+                        duration_minutes=None) -> dict:
+    """
+    Mapa libre/ocupado de varias canchas en [date_from, date_to] con UNA consulta
+    sobre Booking (índice field/start/end/status).
+    Cada día es un string de bits, un carácter por slot desde start_hour:
+    '0' = libre, '1' = ocupado o fuera del horario de la cancha (SlotCalendar).
+    Con `duration_minutes` (múltiplo del slot) agrega 'prices': el precio en
+    céntimos de reservar ese bloque desde cada slot libre (ver slot_prices).
+    """
+    timeline = SlotTimeline(
+        date_from, days=(date_to - date_from).days + 1,
+        slot_minutes=slot_minutes, start_hour=start_hour, end_hour=end_hour,
+    )
+    intervals = {fid: [] for fid in field_ids}
+    rows = Booking.objects.filter(
+        field_id__in=list(intervals),
+        status__in=[BookingStatus.PENDING, BookingStatus.CONFIRMED],
+        start__lt=timeline.range_end,
+        end__gt=timeline.range_start,
+    ).values_list('field_id', 'start', 'end')
+    for fid, b_start, b_end in rows:
+        intervals[fid].append((b_start, b_end))
 
-def compute_total(field_price_hour: Decimal, hours: Decimal, extras: list[dict]) -> Decimal:
-    base = field_price_hour * hours
-    extras_total = sum(Decimal(e['quantity']) * Decimal(e['unit_price']) for e in extras)
-    return base + extras_total
+    masks = open_masks(list(intervals), timeline.days)
+    fields = {
+        fid: [
+            close_outside_hours(bits, mask, timeline).decode()
+            for bits, mask in zip(timeline.per_day_rows(timeline.busy_bits(ivs)), masks[fid])
+        ]
+        for fid, ivs in intervals.items()
+    }
+    matrix = {
+        'days': timeline.days,
+        'slot_minutes': slot_minutes,
+        'start_hour': start_hour,
+        'end_hour': end_hour,
+        'fields': fields,
+    }
+    if duration_minutes:
+        matrix['prices'] = {
+            field.pk: slot_prices(field, timeline, fields[field.pk], duration_minutes)
+            for field in Field.objects.filter(pk__in=list(fields)).only('id', 'pricing_version', *Field.PRICING_FIELDS)
+        }
+    return matrix
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Booking
+from .intervals import availability_index
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_field_intervals(sender, instance, **kwargs):
+    """
+    Cualquier alta/cambio/baja de una reserva descarta las ventanas de su cancha
+    (y de la anterior, si se movió de cancha). Se repite al confirmar la
+    transacción por si otra petición recargó el día antes del commit.
+    """
+    field_ids = {instance.field_id, getattr(instance, '_loaded_field_id', None)} - {None}
+    instance._loaded_field_id = instance.field_id
+    for field_id in field_ids:
+        availability_index.invalidate(field_id)
+    transaction.on_commit(lambda: [availability_index.invalidate(fid) for fid in field_ids])
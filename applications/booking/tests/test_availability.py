@@ -0,0 +1,74 @@
+from datetime import datetime, time, timedelta
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from applications.users.models import User, UserRole
+from applications.field.models import Field
+from applications.scheduling.models import OpeningHours
+from applications.booking.models import Booking, BookingStatus
+from applications.booking.quotes import compiled_rates
+from applications.booking.services import availability_matrix
+from applications.scheduling.services import materialize_calendar
+
+
+class AvailabilityMatrixTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(nombre="Reg", email="r@e.com", password="x", rol=UserRole.REGULAR)
+        self.f1 = Field.objects.create(owner=self.user, name="C1", type="futbol", address="X", price_hour=50)
+        self.f2 = Field.objects.create(owner=self.user, name="C2", type="futbol", address="X", price_hour=50)
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def test_single_query_bitmaps(self):
+        Booking.objects.create(user=self.user, field=self.f1, status=BookingStatus.CONFIRMED,
+                               start=self.at(self.day, 19), end=self.at(self.day, 20, 30))
+        Booking.objects.create(user=self.user, field=self.f2, status=BookingStatus.CANCELED,
+                               start=self.at(self.day, 8), end=self.at(self.day, 9))
+        materialize_calendar(self.day, 2)
+        with self.assertNumQueries(2):   # reservas + calendario de slots
+            m = availability_matrix([self.f1.id, self.f2.id], self.day, self.day + timedelta(days=1))
+        self.assertEqual(len(m['days']), 2)
+        row = m['fields'][self.f1.id][0]
+        self.assertEqual(len(row), 28)
+        self.assertEqual(row.index('1'), 22)           # 19:00 es el slot 22 desde las 08:00
+        self.assertEqual(row.count('1'), 3)            # 19:00, 19:30, 20:00
+        self.assertEqual(m['fields'][self.f1.id][1], '0' * 28)
+        self.assertEqual(m['fields'][self.f2.id][0], '0' * 28)
+
+    def test_booking_across_midnight(self):
+        Booking.objects.create(user=self.user, field=self.f1, status=BookingStatus.PENDING,
+                               start=self.at(self.day, 21), end=self.at(self.day + timedelta(days=1), 9))
+        m = availability_matrix([self.f1.id], self.day, self.day + timedelta(days=1), slot_minutes=60)
+        self.assertEqual(m['fields'][self.f1.id], ['0' * 13 + '1', '1' + '0' * 13])
+
+    def test_endpoint(self):
+        url = reverse('booking:availability')
+        resp = self.client.get(url, {'fields': f'{self.f1.id},{self.f2.id}', 'from': self.day.isoformat()})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(set(resp.json()['fields']), {str(self.f1.id), str(self.f2.id)})
+        self.assertEqual(self.client.get(url, {'fields': 'x'}).status_code, 400)
+
+    def test_slot_prices(self):
+        Booking.objects.create(user=self.user, field=self.f1, status=BookingStatus.CONFIRMED,
+                               start=self.at(self.day, 19), end=self.at(self.day, 20))
+        compiled_rates.cache_clear()
+        materialize_calendar(self.day, 1)
+        # reservas + calendario + canchas + franjas (la tabla compilada queda en caché)
+        with self.assertNumQueries(4):
+            availability_matrix([self.f1.id], self.day, self.day, slot_minutes=30, duration_minutes=90)
+        with self.assertNumQueries(3):
+            m = availability_matrix([self.f1.id], self.day, self.day, slot_minutes=30, duration_minutes=90)
+        prices = m['prices'][self.f1.id][0]
+        self.assertEqual(len(prices), 28)
+        self.assertEqual(prices[0], 7500)              # 08:00-09:30 a S/ 50 la hora
+        self.assertIsNone(prices[20])                  # 18:00-19:30 pisa la reserva
+        self.assertEqual(prices[24], 7500)             # 20:00-21:30
+        self.assertIsNone(prices[26])                  # 21:00-22:30 pasa el cierre
+
+    def test_closed_slots_are_not_free(self):
+        OpeningHours.objects.create(field=self.f1, weekday=self.day.weekday(), opens=time(10), closes=time(20))
+        m = availability_matrix([self.f1.id, self.f2.id], self.day, self.day, slot_minutes=60)
+        self.assertEqual(m['fields'][self.f1.id], ['11' + '0' * 10 + '11'])
+        self.assertEqual(m['fields'][self.f2.id], ['0' * 14])   # sin horario: abierta
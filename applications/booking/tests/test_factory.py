@@ -1,14 +1,19 @@
 from datetime import timedelta
+from unittest import mock
+from django.db import IntegrityError
 from django.test import TestCase
 from django.utils import timezone
 from applications.users.models import User, UserRole
 from applications.field.models import Field, Equipment, FieldEquipment
 from applications.booking.factories import BookingFactory, ExtraRequest
 from applications.booking.exceptions import SlotNotAvailable, ExtraOutOfStock
-from applications.booking.models import BookingStatus
+from applications.booking.models import Booking, BookingStatus
+from applications.booking.services import field_is_free, equipment_available_qty
+from applications.booking.intervals import availability_index
 
 class BookingFactoryTests(TestCase):
     def setUp(self):
+        availability_index.clear()
         self.user = User.objects.create(nombre="Reg", email="r@e.com", password="x", rol=UserRole.REGULAR)
         self.field = Field.objects.create(
             owner=self.user, name="Cancha 1", type="futbol",
@@ -39,3 +44,47 @@ class BookingFactoryTests(TestCase):
                 start=start, end=end,
                 extras=[ExtraRequest(fe_id=self.fe.id, quantity=15)],
             )
+
+    def test_fail_on_overlap(self):
+        start = timezone.now() + timedelta(hours=1)
+        end   = start + timedelta(hours=2)
+        BookingFactory.create(user=self.user, field=self.field, start=start, end=end, extras=[])
+        with self.assertRaises(SlotNotAvailable):
+            BookingFactory.create(
+                user=self.user,
+                field=self.field,
+                start=start + timedelta(minutes=30), end=end,
+                extras=[],
+            )
+
+    def test_stale_index_still_rejected_inside_transaction(self):
+        start = timezone.now() + timedelta(hours=1)
+        end   = start + timedelta(hours=2)
+        self.assertTrue(field_is_free(self.field, start, end))  # calienta el índice
+        Booking.objects.bulk_create([
+            Booking(user=self.user, field=self.field, start=start, end=end, status=BookingStatus.PENDING)
+        ])
+        with self.assertRaises(SlotNotAvailable):
+            BookingFactory.create(user=self.user, field=self.field, start=start, end=end, extras=[])
+
+    def test_integrity_error_maps_to_slot_not_available(self):
+        start = timezone.now() + timedelta(hours=1)
+        end   = start + timedelta(hours=2)
+        with mock.patch.object(Booking.objects, "create", side_effect=IntegrityError("booking_no_overlap_active")):
+            with self.assertRaises(SlotNotAvailable):
+                BookingFactory.create(user=self.user, field=self.field, start=start, end=end, extras=[])
+        self.assertFalse(Booking.objects.exists())
+
+    def test_back_to_back_extras_do_not_add_up(self):
+        start = timezone.now() + timedelta(hours=1)
+        BookingFactory.create(
+            user=self.user, field=self.field,
+            start=start, end=start + timedelta(hours=1),
+            extras=[ExtraRequest(fe_id=self.fe.id, quantity=6)],
+        )
+        BookingFactory.create(
+            user=self.user, field=self.field,
+            start=start + timedelta(hours=1), end=start + timedelta(hours=2),
+            extras=[ExtraRequest(fe_id=self.fe.id, quantity=6)],
+        )
+        self.assertEqual(equipment_available_qty(self.fe, start, start + timedelta(hours=2)), 4)
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from applications.users.models import User, UserRole
+from applications.field.models import Field
+from applications.booking.models import Booking, BookingStatus
+from applications.booking.intervals import FieldIntervalIndex, availability_index
+from applications.booking.services import field_is_free
+
+
+class FieldIntervalIndexTests(TestCase):
+    def setUp(self):
+        availability_index.clear()
+        self.user = User.objects.create(nombre="Reg", email="r@e.com", password="x", rol=UserRole.REGULAR)
+        self.field = Field.objects.create(
+            owner=self.user, name="Cancha 1", type="futbol",
+            address="X", price_hour=50, has_lights=False
+        )
+        self.start = (timezone.now() + timedelta(days=1)).replace(hour=19, minute=0, second=0, microsecond=0)
+        self.end = self.start + timedelta(hours=1)
+
+    def book(self, start, end, status=BookingStatus.CONFIRMED):
+        return Booking.objects.create(user=self.user, field=self.field, start=start, end=end, status=status)
+
+    def test_overlap_answered_from_memory(self):
+        self.book(self.start, self.end)
+        self.assertFalse(field_is_free(self.field, self.start, self.end))
+        with self.assertNumQueries(0):
+            self.assertFalse(field_is_free(self.field, self.start + timedelta(minutes=30), self.end))
+            self.assertTrue(field_is_free(self.field, self.end, self.end + timedelta(hours=1)))
+            self.assertTrue(field_is_free(self.field, self.start - timedelta(hours=1), self.start))
+
+    def test_contained_booking_behind_long_one(self):
+        self.book(self.start - timedelta(hours=3), self.end)
+        self.book(self.start - timedelta(hours=2), self.start - timedelta(hours=1))
+        self.assertFalse(field_is_free(self.field, self.start, self.end))
+
+    def test_canceled_bookings_ignored(self):
+        self.book(self.start, self.end, status=BookingStatus.CANCELED)
+        self.assertTrue(field_is_free(self.field, self.start, self.end))
+
+    def test_save_and_delete_invalidate(self):
+        self.assertTrue(field_is_free(self.field, self.start, self.end))
+        b = self.book(self.start, self.end)
+        self.assertFalse(field_is_free(self.field, self.start, self.end))
+        b.delete()
+        self.assertTrue(field_is_free(self.field, self.start, self.end))
+
+    def test_strict_mode_hits_database(self):
+        self.assertTrue(field_is_free(self.field, self.start, self.end))
+        # escritura que no pasa por señales: el índice no se entera, la BD sí
+        Booking.objects.bulk_create([
+            Booking(user=self.user, field=self.field, start=self.start, end=self.end,
+                    status=BookingStatus.CONFIRMED)
+        ])
+        self.assertTrue(field_is_free(self.field, self.start, self.end))
+        self.assertFalse(field_is_free(self.field, self.start, self.end, strict=True))
+
+    def test_moving_booking_invalidates_both_fields(self):
+        other = Field.objects.create(owner=self.user, name="Cancha 2", type="futbol", address="X", price_hour=50)
+        self.book(self.start, self.end)
+        self.assertFalse(field_is_free(self.field, self.start, self.end))
+        self.assertTrue(field_is_free(other, self.start, self.end))
+        moved = Booking.objects.get()
+        moved.field = other
+        moved.save()
+        self.assertTrue(field_is_free(self.field, self.start, self.end))
+        self.assertFalse(field_is_free(other, self.start, self.end))
+
+    def test_windows_are_bounded(self):
+        index = FieldIntervalIndex(max_windows=2)
+        today = timezone.localdate()
+        for i in range(4):
+            index.day(self.field.id, today + timedelta(days=i))
+        self.assertEqual(list(index._days), [(self.field.id, today + timedelta(days=i)) for i in (2, 3)])
@@ -0,0 +1,186 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.exceptions import ValidationError
+from django.forms.models import inlineformset_factory
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from applications.users.models import User, UserRole
+from applications.field.admin import NonOverlappingRatesInlineFormSet
+from applications.field.models import Field, Equipment, FieldEquipment, FieldRate
+from applications.booking.exceptions import QuoteExpired, QuoteInvalid
+from applications.booking.factories import BookingFactory
+from applications.booking.intervals import availability_index
+from applications.booking.quotes import build_quote, compiled_rates, load_quote, quote_many, rate_table
+from applications.booking.rates import MINUTES_PER_WEEK, RateTable
+
+
+class QuoteTests(TestCase):
+    def setUp(self):
+        availability_index.clear()
+        self.user = User.objects.create(nombre="Reg", email="r@e.com", password="x", rol=UserRole.REGULAR)
+        self.field = Field.objects.create(owner=self.user, name="C1", type="futbol", address="X", price_hour=50)
+        self.fe = FieldEquipment.objects.create(
+            field=self.field, equipment=Equipment.objects.create(type='chalecos'), stock=10, price_per_unit='2.50',
+        )
+        self.start = timezone.make_aware(datetime(2030, 5, 6, 19, 0))
+
+    def test_decimal_exact_total(self):
+        quote = build_quote(self.field, self.start, self.start + timedelta(minutes=20), [(self.fe, 3)])
+        self.assertEqual(quote.base, Decimal('16.67'))
+        self.assertEqual(quote.total, Decimal('24.17'))
+
+    def test_signed_roundtrip(self):
+        quote = build_quote(self.field, self.start, self.start + timedelta(hours=1), [(self.fe, 2)])
+        self.assertEqual(load_quote(quote.sign(), self.field), quote)
+
+    def test_tampered_or_foreign_token_is_rejected(self):
+        token = build_quote(self.field, self.start, self.start + timedelta(hours=1)).sign()
+        with self.assertRaises(QuoteInvalid):
+            load_quote(token[:-2] + 'xx', self.field)
+        other = Field.objects.create(owner=self.user, name="C2", type="futbol", address="Y", price_hour=50)
+        with self.assertRaises(QuoteInvalid):
+            load_quote(token, other)
+
+    @override_settings(GP_QUOTE_TTL=60)
+    def test_expired_token(self):
+        token = build_quote(self.field, self.start, self.start + timedelta(hours=1)).sign()
+        with mock.patch('time.time', return_value=timezone.now().timestamp() + 120):
+            with self.assertRaises(QuoteExpired) as ctx:
+                load_quote(token, self.field)
+        self.assertEqual(ctx.exception.quote.start, self.start)
+
+    def test_price_changes_invalidate_quotes(self):
+        token = build_quote(self.field, self.start, self.start + timedelta(hours=1)).sign()
+        fe = FieldEquipment.objects.get(pk=self.fe.pk)
+        fe.stock = 20
+        fe.save()  # el stock no cambia precios
+        self.field.refresh_from_db()
+        load_quote(token, self.field)
+
+        fe.price_per_unit = 4
+        fe.save()
+        self.field.refresh_from_db()
+        with self.assertRaises(QuoteExpired):
+            load_quote(token, self.field)
+
+    def test_factory_books_the_quoted_prices(self):
+        quote = build_quote(self.field, self.start, self.start + timedelta(hours=2), [(self.fe, 2)])
+        booking = BookingFactory.create(user=self.user, field=self.field, quote=quote)
+        self.assertEqual(booking.total_amount, Decimal('105.00'))
+        self.assertEqual(booking.extras.get().unit_price, Decimal('2.50'))
+
+    def test_factory_rejects_stale_quote(self):
+        quote = build_quote(self.field, self.start, self.start + timedelta(hours=1))
+        field = Field.objects.get(pk=self.field.pk)
+        field.price_hour = 60
+        field.save(update_fields=['price_hour'])
+        with self.assertRaises(QuoteExpired):
+            BookingFactory.create(user=self.user, field=self.field, quote=quote)
+
+
+class RateTableTests(TestCase):
+    def test_bands_and_week_wraparound(self):
+        rates = [5000] * MINUTES_PER_WEEK
+        rates[MINUTES_PER_WEEK - 60:] = [8000] * 60     # domingo 23:00-24:00 más caro
+        table = RateTable(rates)
+        sunday = timezone.make_aware(datetime(2030, 5, 12, 23, 30))
+        # 30 min a 80 + 60 min a 50 (ya es lunes)
+        self.assertEqual(table.cents(sunday, sunday + timedelta(minutes=90)), 4000 + 5000)
+        self.assertEqual(table.cents(sunday, sunday + timedelta(days=7)), 5000 * 168 + 3000 * 1)
+
+    def test_quote_many_matches_build_quote(self):
+        user = User.objects.create(nombre="Reg", email="r@e.com", password="x", rol=UserRole.REGULAR)
+        field = Field.objects.create(owner=user, name="C1", type="futbol", address="X", price_hour='45.50')
+        fe = FieldEquipment.objects.create(
+            field=field, equipment=Equipment.objects.create(type='conos'), stock=5, price_per_unit='1.25',
+        )
+        start = timezone.make_aware(datetime(2030, 5, 6, 8, 0))
+        intervals = [(start + timedelta(minutes=15 * i), start + timedelta(minutes=15 * i + 25 + i))
+                     for i in range(40)]
+        totals = quote_many(field, intervals, [(fe, 3)])
+        self.assertEqual(totals, [build_quote(field, s, e, [(fe, 3)]).total for s, e in intervals])
+
+
+class FieldRateTests(TestCase):
+    def setUp(self):
+        compiled_rates.cache_clear()
+        availability_index.clear()
+        self.user = User.objects.create(nombre="Reg", email="r@e.com", password="x", rol=UserRole.REGULAR)
+        self.field = Field.objects.create(owner=self.user, name="C1", type="futbol", address="X", price_hour=40,
+                                          has_lights=True, lights_surcharge=10, lights_from=time(19, 0))
+        # lunes 18:00-22:00 hora punta
+        with self.captureOnCommitCallbacks(execute=True):
+            FieldRate.objects.create(field=self.field, weekday=0, start_time=time(18, 0), end_time=time(22, 0),
+                                     price_hour=60, label="Hora punta")
+        self.field.refresh_from_db()
+        self.monday = datetime(2030, 5, 6)
+
+    def at(self, hour, minute=0):
+        return timezone.make_aware(self.monday.replace(hour=hour, minute=minute))
+
+    def test_straddling_bands_and_lights(self):
+        # 17:30-19:00: 30 min a 40 + 60 min a 60
+        self.assertEqual(build_quote(self.field, self.at(17, 30), self.at(19)).base, Decimal('80.00'))
+        # 18:30-20:00: 30 min a 60 + 60 min a 60 con luces (+10)
+        self.assertEqual(build_quote(self.field, self.at(18, 30), self.at(20)).base, Decimal('100.00'))
+        # sin luces no hay recargo
+        self.field.has_lights = False
+        self.field.save()
+        self.assertEqual(build_quote(self.field, self.at(18, 30), self.at(20)).base, Decimal('90.00'))
+
+    def test_compiled_once_per_pricing_version(self):
+        build_quote(self.field, self.at(8), self.at(9))
+        with self.assertNumQueries(0):
+            build_quote(self.field, self.at(18), self.at(21))
+        rate = FieldRate.objects.get()
+        rate.price_hour = 90
+        rate.save()
+        self.field.refresh_from_db()
+        self.assertEqual(build_quote(self.field, self.at(18), self.at(19)).base, Decimal('90.00'))
+
+    def test_stale_instance_does_not_roll_back_pricing_version(self):
+        stale = Field.objects.get(pk=self.field.pk)
+        FieldRate.objects.get().delete()
+        self.field.refresh_from_db()
+        bumped = self.field.pricing_version
+        stale.name = "C1 renombrada"
+        stale.save()
+        stale.price_hour = 45
+        stale.save()
+        self.field.refresh_from_db()
+        self.assertEqual(self.field.name, "C1 renombrada")
+        self.assertEqual(self.field.pricing_version, bumped + 1)
+        self.assertEqual(stale.pricing_version, bumped + 1)
+
+    def test_uncommitted_pricing_version_is_not_cached(self):
+        rate = FieldRate.objects.get()
+        rate.price_hour = 90
+        rate.save()  # la transacción del test no confirma: la versión puede revertirse
+        self.field.refresh_from_db()
+        build_quote(self.field, self.at(18), self.at(19))
+        self.assertEqual(compiled_rates.cache_info().currsize, 0)
+
+    def test_band_split(self):
+        table = rate_table(self.field)
+        self.assertEqual(table.split(9000, self.at(17), self.at(19)), {'Tarifa base': 3600, 'Hora punta': 5400})
+
+    def test_overlapping_bands_are_rejected(self):
+        rate = FieldRate(field=self.field, weekday=0, start_time=time(21, 0), end_time=time(0, 0), price_hour=50)
+        with self.assertRaises(ValidationError):
+            rate.full_clean()
+
+    def test_overlapping_bands_in_one_admin_submission_are_rejected(self):
+        RateFormSet = inlineformset_factory(
+            Field, FieldRate, formset=NonOverlappingRatesInlineFormSet,
+            fields=('weekday', 'start_time', 'end_time', 'price_hour', 'label'), extra=2,
+        )
+        data = {'rates-TOTAL_FORMS': '2', 'rates-INITIAL_FORMS': '0'}
+        for i, (start, end) in enumerate((('08:00', '10:00'), ('09:00', '11:00'))):
+            data.update({f'rates-{i}-weekday': '3', f'rates-{i}-start_time': start,
+                         f'rates-{i}-end_time': end, f'rates-{i}-price_hour': '45'})
+        formset = RateFormSet(data, instance=self.field, prefix='rates')
+        self.assertFalse(formset.is_valid())
+        self.assertIn('se cruzan', formset.non_form_errors()[0])
+        data['rates-1-start_time'] = '10:00'
+        self.assertTrue(RateFormSet(data, instance=self.field, prefix='rates').is_valid())
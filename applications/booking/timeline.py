@@ -0,0 +1,84 @@
+from datetime import datetime, time, timedelta
+from operator import attrgetter
+
+from django.utils import timezone
+
+
+class SlotTimeline:
+    """
+    Días consecutivos divididos en slots fijos dentro del horario de apertura.
+    El slot global `i` corresponde al día `i // per_day` y a la fila `i % per_day`,
+    así una semana entera cabe en una sola lista plana.
+    """
+
+    def __init__(self, first_day, days=1, slot_minutes=30, start_hour=8, end_hour=22):
+        self.tz = timezone.get_current_timezone()
+        self.slot_minutes = slot_minutes
+        self.slot = timedelta(minutes=slot_minutes)
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.per_day = (end_hour - start_hour) * 60 // slot_minutes
+        self.days = [first_day + timedelta(days=i) for i in range(days)]
+        self.opens = [
+            timezone.make_aware(datetime.combine(d, time.min), self.tz) + timedelta(hours=start_hour)
+            for d in self.days
+        ]
+
+    def __len__(self):
+        return self.per_day * len(self.days)
+
+    @property
+    def range_start(self):
+        return self.opens[0]
+
+    @property
+    def range_end(self):
+        return self.opens[-1] + self.slot * self.per_day
+
+    def slot_bounds(self, i):
+        """(inicio, fin) del slot global i, aware en la zona actual."""
+        day_index, row = divmod(i, self.per_day)
+        start = self.opens[day_index] + self.slot * row
+        return start, start + self.slot
+
+    def row_labels(self):
+        """Hora de inicio de cada fila ('08:00', '08:30', ...)."""
+        return [(self.opens[0] + self.slot * r).strftime('%H:%M') for r in range(self.per_day)]
+
+    def spans(self, start, end):
+        """Rangos [i0, i1) de slots globales que toca el intervalo [start, end)."""
+        start, end = timezone.localtime(start, self.tz), timezone.localtime(end, self.tz)
+        first_day = self.days[0]
+        d0 = max(0, (start.date() - first_day).days)
+        d1 = min(len(self.days) - 1, (end.date() - first_day).days)
+        for di in range(d0, d1 + 1):
+            i0 = max(0, (start - self.opens[di]) // self.slot)
+            i1 = min(self.per_day, -((self.opens[di] - end) // self.slot))
+            if i0 < i1:
+                base = di * self.per_day
+                yield base + i0, base + i1
+
+    def bucket(self, items, start=attrgetter('start'), end=attrgetter('end')):
+        """
+        Un solo pase ordenado por inicio: cells[i] es el primer item que ocupa
+        el slot i (o None si está libre).
+        """
+        cells = [None] * len(self)
+        for item in sorted(items, key=start):
+            for i0, i1 in self.spans(start(item), end(item)):
+                for i in range(i0, i1):
+                    if cells[i] is None:
+                        cells[i] = item
+        return cells
+
+    def busy_bits(self, intervals):
+        """bytearray con b'1' en cada slot tocado por algún (start, end)."""
+        bits = bytearray(b'0' * len(self))
+        for s, e in intervals:
+            for i0, i1 in self.spans(s, e):
+                bits[i0:i1] = b'1' * (i1 - i0)
+        return bits
+
+    def per_day_rows(self, seq):
+        """Parte una secuencia plana en una sublista por día."""
+        return [seq[d * self.per_day:(d + 1) * self.per_day] for d in range(len(self.days))]
@@ -7,4 +7,5 @@ urlpatterns = [
     path("detalle-cancha/<int:pk>/", FieldDetailBookingView.as_view(), name="detail"),
     path('<int:pk>/editar/',  views.booking_edit_view,   name='edit'),
     path('<int:pk>/eliminar/', views.booking_delete_view, name='delete'),
+    path('disponibilidad/', views.availability_view, name='availability'),
 ]
\ No newline at end of file
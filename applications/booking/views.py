@@ -5,14 +5,23 @@ from django.urls import reverse
 from django.views.generic import DetailView
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from django.http import JsonResponse
+from datetime import datetime
+from django.utils import timezone
 from django.shortcuts import get_object_or_404, redirect
-from applications.users.models import User
 from applications.field.models import Field, FieldEquipment
 from .forms import BookingForm, ExtrasQuantitiesForm
 from .factories import BookingFactory, ExtraRequest
 from .exceptions import BookingError
-from applications.users.utils import login_required_session
+from applications.users.utils import get_session_user, login_required_session
 from .models import Booking
+from .services import availability_matrix
+
+MAX_MATRIX_FIELDS = 100
+MAX_MATRIX_DAYS = 31
+MAX_QUOTE_MINUTES = 6 * 60
+
 @method_decorator(never_cache, name="dispatch")
 class FieldDetailBookingView(DetailView):
     """
@@ -24,6 +33,9 @@ class FieldDetailBookingView(DetailView):
     template_name = "booking/booking.html"
     context_object_name = "field"
 
+    def get_queryset(self):
+        return Field.objects.with_primary_image()
+
     # ---- GET ----
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -43,7 +55,9 @@ class FieldDetailBookingView(DetailView):
             login_url = reverse("users:login")
             return redirect(f"{login_url}?next={request.get_full_path()}")
 
-        user = User.objects.get(pk=request.session.get("user_id"))
+        user = get_session_user(request)
+        if user is None:
+            return redirect(f"{reverse('users:login')}?next={request.get_full_path()}")
 
         form = BookingForm(request.POST)
         extras_form = ExtrasQuantitiesForm(request.POST, fe_list=fe_list)
@@ -105,4 +119,44 @@ def booking_delete_view(request, pk):
 
     # Si alguien entra por GET, simplemente lo regresamos
     messages.error(request, "Acción no permitida.")
-    return redirect('users:history')
\ No newline at end of file
+    return redirect('users:history')
+
+@require_GET
+def availability_view(request):
+    """
+    Disponibilidad en bloque (JSON) para pintar badges de muchas canchas a la vez.
+    GET ?fields=1,2,3&from=YYYY-MM-DD&to=YYYY-MM-DD&slot=30[&duration=60]
+    Con `duration` incluye el precio (céntimos) de reservar ese bloque desde cada slot libre.
+    """
+    try:
+        field_ids = [int(x) for x in request.GET.get('fields', '').split(',') if x.strip()]
+        date_from = (datetime.strptime(request.GET['from'], "%Y-%m-%d").date()
+                     if request.GET.get('from') else timezone.localdate())
+        date_to = (datetime.strptime(request.GET['to'], "%Y-%m-%d").date()
+                   if request.GET.get('to') else date_from)
+        slot_minutes = int(request.GET.get('slot', 30))
+        duration = int(request.GET.get('duration', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos.'}, status=400)
+
+    if not field_ids or len(field_ids) > MAX_MATRIX_FIELDS:
+        return JsonResponse({'error': f'Indica entre 1 y {MAX_MATRIX_FIELDS} canchas.'}, status=400)
+    if date_to < date_from or (date_to - date_from).days >= MAX_MATRIX_DAYS:
+        return JsonResponse({'error': f'El rango debe ser de 1 a {MAX_MATRIX_DAYS} días.'}, status=400)
+    if slot_minutes not in (15, 30, 60):
+        return JsonResponse({'error': 'El slot debe ser de 15, 30 o 60 minutos.'}, status=400)
+    if duration < 0 or duration % slot_minutes or duration > MAX_QUOTE_MINUTES:
+        return JsonResponse({'error': 'La duración debe ser múltiplo del slot.'}, status=400)
+
+    matrix = availability_matrix(field_ids, date_from, date_to, slot_minutes=slot_minutes,
+                                 duration_minutes=duration or None)
+    payload = {
+        'days': [d.isoformat() for d in matrix['days']],
+        'slot_minutes': matrix['slot_minutes'],
+        'start_hour': matrix['start_hour'],
+        'end_hour': matrix['end_hour'],
+        'fields': {str(fid): rows for fid, rows in matrix['fields'].items()},
+    }
+    if 'prices' in matrix:
+        payload['prices'] = {str(fid): rows for fid, rows in matrix['prices'].items()}
+    return JsonResponse(payload)
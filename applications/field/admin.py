@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.core.exceptions import ValidationError
+from django.db.models import Q
 from django.forms.models import BaseInlineFormSet
 from django.utils.html import format_html   # FIX: importar para usar en previews
 
-from .models import Field, Album, Equipment, FieldEquipment
+from .models import Field, Album, Equipment, FieldEquipment, FieldRate
+from .search import full_text_search
 
 # ---------- Paso 1: Asegurar 1 sola imagen principal en el inline del álbum ----------
 class SinglePrimaryImageInlineFormSet(BaseInlineFormSet):
@@ -30,7 +32,7 @@ class AlbumInline(admin.TabularInline):
 
     def thumb(self, obj):
         if obj.id and obj.image:
-            return format_html('<img src="{}" style="height:60px;border-radius:6px;" />', obj.image.url)
+            return format_html('<img src="{}" style="height:60px;border-radius:6px;" />', obj.thumb_url)
         return "—"
     thumb.short_description = "Vista previa"
 
@@ -44,29 +46,64 @@ class FieldEquipmentInline(admin.TabularInline):
     fields = ('equipment', 'stock')
 
 
+class NonOverlappingRatesInlineFormSet(BaseInlineFormSet):
+    """FieldRate.clean solo ve las franjas guardadas: aquí se cruzan las del mismo envío."""
+    def clean(self):
+        super().clean()
+        by_day = {}
+        for form in self.forms:
+            if not hasattr(form, 'cleaned_data') or form.cleaned_data.get('DELETE'):
+                continue
+            rate = form.instance
+            if rate.weekday is None or rate.start_time is None or rate.end_time is None:
+                continue
+            by_day.setdefault(rate.weekday, []).append(rate)
+        for rates in by_day.values():
+            rates.sort(key=lambda r: r.minutes)
+            for prev, rate in zip(rates, rates[1:]):
+                if rate.minutes[0] < prev.minutes[1]:
+                    raise ValidationError(f"Las franjas {prev} y {rate} se cruzan.")
+
+class FieldRateInline(admin.TabularInline):
+    model = FieldRate
+    formset = NonOverlappingRatesInlineFormSet
+    extra = 1
+    fields = ('weekday', 'start_time', 'end_time', 'price_hour', 'label')
+
+
 # ---------- Paso 3: Admin de Field (sin extra_equipment en fieldsets) ----------
 @admin.register(Field)
 class FieldAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'type', 'owner', 'price_hour', 'primary_image_preview')
+    list_select_related = ('owner', 'primary_album')
     list_filter = ('type',)
-    search_fields = ('name', 'address', 'owner__nombre')
-    inlines = [AlbumInline, FieldEquipmentInline]  # FIX: añadimos FieldEquipmentInline
+    # el texto se busca con el índice de búsqueda (field/search.py); search_fields
+    # solo activa la caja y cubre el nombre del dueño
+    search_fields = ('owner__nombre',)
+    inlines = [AlbumInline, FieldEquipmentInline, FieldRateInline]  # FIX: añadimos FieldEquipmentInline
 
     fieldsets = (
         ('Información general', {
             'fields': ('owner', 'name', 'type', 'address', 'description')
         }),
         ('Tarifas', {
-            'fields': ('price_hour',),
+            'fields': ('price_hour', 'has_lights', 'lights_surcharge', 'lights_from'),
         }),
         # FIX: NO incluir 'extra_equipment' aquí porque es M2M con through => no editable en el form
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        by_owner, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        matches = full_text_search(queryset, search_term).values('pk')
+        return queryset.filter(Q(pk__in=matches) | Q(pk__in=by_owner.values('pk'))), may_have_duplicates
+
     def primary_image_preview(self, obj):
-        # FIX: asegúrate de tener la property obj.primary_image en tu modelo Field
+        # primary_image viene del JOIN de list_select_related: sin consultas por fila
         album = obj.primary_image
         if album and album.image:
-            return format_html('<img src="{}" style="height:60px;border-radius:6px;" />', album.image.url)
+            return format_html('<img src="{}" style="height:60px;border-radius:6px;" />', album.thumb_url)
         return "—"
     primary_image_preview.short_description = "Imagen principal"
 
@@ -97,7 +134,7 @@ class AlbumAdmin(admin.ModelAdmin):
 
     def mini(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="height:50px;border-radius:6px;" />', obj.image.url)
+            return format_html('<img src="{}" style="height:50px;border-radius:6px;" />', obj.thumb_url)
         return "—"
     mini.short_description = "Miniatura"
 
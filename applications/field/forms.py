@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from django import forms
+from django.utils import timezone
+
+from .models import Equipment, Field
+
+SORT_CHOICES = (
+    ('', 'Más recientes'),
+    ('price', 'Precio: menor a mayor'),
+    ('-price', 'Precio: mayor a menor'),
+)
+
+
+class FieldFilterForm(forms.Form):
+    """Filtros del listado público (GET). Los valores inválidos simplemente no filtran."""
+    q = forms.CharField(max_length=100, required=False, strip=True)
+    kword = forms.ChoiceField(choices=(('', 'Todos'),) + Field.TYPE_CHOICES, required=False)
+    price_min = forms.DecimalField(min_value=0, decimal_places=2, required=False)
+    price_max = forms.DecimalField(min_value=0, decimal_places=2, required=False)
+    has_lights = forms.NullBooleanField(required=False, widget=forms.Select(
+        choices=(('', 'Indistinto'), ('true', 'Con luces'), ('false', 'Sin luces')),
+        attrs={'class': 'select'},
+    ))
+    equipment = forms.ChoiceField(
+        choices=(('', 'Cualquiera'),) + Equipment.TYPE_CHOICES, required=False,
+        widget=forms.Select(attrs={'class': 'select'}),
+    )
+    equipment_qty = forms.IntegerField(min_value=1, max_value=100, required=False)
+    # "libre el día X entre T1 y T2" (hora local)
+    date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'select'}))
+    time_from = forms.TimeField(required=False, widget=forms.TimeInput(attrs={'type': 'time', 'class': 'select'}))
+    time_to = forms.TimeField(required=False, widget=forms.TimeInput(attrs={'type': 'time', 'class': 'select'}))
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False, widget=forms.Select(attrs={'class': 'select'}))
+
+    def clean(self):
+        data = super().clean()
+        day, t0, t1 = data.get('date'), data.get('time_from'), data.get('time_to')
+        if day and t0 and t1 and t0 < t1:
+            tz = timezone.get_current_timezone()
+            data['window'] = (
+                timezone.make_aware(datetime.combine(day, t0), tz),
+                timezone.make_aware(datetime.combine(day, t1), tz),
+            )
+        elif day or t0 or t1:
+            self.add_error(None, 'Indica fecha, hora de inicio y una hora de fin posterior.')
+        return data
+
+    def filters(self):
+        """cleaned_data sin los campos inválidos ni vacíos."""
+        self.is_valid()
+        data = getattr(self, 'cleaned_data', {})
+        return {k: v for k, v in data.items() if v not in (None, '')}
@@ -0,0 +1,104 @@
+import math
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+
+GEOHASH_PRECISION = 9          # ~4.8m x 4.8m: suficiente para una cancha
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION):
+    """Geohash clásico (base32, bits alternados lng/lat)."""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            bits = bits * 2 + (lng >= mid)
+            lng_lo, lng_hi = (mid, lng_hi) if lng >= mid else (lng_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            bits = bits * 2 + (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(alto, ancho) en grados de una celda de geohash de `precision` caracteres."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_box(lat, lng, radius_km):
+    """(lat_min, lat_max, lng_min, lng_max) que contiene el círculo de radio `radius_km`."""
+    dlat = radius_km / KM_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(180.0, radius_km / (KM_PER_DEG_LAT * cos_lat))
+    return max(-90.0, lat - dlat), min(90.0, lat + dlat), lng - dlng, lng + dlng
+
+
+def covering_cells(box):
+    """
+    Prefijos de geohash que cubren la caja: se toma la precisión más fina cuya
+    celda es al menos tan grande como la caja, así bastan las (≤4) celdas de
+    sus esquinas. Lista vacía si la caja es muy grande o cruza el antimeridiano.
+    """
+    lat_min, lat_max, lng_min, lng_max = box
+    if lng_min < -180 or lng_max > 180:
+        return []
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        if height >= lat_max - lat_min and width >= lng_max - lng_min:
+            return sorted({
+                encode_geohash(la, ln, precision)
+                for la in (lat_min, lat_max) for ln in (lng_min, lng_max)
+            })
+    return []
+
+
+def nearby_q(lat, lng, radius_km):
+    """
+    Prefiltro SQL: rangos sobre el geohash indexado (`geohash >= p AND geohash < p + '{'`,
+    usable por un btree en PostgreSQL y SQLite) más la caja en lat/lng.
+    """
+    lat_min, lat_max, lng_min, lng_max = box = bounding_box(lat, lng, radius_km)
+    q = Q(latitude__gte=lat_min, latitude__lte=lat_max)
+    if lng_min < -180:
+        q &= Q(longitude__gte=lng_min + 360) | Q(longitude__lte=lng_max)
+    elif lng_max > 180:
+        q &= Q(longitude__gte=lng_min) | Q(longitude__lte=lng_max - 360)
+    else:
+        q &= Q(longitude__gte=lng_min, longitude__lte=lng_max)
+
+    cells = covering_cells(box)
+    if cells:
+        # '{' es el carácter siguiente a 'z' en ASCII: cierra el rango del prefijo
+        q &= reduce(or_, (Q(geohash__gte=c, geohash__lt=c + '{') for c in cells))
+    return q
+
+
+def haversine_km(lat, lng, points):
+    """
+    Distancias (km) desde (lat, lng) a todos los `points` [(lat, lng), ...] en un
+    solo pase, con el seno/coseno del origen precalculados.
+    """
+    lat0 = math.radians(lat)
+    lng0 = math.radians(lng)
+    cos0 = math.cos(lat0)
+    sin, cos, asin, sqrt, rad = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    out = []
+    for plat, plng in points:
+        la, ln = rad(plat), rad(plng)
+        a = sin((la - lat0) / 2) ** 2 + cos0 * cos(la) * sin((ln - lng0) / 2) ** 2
+        out.append(2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a))))
+    return out
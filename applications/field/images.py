@@ -0,0 +1,156 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from threading import Lock
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+# Anchos de las versiones (nunca se agranda el original)
+VARIANT_WIDTHS = {
+    'thumb': 160,
+    'card': 480,
+    'hero': 1280,
+}
+
+# formato -> (nombre Pillow, extensión, opciones de guardado)
+VARIANT_FORMATS = {
+    'jpeg': ('JPEG', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', '.webp', {'quality': 80, 'method': 4}),
+}
+
+VARIANTS_DIR = 'variants'
+
+log = logging.getLogger(__name__)
+
+# Límites de las fotos del álbum (ver Album.clean y field/services.add_album_images)
+MIN_SIZE = (1024, 768)
+MAX_SIZE = (4096, 4096)
+MAX_BYTES_MB = 4
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+
+def check_image_header(f):
+    """
+    Valida peso, formato y dimensiones leyendo solo la cabecera (Image.open es
+    perezoso: no decodifica los píxeles). Devuelve (ancho, alto) o lanza
+    ValidationError con el mismo mensaje que mostraba Album.clean.
+    """
+    from django.core.exceptions import ValidationError
+
+    size_mb = (f.size or 0) / (1024 * 1024)
+    if size_mb > MAX_BYTES_MB:
+        raise ValidationError(f'La imagen pesa {size_mb:.2f}MB; máximo {MAX_BYTES_MB}MB.')
+
+    pos = f.tell() if hasattr(f, 'tell') else None
+    try:
+        f.seek(0)
+        with Image.open(f) as im:
+            fmt, (w, h) = im.format, im.size
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('No se pudieron obtener las dimensiones.')
+    finally:
+        if pos is not None:
+            f.seek(pos)
+
+    if fmt not in ALLOWED_FORMATS:
+        raise ValidationError(f'Formato {fmt} no permitido (JPEG, PNG o WebP).')
+    (min_w, min_h), (max_w, max_h) = MIN_SIZE, MAX_SIZE
+    if w < min_w or h < min_h:
+        raise ValidationError(f'Mínimo {min_w}×{min_h}px. Subiste {w}×{h}px.')
+    if w > max_w or h > max_h:
+        raise ValidationError(f'Máximo {max_w}×{max_h}px. Subiste {w}×{h}px.')
+    return w, h
+
+
+def render_variants(src_path, media_root, rel_dir, stem):
+    """
+    Genera las versiones thumb/card/hero en JPEG y WebP de una imagen.
+    Solo usa Pillow y el disco (sin Django ni BD) para poder correr en un
+    proceso hijo. Devuelve {'thumb': {'width': 160, 'jpeg': ruta, 'webp': ruta}, ...}
+    con rutas relativas al storage.
+    """
+    os.makedirs(os.path.join(media_root, rel_dir), exist_ok=True)
+    out = {}
+    with Image.open(src_path) as im:
+        im = ImageOps.exif_transpose(im).convert('RGB')
+        for name, width in VARIANT_WIDTHS.items():
+            w = min(width, im.width)
+            h = max(1, round(im.height * w / im.width))
+            resized = im if w == im.width else im.resize((w, h), Image.LANCZOS)
+            entry = {'width': w}
+            for key, (fmt, ext, options) in VARIANT_FORMATS.items():
+                rel = f'{rel_dir}/{stem}_{name}{ext}'
+                resized.save(os.path.join(media_root, rel), fmt, **options)
+                entry[key] = rel
+            out[name] = entry
+    return out
+
+
+_executor = None
+_executor_lock = Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: el hijo no hereda hilos ni conexiones abiertas del servidor
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.GP_IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def store_variants(album_id, source, variants):
+    from .models import Album
+    # solo si la imagen no cambió mientras se procesaba; update() no dispara señales
+    Album.objects.filter(pk=album_id, image=source).update(variants={'source': source, **variants})
+
+
+def _on_done(album_id, source, future):
+    exc = future.exception()
+    if exc is not None:
+        # el álbum sigue sirviendo el original; se reintenta con build_album_variants
+        log.warning('No se generaron versiones de %s: %s', source, exc)
+        return
+    from django.db import connection
+    try:
+        store_variants(album_id, source, future.result())
+    finally:
+        # el callback corre en un hilo del executor: cerrar su conexión propia
+        connection.close()
+
+
+def variant_args(album):
+    """Argumentos (solo rutas) de render_variants para la imagen de `album`."""
+    source = album.image.name
+    storage = album.image.storage
+    rel_dir = f'{os.path.dirname(source)}/{VARIANTS_DIR}'.lstrip('/')
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return storage.path(source), storage.path(''), rel_dir, stem
+
+
+def schedule_variants(album):
+    """
+    Encola la generación de versiones de `album` en el pool de procesos.
+    Con GP_IMAGE_WORKERS = 0 se generan en línea (tests / desarrollo).
+    """
+    if not album.image:
+        return
+    source = album.image.name
+    args = variant_args(album)
+
+    if settings.GP_IMAGE_WORKERS == 0:
+        try:
+            variants = render_variants(*args)
+        except OSError as exc:
+            log.warning('No se generaron versiones de %s: %s', source, exc)
+            return
+        store_variants(album.pk, source, variants)
+        return
+    future = _get_executor().submit(render_variants, *args)
+    future.add_done_callback(partial(_on_done, album.pk, source))
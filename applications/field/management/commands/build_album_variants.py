@@ -0,0 +1,36 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+
+from applications.field.images import render_variants, variant_args, store_variants
+from applications.field.models import Album
+
+
+class Command(BaseCommand):
+    help = "Genera las versiones (thumb/card/hero, JPEG y WebP) de las imágenes que aún no las tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Procesos en paralelo (default 4)')
+        parser.add_argument('--all', action='store_true', help='Regenerar también las que ya tienen versiones')
+
+    def handle(self, *args, **opts):
+        albums = [a for a in Album.objects.exclude(image='') if opts['all'] or not a.has_variants()]
+        if not albums:
+            self.stdout.write("Todas las imágenes tienen sus versiones.")
+            return
+
+        done = failed = 0
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max(1, opts['workers']), mp_context=ctx) as pool:
+            futures = {pool.submit(render_variants, *variant_args(a)): a for a in albums}
+            for future in as_completed(futures):
+                album = futures[future]
+                try:
+                    store_variants(album.pk, album.image.name, future.result())
+                    done += 1
+                except OSError as exc:
+                    failed += 1
+                    self.stderr.write(f"Album {album.pk}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"Versiones generadas: {done}. Fallidas: {failed}."))
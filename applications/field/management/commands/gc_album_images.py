@@ -0,0 +1,49 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from applications.field.models import Album
+from applications.field.services import album_file_referenced, referenced_album_files
+
+
+class Command(BaseCommand):
+    help = "Borra de field_albums/ los archivos (originales y versiones) que ningún Album referencia."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo listar, no borrar')
+        parser.add_argument(
+            '--min-age', type=int, default=60,
+            help='Minutos de antigüedad mínima (default 60): no tocar subidas aún en curso',
+        )
+
+    def handle(self, *args, **opts):
+        field = Album._meta.get_field('image')
+        storage = field.storage
+        root = storage.path(field.upload_to)
+        if not os.path.isdir(root):
+            self.stdout.write("No hay imágenes en disco.")
+            return
+
+        referenced = referenced_album_files()
+        cutoff = time.time() - opts['min_age'] * 60
+        removed = freed = 0
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, storage.path('')).replace(os.sep, '/')
+                if name in referenced or os.path.getmtime(path) > cutoff:
+                    continue
+                size = os.path.getsize(path)
+                if opts['dry_run']:
+                    self.stdout.write(f"{name} ({size} bytes)")
+                elif album_file_referenced(name) or os.path.getmtime(path) > cutoff:
+                    # se volvió a subir o a referenciar después de armar `referenced`
+                    continue
+                else:
+                    storage.delete(name)
+                removed += 1
+                freed += size
+
+        verb = "Se borrarían" if opts['dry_run'] else "Borrados"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} archivos ({freed / 1024 / 1024:.1f} MB)."))
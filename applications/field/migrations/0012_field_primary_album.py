@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_primary_album(apps, schema_editor):
+    Field = apps.get_model('field', 'Field')
+    Album = apps.get_model('field', 'Album')
+    for field_id in Field.objects.values_list('id', flat=True).iterator():
+        album_id = (
+            Album.objects.filter(field_id=field_id)
+            .order_by('-is_primary', 'sort_order', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if album_id:
+            Field.objects.filter(pk=field_id).update(primary_album_id=album_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0011_fieldequipment_price_per_unit_alter_equipment_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='field',
+            name='primary_album',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='field.album'),
+        ),
+        migrations.RunPython(backfill_primary_album, migrations.RunPython.noop),
+    ]
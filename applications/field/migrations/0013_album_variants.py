@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0012_field_primary_album'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='album',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:51
+
+import applications.field.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0013_album_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='album',
+            name='image',
+            field=models.ImageField(storage=applications.field.storage.HashedFileSystemStorage(), upload_to='field_albums/'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0014_album_hashed_storage'),
+        ('users', '0003_alter_partner_options_alter_regular_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(fields=['price_hour', 'id'], name='field_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(fields=['type', 'price_hour', 'id'], name='field_type_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(fields=['has_lights', 'price_hour', 'id'], name='field_lights_price_id_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# Búsqueda de texto sobre Field (ver applications/field/search.py).
+# PostgreSQL: índice GIN por expresión con unaccent + diccionario 'spanish'.
+# SQLite: tabla virtual FTS5 (rowid = field_field.id) que mantienen las señales.
+PG_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() es STABLE; un índice necesita una función IMMUTABLE
+    """
+    CREATE OR REPLACE FUNCTION gp_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS field_search_gin ON field_field USING gin ((
+        setweight(to_tsvector('spanish'::regconfig, gp_unaccent(coalesce(field_field.name, ''))), 'A') ||
+        setweight(to_tsvector('spanish'::regconfig, gp_unaccent(coalesce(field_field.address, ''))), 'B') ||
+        setweight(to_tsvector('spanish'::regconfig, gp_unaccent(coalesce(field_field.description, ''))), 'C')
+    ))
+    """,
+]
+PG_DROP = [
+    "DROP INDEX IF EXISTS field_search_gin",
+    "DROP FUNCTION IF EXISTS gp_unaccent(text)",
+]
+
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS field_search USING fts5(
+        name, address, description,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO field_search (rowid, name, address, description)
+    SELECT id, name, address, coalesce(description, '') FROM field_field
+    """,
+]
+SQLITE_DROP = [
+    "DROP TABLE IF EXISTS field_search",
+]
+
+
+def _run(pg, sqlite):
+    def op(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        statements = pg if vendor == 'postgresql' else sqlite if vendor == 'sqlite' else []
+        for sql in statements:
+            schema_editor.execute(sql)
+    return op
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0015_field_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(PG_CREATE, SQLITE_CREATE), _run(PG_DROP, SQLITE_DROP)),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0017_field_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='field',
+            name='pricing_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:06
+
+import datetime
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0018_field_pricing_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='field',
+            name='lights_from',
+            field=models.TimeField(default=datetime.time(18, 0), verbose_name='luces desde'),
+        ),
+        migrations.AddField(
+            model_name='field',
+            name='lights_surcharge',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='recargo por luces (S/ por hora)'),
+        ),
+        migrations.CreateModel(
+            name='FieldRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='día')),
+                ('start_time', models.TimeField(verbose_name='desde')),
+                ('end_time', models.TimeField(verbose_name='hasta')),
+                ('price_hour', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='S/ por hora')),
+                ('label', models.CharField(blank=True, max_length=40, verbose_name='franja')),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='field.field')),
+            ],
+            options={
+                'ordering': ['field', 'weekday', 'start_time'],
+                'indexes': [models.Index(fields=['field', 'weekday', 'start_time'], name='fieldrate_field_day_idx')],
+            },
+        ),
+    ]
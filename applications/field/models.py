@@ -1,7 +1,14 @@
-from django.db import models
-from django.core.validators import MinValueValidator
+from datetime import time
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.core.exceptions import ValidationError
-from django.core.files.images import get_image_dimensions
+
+from .geo import encode_geohash
+from .images import check_image_header
+from .storage import album_storage
 
 
 # ---------- Catálogo de equipamiento ----------
@@ -27,6 +34,12 @@ class Equipment(models.Model):
 
 
 # ---------- Cancha ----------
+class FieldQuerySet(models.QuerySet):
+    def with_primary_image(self):
+        """Trae el álbum principal en el mismo JOIN: `primary_image` no hace consultas."""
+        return self.select_related('primary_album')
+
+
 class Field(models.Model):
     owner = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='fields')
     name = models.CharField(max_length=150)
@@ -43,6 +56,21 @@ class Field(models.Model):
     description = models.TextField(blank=True, null=True)
     price_hour = models.DecimalField(max_digits=10, decimal_places=2)
     has_lights = models.BooleanField(default=False)
+    # recargo por hora cuando se usan las luces (solo si has_lights), desde
+    # `lights_from` hasta la medianoche; se suma a la tarifa de la franja
+    lights_surcharge = models.DecimalField('recargo por luces (S/ por hora)', max_digits=10, decimal_places=2,
+                                           default=0, validators=[MinValueValidator(0)])
+    lights_from = models.TimeField('luces desde', default=time(18, 0))
+    # sube cada vez que cambia un precio de la cancha o de sus extras: invalida
+    # las cotizaciones firmadas emitidas antes (ver booking/quotes.py)
+    pricing_version = models.PositiveIntegerField(default=1, editable=False)
+
+    # ubicación (WGS84) y su geohash indexado para "canchas cerca de mí" (ver field/geo.py)
+    latitude = models.FloatField('latitud', null=True, blank=True,
+                                 validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField('longitud', null=True, blank=True,
+                                  validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False, db_index=True)
 
     # relación M2M con tabla intermedia para manejar stock y precio de alquiler
     extra_equipment = models.ManyToManyField(
@@ -52,13 +80,92 @@ class Field(models.Model):
         blank=True,
     )
 
+    # imagen principal desnormalizada (la principal o, si no hay, la primera por orden);
+    # la mantienen las señales de Album, ver services.refresh_primary_album
+    primary_album = models.ForeignKey(
+        'Album',
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name='+',
+    )
+
+    objects = FieldQuerySet.as_manager()
+
+    class Meta:
+        # listado público: filtros + orden por precio con paginación keyset (precio, id)
+        indexes = [
+            models.Index(fields=['price_hour', 'id'], name='field_price_id_idx'),
+            models.Index(fields=['type', 'price_hour', 'id'], name='field_type_price_id_idx'),
+            models.Index(fields=['has_lights', 'price_hour', 'id'], name='field_lights_price_id_idx'),
+        ]
+
     def __str__(self):
         return f'Field {self.id} - {self.name} - Owner {self.owner.nombre}'
 
+    # columnas que definen la tarifa: si alguna cambia sube pricing_version
+    PRICING_FIELDS = ('price_hour', 'has_lights', 'lights_surcharge', 'lights_from')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(name in instance.__dict__ for name in cls.PRICING_FIELDS):
+            instance._loaded_pricing = instance.pricing_terms()
+        return instance
+
+    def pricing_terms(self):
+        return (Decimal(str(self.price_hour)), self.has_lights,
+                Decimal(str(self.lights_surcharge)), self.lights_from)
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_pricing', None)
+        repriced = loaded is not None and self.pricing_terms() != loaded
+        has_point = self.latitude is not None and self.longitude is not None
+        self.geohash = encode_geohash(self.latitude, self.longitude) if has_point else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            update_fields = {*update_fields, 'geohash'}
+        if not self._state.adding:
+            # pricing_version solo se mueve con F() (bump_pricing_version): una
+            # instancia vieja no debe pisar las subidas hechas por otras vías
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [f.name for f in self._meta.concrete_fields
+                                 if not f.primary_key and f.attname not in deferred]
+            update_fields = {*update_fields} - {'pricing_version'}
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        if repriced:
+            self.pricing_version = bump_pricing_version(self.pk)
+        self._loaded_pricing = self.pricing_terms()
+
     @property
     def primary_image(self):
-        primary = self.albums.filter(is_primary=True).first()
-        return primary or self.albums.order_by('sort_order', 'id').first()
+        return self.primary_album if self.primary_album_id else None
+
+
+# versiones subidas en transacciones aún sin confirmar: (field_id, versión)
+_uncommitted_pricing = set()
+
+
+def bump_pricing_version(field_id):
+    """
+    Sube pricing_version en la BD (F() + 1) y devuelve la versión nueva. Hasta
+    que la transacción confirme, esa versión no se cachea (pricing_committed):
+    si se revierte, el mismo número volverá a usarse con otras tarifas.
+    """
+    Field.objects.filter(pk=field_id).update(pricing_version=F('pricing_version') + 1)
+    version = Field.objects.filter(pk=field_id).values_list('pricing_version', flat=True).first()
+    key = (field_id, version)
+    _uncommitted_pricing.add(key)
+    transaction.on_commit(lambda: _uncommitted_pricing.discard(key))
+    return version
+
+
+def pricing_committed(field_id, version):
+    return (field_id, version) not in _uncommitted_pricing
 
 
 # ---------- Equipamiento por cancha (stock + precio alquiler) ----------
@@ -78,6 +185,19 @@ class FieldEquipment(models.Model):
             models.UniqueConstraint(fields=['field', 'equipment'], name='uniq_field_equipment'),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_price = instance.__dict__.get('price_per_unit')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        loaded = getattr(self, '_loaded_price', None)
+        if loaded is not None and Decimal(str(self.price_per_unit)) != loaded:
+            bump_pricing_version(self.field_id)
+        self._loaded_price = Decimal(str(self.price_per_unit))
+
     def __str__(self):
         return (
             f'{self.field.name} · {self.equipment.get_type_display()} · '
@@ -85,12 +205,70 @@ class FieldEquipment(models.Model):
         )
 
 
+# ---------- Tarifas por franja horaria ----------
+class FieldRate(models.Model):
+    """
+    Precio por hora de la cancha en una franja de un día de la semana; fuera
+    de las franjas rige Field.price_hour. Se compila con las demás en una tabla
+    por minuto de la semana (ver booking/rates.py).
+    """
+    WEEKDAY_CHOICES = (
+        (0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'),
+        (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo'),
+    )
+    field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='rates')
+    weekday = models.PositiveSmallIntegerField('día', choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField('desde')
+    # 00:00 = hasta la medianoche
+    end_time = models.TimeField('hasta')
+    price_hour = models.DecimalField('S/ por hora', max_digits=10, decimal_places=2,
+                                     validators=[MinValueValidator(0)])
+    # nombre de la franja en los reportes (p.ej. "Hora punta"); las franjas con
+    # el mismo nombre se suman juntas
+    label = models.CharField('franja', max_length=40, blank=True)
+
+    class Meta:
+        ordering = ['field', 'weekday', 'start_time']
+        indexes = [models.Index(fields=['field', 'weekday', 'start_time'], name='fieldrate_field_day_idx')]
+
+    def __str__(self):
+        return f'{self.get_weekday_display()} {self.start_time:%H:%M}-{self.end_time:%H:%M} · S/ {self.price_hour}'
+
+    @property
+    def band(self):
+        return self.label or f'S/ {self.price_hour}/h'
+
+    @property
+    def minutes(self):
+        """(minuto inicial, minuto final) dentro del día."""
+        end = self.end_time.hour * 60 + self.end_time.minute
+        return self.start_time.hour * 60 + self.start_time.minute, end or 24 * 60
+
+    def clean(self):
+        super().clean()
+        if self.start_time is None or self.end_time is None:
+            return
+        m0, m1 = self.minutes
+        if m0 >= m1:
+            raise ValidationError({'end_time': 'La franja debe terminar después de empezar.'})
+        if self.field_id:
+            others = FieldRate.objects.filter(field_id=self.field_id, weekday=self.weekday).exclude(pk=self.pk)
+            for other in others:
+                o0, o1 = other.minutes
+                if o0 < m1 and m0 < o1:
+                    raise ValidationError(f'Se cruza con la franja {other}.')
+
+
 # ---------- Álbum de imágenes ----------
 class Album(models.Model):
     field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='albums')
-    image = models.ImageField(upload_to='field_albums/')  # se servirá en /media/field_albums/
+    # se servirá en /media/field_albums/ab/<sha256>.ext (ver field/storage.py)
+    image = models.ImageField(upload_to='field_albums/', storage=album_storage)
     is_primary = models.BooleanField(default=False, help_text="Marca esta imagen como la principal del campo.")
     sort_order = models.PositiveIntegerField(default=0, help_text="Orden de la imagen en el álbum.")
+    # versiones redimensionadas (thumb/card/hero en JPEG y WebP), ver field/images.py;
+    # 'source' es el nombre de la imagen original con la que se generaron
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ['sort_order']
@@ -106,24 +284,53 @@ class Album(models.Model):
     def __str__(self):
         return f'Album {self.id} - Field {self.field.name} - Primary {self.is_primary}'
 
+    # ---- versiones para templates (si aún no existen se usa el original) ----
+    def has_variants(self):
+        return bool(self.image) and (self.variants or {}).get('source') == self.image.name
+
+    def variant_url(self, name, fmt='jpeg'):
+        if self.has_variants() and self.variants.get(name, {}).get(fmt):
+            return self.image.storage.url(self.variants[name][fmt])
+        return self.image.url if self.image else ''
+
+    def srcset(self, fmt='jpeg'):
+        """'url 160w, url 480w, url 1280w' (vacío si no hay versiones)."""
+        if not self.has_variants():
+            return ''
+        entries = []
+        for name in ('thumb', 'card', 'hero'):
+            v = self.variants.get(name) or {}
+            if v.get(fmt):
+                entries.append(f"{self.image.storage.url(v[fmt])} {v['width']}w")
+        return ', '.join(entries)
+
+    @property
+    def thumb_url(self):
+        return self.variant_url('thumb')
+
+    @property
+    def card_url(self):
+        return self.variant_url('card')
+
+    @property
+    def hero_url(self):
+        return self.variant_url('hero')
+
+    @property
+    def jpeg_srcset(self):
+        return self.srcset('jpeg')
+
+    @property
+    def webp_srcset(self):
+        return self.srcset('webp')
+
     def clean(self):
         super().clean()
         if not self.image:
             return
 
-        # Validaciones de imagen (dimensiones/peso)
-        min_w, min_h = 1024, 768
-        max_w, max_h = 4096, 4096
-        max_size_mb = 4
-
-        size_mb = (self.image.size or 0) / (1024 * 1024)
-        if size_mb > max_size_mb:
-            raise ValidationError({'image': f'La imagen pesa {size_mb:.2f}MB; máximo {max_size_mb}MB.'})
-
-        w, h = get_image_dimensions(self.image)
-        if w is None or h is None:
-            raise ValidationError({'image': 'No se pudieron obtener las dimensiones.'})
-        if w < min_w or h < min_h:
-            raise ValidationError({'image': f'Mínimo {min_w}×{min_h}px. Subiste {w}×{h}px.'})
-        if w > max_w or h > max_h:
-            raise ValidationError({'image': f'Máximo {max_w}×{max_h}px. Subiste {w}×{h}px.'})
+        # Validaciones de imagen (dimensiones/peso/formato) leyendo solo la cabecera
+        try:
+            check_image_header(self.image)
+        except ValidationError as e:
+            raise ValidationError({'image': e.messages})
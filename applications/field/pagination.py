@@ -0,0 +1,78 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(tag, values):
+    """Cursor opaco para la URL: base64 de {'t': orden, 'v': valores de la última fila}."""
+    raw = json.dumps({'t': tag, 'v': values}, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, tag):
+    """Valores del cursor, o None si falta, está corrupto o es de otro orden (=> primera página)."""
+    if not token:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('t') != tag or not isinstance(data.get('v'), list):
+        return None
+    return data['v']
+
+
+def _after(keys, values):
+    """
+    Q de "filas después de `values`" para un orden compuesto:
+    (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...  (con < en las claves descendentes).
+    """
+    clauses = []
+    for i, (name, desc) in enumerate(keys):
+        equal = {prev: values[j] for j, (prev, _) in enumerate(keys[:i])}
+        clauses.append(Q(**equal, **{f'{name}__{"lt" if desc else "gt"}': values[i]}))
+    return reduce(or_, clauses)
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str | None
+    is_first: bool
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def keyset_paginate(qs, keys, cursor=None, per_page=10, tag=''):
+    """
+    Paginación por cursor (keyset): en lugar de OFFSET se filtra por
+    "después de la última fila vista", así cualquier página cuesta lo mismo
+    usando el índice de las claves. `keys` = [('price_hour', False), ('id', False)],
+    con desc=True para orden descendente; la última clave debe ser única.
+    """
+    values = decode_cursor(cursor, tag)
+    if values is not None and len(values) == len(keys):
+        try:
+            qs = qs.filter(_after(keys, values))
+        except (ValidationError, ValueError, TypeError):
+            # cursor manipulado con valores que no son del tipo de la columna
+            values = None
+    else:
+        values = None
+    qs = qs.order_by(*[f'-{name}' if desc else name for name, desc in keys])
+
+    rows = list(qs[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(tag, [getattr(last, name) for name, _ in keys])
+    return KeysetPage(rows, next_cursor, is_first=values is None)
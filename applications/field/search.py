@@ -0,0 +1,78 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+# ---------- PostgreSQL: índice GIN sobre un tsvector por expresión ----------
+# Debe coincidir con la expresión del índice de la migración 0016_field_search
+# para que el planner lo use. gp_unaccent es un envoltorio IMMUTABLE de unaccent.
+PG_VECTOR = (
+    "setweight(to_tsvector('spanish'::regconfig, gp_unaccent(coalesce(field_field.name, ''))), 'A') || "
+    "setweight(to_tsvector('spanish'::regconfig, gp_unaccent(coalesce(field_field.address, ''))), 'B') || "
+    "setweight(to_tsvector('spanish'::regconfig, gp_unaccent(coalesce(field_field.description, ''))), 'C')"
+)
+PG_QUERY = "websearch_to_tsquery('spanish'::regconfig, gp_unaccent(%s))"
+
+# ---------- SQLite: tabla sombra FTS5 (rowid = Field.id) ----------
+FTS_TABLE = 'field_search'
+# pesos bm25 por columna: name, address, description
+FTS_WEIGHTS = '10.0, 4.0, 1.0'
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_query(text):
+    """Texto libre -> consulta FTS5 segura: cada palabra como prefijo, todas requeridas."""
+    return ' '.join(f'"{w}"*' for w in _WORD.findall(text))
+
+
+def full_text_search(qs, text):
+    """
+    Filtra `qs` (de Field) por `text` en nombre, dirección y descripción,
+    anota `search_rank` y ordena por relevancia. Todo ocurre en la BD usando
+    el índice de búsqueda, así se puede paginar encima.
+    """
+    text = (text or '').strip()
+    if not text:
+        return qs
+
+    if connection.vendor == 'postgresql':
+        match = RawSQL(f"({PG_VECTOR}) @@ {PG_QUERY}", [text], output_field=BooleanField())
+        rank = RawSQL(f"ts_rank_cd({PG_VECTOR}, {PG_QUERY})", [text], output_field=FloatField())
+        return qs.filter(match).annotate(search_rank=rank).order_by('-search_rank', 'id')
+
+    query = fts_query(text)
+    if not query:
+        return qs.none()
+    match = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query])
+    # bm25 es menor cuanto más relevante: se invierte para ordenar igual que en PG
+    rank = RawSQL(
+        f"SELECT -bm25({FTS_TABLE}, {FTS_WEIGHTS}) FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND rowid = field_field.id",
+        [query], output_field=FloatField(),
+    )
+    return qs.filter(Q(pk__in=match)).annotate(search_rank=rank).order_by('-search_rank', 'id')
+
+
+# ---------- sincronización de la tabla FTS5 (solo SQLite) ----------
+def uses_shadow_table():
+    return connection.vendor == 'sqlite'
+
+
+def index_field(field):
+    if not uses_shadow_table():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [field.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, address, description) VALUES (%s, %s, %s, %s)",
+            [field.pk, field.name, field.address, field.description or ''],
+        )
+
+
+def unindex_field(field_id):
+    if not uses_shadow_table():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [field_id])
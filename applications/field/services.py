@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef
+
+from applications.booking.intervals import ACTIVE_STATUSES
+from applications.booking.models import Booking
+from applications.scheduling.services import closed_fields
+
+from .geo import haversine_km, nearby_q
+from .images import VARIANTS_DIR, check_image_header, schedule_variants
+from .models import Field, Album, FieldEquipment
+
+# Hilos para validar y escribir en disco las fotos de una misma subida
+UPLOAD_WORKERS = 8
+
+
+def refresh_primary_album(field_id):
+    """Recalcula Field.primary_album: la imagen marcada como principal o la primera por orden."""
+    album_id = (
+        Album.objects.filter(field_id=field_id)
+        .order_by('-is_primary', 'sort_order', 'id')
+        .values_list('id', flat=True)
+        .first()
+    )
+    Field.objects.filter(pk=field_id).update(primary_album_id=album_id)
+    return album_id
+
+
+# orden del listado -> claves del keyset (la última es única)
+LISTING_ORDERS = {
+    '': [('id', True)],  # más recientes primero
+    'price': [('price_hour', False), ('id', False)],
+    '-price': [('price_hour', True), ('id', True)],
+}
+
+
+def filter_fields(qs, filters):
+    """
+    Aplica los filtros del listado (ver FieldFilterForm). Todos son columnas de
+    Field indexadas salvo el equipamiento, que es un EXISTS por la clave única
+    (field, equipment) de FieldEquipment: no duplica filas ni recorre la tabla.
+    Con `window` = (inicio, fin) solo quedan las canchas sin reservas activas
+    solapadas (un NOT EXISTS sobre el índice (field, start, end, status) de
+    Booking) y abiertas toda la ventana según su calendario (SlotCalendar).
+    """
+    if filters.get('kword'):
+        qs = qs.filter(type=filters['kword'])
+    if filters.get('price_min') is not None:
+        qs = qs.filter(price_hour__gte=filters['price_min'])
+    if filters.get('price_max') is not None:
+        qs = qs.filter(price_hour__lte=filters['price_max'])
+    if filters.get('has_lights') is not None:
+        qs = qs.filter(has_lights=filters['has_lights'])
+
+    window = filters.get('window')
+    if window:
+        start, end = window
+        qs = qs.filter(~Exists(Booking.objects.filter(
+            field=OuterRef('pk'), status__in=ACTIVE_STATUSES, start__lt=end, end__gt=start,
+        )))
+        closed = closed_fields(qs, start, end)
+        if closed:
+            qs = qs.exclude(pk__in=closed)
+    if filters.get('equipment'):
+        # los extras solo se reservan junto con la cancha: si pasó el NOT EXISTS
+        # anterior, en esa ventana está libre todo su stock físico
+        qs = qs.filter(Exists(FieldEquipment.objects.filter(
+            field=OuterRef('pk'),
+            equipment__type=filters['equipment'],
+            stock__gte=filters.get('equipment_qty') or 1,
+        )))
+    return qs
+
+
+def nearby_fields(lat, lng, radius_km=5, limit=20):
+    """
+    Las `limit` canchas más cercanas a (lat, lng) dentro de `radius_km`, ordenadas
+    por distancia. La BD solo devuelve los candidatos de la caja (índice de geohash);
+    la distancia exacta se calcula aquí sobre esos pocos. Devuelve [(field, km), ...].
+    """
+    candidates = list(
+        Field.objects.with_primary_image()
+        .filter(nearby_q(lat, lng, radius_km))
+    )
+    distances = haversine_km(lat, lng, [(f.latitude, f.longitude) for f in candidates])
+    ranked = sorted(
+        ((f, d) for f, d in zip(candidates, distances) if d <= radius_km),
+        key=lambda pair: (pair[1], pair[0].id),
+    )
+    return ranked[:limit]
+
+
+def _accept_upload(image_field, instance, f):
+    """Valida la cabecera y guarda el archivo. Devuelve (nombre en storage, None) o (None, error)."""
+    try:
+        check_image_header(f)
+    except ValidationError as e:
+        return None, f'{f.name}: {" ".join(e.messages)}'
+    f.seek(0)
+    name = image_field.generate_filename(instance, f.name)
+    return image_field.storage.save(name, f, max_length=image_field.max_length), None
+
+
+def add_album_images(field, files):
+    """
+    Sube varias fotos al álbum de `field` en una sola operación:
+    valida cabeceras y escribe los archivos en paralelo (I/O, sin decodificar
+    píxeles), inserta todas las aceptadas con un bulk_create continuando el
+    sort_order y agenda sus versiones. Devuelve (albums creados, errores).
+    """
+    files = list(files)
+    if not files:
+        return [], []
+
+    image_field = Album._meta.get_field('image')
+    probe = Album(field=field)
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(files))) as pool:
+        # map conserva el orden de subida
+        results = list(pool.map(lambda f: _accept_upload(image_field, probe, f), files))
+
+    names = [name for name, _ in results if name]
+    errors = [err for _, err in results if err]
+    if not names:
+        return [], errors
+
+    with transaction.atomic():
+        last = Album.objects.filter(field=field).aggregate(m=Max('sort_order'))['m']
+        start = 0 if last is None else last + 1
+        albums = Album.objects.bulk_create([
+            Album(field=field, image=name, sort_order=start + i) for i, name in enumerate(names)
+        ])
+        # bulk_create no dispara señales: mantener lo que ellas hacen
+        refresh_primary_album(field.pk)
+        for album in albums:
+            transaction.on_commit(lambda a=album: schedule_variants(a))
+    return albums, errors
+
+
+def album_image_refcounts():
+    """{archivo original: nº de Album que lo usan}; con storage por hash varios comparten archivo."""
+    return dict(
+        Album.objects.exclude(image='')
+        .values('image')
+        .annotate(refs=Count('id'))
+        .values_list('image', 'refs')
+    )
+
+
+def referenced_album_files():
+    """Originales y versiones que usa algún Album (todo lo demás en field_albums/ es huérfano)."""
+    names = set(album_image_refcounts())
+    for variants in Album.objects.exclude(variants={}).values_list('variants', flat=True).iterator():
+        for entry in variants.values():
+            if isinstance(entry, dict):
+                names.update(path for key, path in entry.items() if key != 'width')
+    return names
+
+
+def album_file_referenced(name):
+    """
+    Re-chequeo de un solo archivo justo antes de borrarlo (una consulta): un
+    original lo usa algún Album; una versión, algún Album de su original.
+    """
+    head, sep, tail = name.rpartition(f'/{VARIANTS_DIR}/')
+    if sep:
+        stem = tail.rsplit('_', 1)[0]
+        return Album.objects.filter(image__startswith=f'{head}/{stem}.').exists()
+    return Album.objects.filter(image=name).exists()
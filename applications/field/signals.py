@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Album, Field, FieldRate, bump_pricing_version
+from .images import schedule_variants
+from .search import index_field, unindex_field
+from .services import refresh_primary_album
+
+
+@receiver(post_save, sender=Album)
+@receiver(post_delete, sender=Album)
+def album_changed(sender, instance, **kwargs):
+    """Cualquier alta/cambio/baja de una imagen puede cambiar la principal de su cancha."""
+    refresh_primary_album(instance.field_id)
+
+
+@receiver(post_save, sender=Album)
+def album_variants(sender, instance, **kwargs):
+    """Genera las versiones cuando la imagen es nueva o cambió (tras el commit)."""
+    if instance.image and not instance.has_variants():
+        transaction.on_commit(lambda: schedule_variants(instance))
+
+
+@receiver(post_save, sender=Field)
+def field_saved(sender, instance, **kwargs):
+    """Mantiene la tabla de búsqueda FTS5 (solo SQLite; en PostgreSQL el índice es de la tabla)."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not {'name', 'address', 'description'} & set(update_fields):
+        return
+    index_field(instance)
+
+
+@receiver(post_delete, sender=Field)
+def field_deleted(sender, instance, **kwargs):
+    unindex_field(instance.pk)
+
+
+@receiver(post_save, sender=FieldRate)
+@receiver(post_delete, sender=FieldRate)
+def field_rate_changed(sender, instance, **kwargs):
+    """Una franja nueva, editada o borrada cambia la tarifa: invalida cotizaciones y la tabla compilada."""
+    bump_pricing_version(instance.field_id)
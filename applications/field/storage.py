@@ -0,0 +1,58 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK = 64 * 1024
+
+
+def content_hash(content):
+    """sha256 del archivo leído por bloques (deja el puntero al inicio)."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(HASH_CHUNK), b''):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """
+    Guarda cada archivo por su contenido: `field_albums/ab/<sha256>.jpg`.
+    Si el hash ya existe no se vuelve a escribir, así las fotos repetidas
+    comparten un único archivo. Como la URL cambia cuando cambia el contenido,
+    se puede servir con caché de larga duración. Los archivos que ya no usa
+    ningún Album los borra `manage.py gc_album_images`.
+    """
+
+    def __init__(self, **kwargs):
+        # mismo nombre = mismo contenido: sobrescribir (carreras entre dos
+        # subidas de la misma foto) es inofensivo y evita sufijos aleatorios
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def hashed_name(self, name, content):
+        dirname, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        digest = content_hash(content)
+        return os.path.join(dirname, digest[:2], f'{digest}{ext}').replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # subida repetida: se renueva el mtime para que gc_album_images
+            # no lo tome por huérfano viejo mientras se crea su Album
+            try:
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass  # lo borró el GC entre medio: se vuelve a escribir
+        return super().save(name, content, max_length=max_length)
+
+
+album_storage = HashedFileSystemStorage()
@@ -1,3 +1,312 @@
-from django.test import TestCase
+import io
+import math
+import os
+import shutil
+import tempfile
+from datetime import datetime, time, timedelta
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from applications.users.models import User, UserRole
+from applications.booking.models import Booking, BookingStatus
+from applications.field.models import Album, Equipment, Field, FieldEquipment
+from applications.field.geo import encode_geohash
+from applications.field.search import full_text_search
+from applications.field.services import add_album_images, album_image_refcounts, nearby_fields
+from applications.field.storage import HashedFileSystemStorage
+
+
+class PrimaryAlbumTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+        self.field = Field.objects.create(owner=self.owner, name="C1", type="futbol", address="X", price_hour=50)
+
+    def test_pointer_follows_album_changes(self):
+        self.assertIsNone(Field.objects.get(pk=self.field.pk).primary_image)
+        second = Album.objects.create(field=self.field, image="field_albums/b.jpg", sort_order=2)
+        first = Album.objects.create(field=self.field, image="field_albums/a.jpg", sort_order=1)
+        self.assertEqual(Field.objects.get(pk=self.field.pk).primary_album_id, first.id)
+
+        second.is_primary = True
+        second.save()
+        self.assertEqual(Field.objects.get(pk=self.field.pk).primary_album_id, second.id)
+
+        second.delete()
+        self.assertEqual(Field.objects.get(pk=self.field.pk).primary_album_id, first.id)
+
+    def test_listing_resolves_images_without_extra_queries(self):
+        for i in range(3):
+            f = Field.objects.create(owner=self.owner, name=f"C{i}", type="futbol", address="X", price_hour=50)
+            Album.objects.create(field=f, image=f"field_albums/{i}.jpg")
+        fields = list(Field.objects.with_primary_image())
+        with self.assertNumQueries(0):
+            urls = [f.primary_image.image.url for f in fields if f.primary_image]
+        self.assertEqual(len(urls), 3)
+
+
+class AlbumVariantsTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.owner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+        self.field = Field.objects.create(owner=self.owner, name="C1", type="futbol", address="X", price_hour=50)
+
+    def upload(self, size=(2000, 1500)):
+        buf = io.BytesIO()
+        Image.new('RGB', size, (30, 120, 60)).save(buf, 'JPEG')
+        return SimpleUploadedFile('foto.jpg', buf.getvalue(), content_type='image/jpeg')
+
+    def test_variants_generated_after_commit(self):
+        with override_settings(MEDIA_ROOT=self.media, GP_IMAGE_WORKERS=0):
+            with self.captureOnCommitCallbacks(execute=True):
+                album = Album.objects.create(field=self.field, image=self.upload())
+            album.refresh_from_db()
+
+            self.assertTrue(album.has_variants())
+            self.assertEqual([album.variants[n]['width'] for n in ('thumb', 'card', 'hero')], [160, 480, 1280])
+            for fmt in ('jpeg', 'webp'):
+                with Image.open(os.path.join(self.media, album.variants['card'][fmt])) as im:
+                    self.assertEqual(im.size, (480, 360))
+            self.assertIn('_thumb.webp 160w', album.webp_srcset)
+            self.assertTrue(album.card_url.endswith('_card.jpg'))
+
+    def test_small_image_is_not_upscaled(self):
+        with override_settings(MEDIA_ROOT=self.media, GP_IMAGE_WORKERS=0):
+            with self.captureOnCommitCallbacks(execute=True):
+                album = Album.objects.create(field=self.field, image=self.upload((400, 300)))
+            album.refresh_from_db()
+            self.assertEqual(album.variants['hero']['width'], 400)
+
+    def test_falls_back_to_original_until_ready(self):
+        album = Album.objects.create(field=self.field, image="field_albums/a.jpg")
+        self.assertFalse(album.has_variants())
+        self.assertEqual(album.thumb_url, album.image.url)
+        self.assertEqual(album.webp_srcset, '')
+
+
+class AlbumBatchUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        owner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+        self.field = Field.objects.create(owner=owner, name="C1", type="futbol", address="X", price_hour=50)
+
+    def jpeg(self, name, size=(1024, 768)):
+        buf = io.BytesIO()
+        Image.new('RGB', size).save(buf, 'JPEG')
+        return SimpleUploadedFile(name, buf.getvalue(), content_type='image/jpeg')
+
+    def test_valid_files_inserted_in_bulk_and_rejects_reported(self):
+        Album.objects.create(field=self.field, image="field_albums/old.jpg", sort_order=4)
+        files = [
+            self.jpeg('a.jpg'),
+            self.jpeg('chica.jpg', (800, 600)),
+            SimpleUploadedFile('roto.jpg', b'no es una imagen'),
+            self.jpeg('b.jpg', (1600, 1200)),
+        ]
+        with override_settings(MEDIA_ROOT=self.media):
+            albums, errors = add_album_images(self.field, files)
+
+        self.assertEqual([a.sort_order for a in albums], [5, 6])
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(errors[0].startswith('chica.jpg: Mínimo 1024×768px'))
+        self.assertEqual(self.field.albums.count(), 3)
+        for a in albums:
+            self.assertTrue(os.path.exists(os.path.join(self.media, a.image.name)))
+        # la principal sigue siendo la primera por orden (bulk_create no dispara señales)
+        self.assertEqual(Field.objects.get(pk=self.field.pk).primary_image.image.name, "field_albums/old.jpg")
+
+    def test_clean_uses_header_check(self):
+        with override_settings(MEDIA_ROOT=self.media):
+            album = Album(field=self.field, image=self.jpeg('chica.jpg', (640, 480)))
+            with self.assertRaisesMessage(ValidationError, 'Mínimo 1024×768px'):
+                album.clean()
+
+
+class HashedStorageTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        owner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+        self.field = Field.objects.create(owner=owner, name="C1", type="futbol", address="X", price_hour=50)
+        buf = io.BytesIO()
+        Image.new('RGB', (1024, 768), (200, 10, 10)).save(buf, 'JPEG')
+        self.data = buf.getvalue()
+
+    def test_same_content_shares_one_file_and_gc_removes_orphans(self):
+        with override_settings(MEDIA_ROOT=self.media, GP_IMAGE_WORKERS=0):
+            with self.captureOnCommitCallbacks(execute=True):
+                albums, _ = add_album_images(self.field, [
+                    SimpleUploadedFile('IMG_001.JPG', self.data),
+                    SimpleUploadedFile('copia.jpg', self.data),
+                ])
+            first, second = albums
+            self.assertEqual(first.image.name, second.image.name)
+            self.assertRegex(first.image.name, r'^field_albums/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+            self.assertEqual(album_image_refcounts(), {first.image.name: 2})
+
+            first.delete()
+            call_command('gc_album_images', '--min-age', '0', stdout=io.StringIO())
+            self.assertTrue(os.path.exists(os.path.join(self.media, second.image.name)))
+
+            second.refresh_from_db()
+            variant = os.path.join(self.media, second.variants['thumb']['webp'])
+            self.assertTrue(os.path.exists(variant))
+            second.delete()
+            call_command('gc_album_images', '--min-age', '0', stdout=io.StringIO())
+            self.assertFalse(os.path.exists(os.path.join(self.media, second.image.name)))
+            self.assertFalse(os.path.exists(variant))
+
+    def test_reupload_refreshes_mtime_so_gc_keeps_it(self):
+        with override_settings(MEDIA_ROOT=self.media):
+            storage = HashedFileSystemStorage()
+            name = storage.save('field_albums/a.jpg', SimpleUploadedFile('a.jpg', self.data))
+            path = storage.path(name)
+            os.utime(path, (0, 0))
+            self.assertEqual(storage.save('field_albums/b.jpg', SimpleUploadedFile('b.jpg', self.data)), name)
+            self.assertGreater(os.path.getmtime(path), timezone.now().timestamp() - 60)
+            call_command('gc_album_images', stdout=io.StringIO())
+            self.assertTrue(os.path.exists(path))
+
+
+class FieldListingTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+        # precios repetidos para ejercitar el desempate por id
+        prices = [40, 60, 40, 80, 50, 60, 40, 90, 70, 50, 60, 30]
+        self.fields = [
+            Field.objects.create(owner=owner, name=f"C{i}", type="futbol" if i % 2 else "tenis",
+                                 address="X", price_hour=p, has_lights=i % 3 == 0)
+            for i, p in enumerate(prices)
+        ]
+        chalecos = Equipment.objects.create(type='chalecos')
+        FieldEquipment.objects.create(field=self.fields[1], equipment=chalecos, stock=5)
+        FieldEquipment.objects.create(field=self.fields[2], equipment=chalecos, stock=0)
+
+    def walk(self, **params):
+        """Recorre todas las páginas siguiendo el cursor; devuelve los ids en orden."""
+        ids, cursor = [], None
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            resp = self.client.get(reverse('field:list'), query)
+            page = resp.context['page_obj']
+            ids += [f.id for f in page.object_list]
+            if not page.has_next:
+                return ids
+            cursor = page.next_cursor
+
+    def test_price_sort_pages_through_ties(self):
+        expected = [f.id for f in sorted(self.fields, key=lambda f: (f.price_hour, f.id))]
+        self.assertEqual(self.walk(sort='price'), expected)
+        expected_desc = [f.id for f in sorted(self.fields, key=lambda f: (f.price_hour, f.id), reverse=True)]
+        self.assertEqual(self.walk(sort='-price'), expected_desc)
+
+    def test_filters_compose(self):
+        ids = self.walk(kword='futbol', price_min='50', price_max='70')
+        # sin `sort`: más recientes primero
+        self.assertEqual(ids, [f.id for f in reversed(self.fields)
+                               if f.type == 'futbol' and 50 <= f.price_hour <= 70])
+        self.assertEqual(self.walk(has_lights='true'), [f.id for f in reversed(self.fields) if f.has_lights])
+        # solo cuenta equipamiento con stock
+        self.assertEqual(self.walk(equipment='chalecos'), [self.fields[1].id])
+
+    def test_free_window_is_an_anti_join(self):
+        day = timezone.localdate() + timedelta(days=1)
+        tz = timezone.get_current_timezone()
+        at = lambda h, m=0: timezone.make_aware(datetime.combine(day, time(h, m)), tz)
+        user = self.fields[0].owner
+        Booking.objects.create(user=user, field=self.fields[1], start=at(19), end=at(20),
+                               status=BookingStatus.CONFIRMED)
+        Booking.objects.create(user=user, field=self.fields[3], start=at(20), end=at(21),
+                               status=BookingStatus.PENDING)
+        Booking.objects.create(user=user, field=self.fields[5], start=at(19), end=at(21),
+                               status=BookingStatus.CANCELED)
+
+        window = {'date': day.isoformat(), 'time_from': '19:30', 'time_to': '20:30'}
+        expected = [f.id for i, f in enumerate(self.fields) if i not in (1, 3)]
+        self.assertEqual(self.walk(**window), expected[::-1])
+        # back-to-back no es solape
+        self.assertIn(self.fields[3].id, self.walk(date=day.isoformat(), time_from='18:00', time_to='20:00'))
+        # combinado con tipo y equipamiento (fields[1] tiene chalecos pero está ocupada)
+        self.assertEqual(self.walk(equipment='chalecos', **window), [])
+        FieldEquipment.objects.create(field=self.fields[4], equipment=Equipment.objects.get(type='chalecos'), stock=2)
+        self.assertEqual(self.walk(equipment='chalecos', equipment_qty='2', **window), [self.fields[4].id])
+        self.assertEqual(self.walk(equipment='chalecos', equipment_qty='6'), [])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        resp = self.client.get(reverse('field:list'), {'cursor': 'basura', 'sort': 'price'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.context['page_obj'].is_first)
+
+
+class FieldSearchTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+        self.by_name = Field.objects.create(owner=owner, name="Sintética Miraflores", type="futbol",
+                                            address="Av. Larco 100", price_hour=50)
+        self.by_desc = Field.objects.create(owner=owner, name="La Bombonera", type="futbol",
+                                            address="Jr. Pérez 12", price_hour=40,
+                                            description="Grass sintético cerca a Miraflores")
+        self.other = Field.objects.create(owner=owner, name="Coliseo", type="basket",
+                                          address="Surco", price_hour=30)
+
+    def search(self, text):
+        return list(full_text_search(Field.objects.all(), text).values_list('id', flat=True))
+
+    def test_accent_insensitive_prefix_and_ranked(self):
+        self.assertEqual(self.search("miraflores"), [self.by_name.id, self.by_desc.id])
+        self.assertEqual(self.search("perez"), [self.by_desc.id])
+        self.assertEqual(self.search("sintet"), [self.by_name.id, self.by_desc.id])
+        self.assertEqual(self.search('"; DROP'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.other.description = "Techada, con graderías"
+        self.other.save()
+        self.assertEqual(self.search("graderias"), [self.other.id])
+        self.other.delete()
+        self.assertEqual(self.search("graderias"), [])
+
+    def test_listing_search_param(self):
+        resp = self.client.get(reverse('field:list'), {'q': 'bombonera'})
+        self.assertEqual([f.id for f in resp.context['listado_fields']], [self.by_desc.id])
+
+
+class NearbyFieldsTests(TestCase):
+    ORIGIN = (-12.1211, -77.0297)
+
+    def setUp(self):
+        owner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+
+        def at(name, north_km, east_km=0.0):
+            lat = self.ORIGIN[0] + north_km / 111.32
+            lng = self.ORIGIN[1] + east_km / (111.32 * math.cos(math.radians(self.ORIGIN[0])))
+            return Field.objects.create(owner=owner, name=name, type="futbol", address="X",
+                                        price_hour=50, latitude=lat, longitude=lng)
+
+        self.near = at("Cerca", 0.5)
+        self.mid = at("Media", -2.0, 2.0)
+        self.far = at("Lejos", 10.0)
+        Field.objects.create(owner=owner, name="Sin ubicación", type="futbol", address="X", price_hour=50)
+
+    def test_geohash_encoding(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(self.near.geohash, encode_geohash(self.near.latitude, self.near.longitude))
+
+    def test_nearest_within_radius_sorted_by_distance(self):
+        ranked = nearby_fields(*self.ORIGIN, radius_km=5)
+        self.assertEqual([f.id for f, _ in ranked], [self.near.id, self.mid.id])
+        self.assertAlmostEqual(ranked[0][1], 0.5, places=2)
+        self.assertAlmostEqual(ranked[1][1], 2 * math.sqrt(2), places=1)
+        self.assertEqual([f.id for f, _ in nearby_fields(*self.ORIGIN, radius_km=20, limit=1)], [self.near.id])
+
+    def test_endpoint(self):
+        url = reverse('field:nearby')
+        resp = self.client.get(url, {'lat': self.ORIGIN[0], 'lng': self.ORIGIN[1], 'radius': 15})
+        self.assertEqual([r['id'] for r in resp.json()['results']], [self.near.id, self.mid.id, self.far.id])
+        self.assertEqual(self.client.get(url, {'lat': 'x', 'lng': 1}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'lat': 0, 'lng': 0, 'radius': 500}).status_code, 400)
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import indexView, fieldCreateCreateView
+from .views import indexView, fieldCreateCreateView, nearby_view
 
 app_name = 'field'
 
 urlpatterns = [
     path('', indexView.as_view(), name='list'),
     path('create/', fieldCreateCreateView.as_view(), name='create'),         
+    path('cerca/', nearby_view, name='nearby'),
 ]
\ No newline at end of file
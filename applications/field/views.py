@@ -1,23 +1,62 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 from django.views.generic import ListView, CreateView
 from applications.field.models import Field
+from .forms import FieldFilterForm
+from .pagination import keyset_paginate
+from .search import full_text_search
+from .services import LISTING_ORDERS, filter_fields, nearby_fields
+
+MAX_NEARBY_RADIUS_KM = 50
+MAX_NEARBY_RESULTS = 50
 
 class indexView(ListView):
     template_name = 'field/field.html'
     model = Field
-    paginate_by = 10
-    ordering = 'id'                     # <- correcto
+    paginate_by = 10                    # tamaño de página del keyset (no OFFSET)
     context_object_name = 'listado_fields'
 
+    def get_filters(self):
+        if not hasattr(self, '_filters'):
+            self.filter_form = FieldFilterForm(self.request.GET)
+            self._filters = self.filter_form.filters()
+        return self._filters
+
     def get_queryset(self):
-        kword = self.request.GET.get('kword', '')
-        qs = super().get_queryset()
-        if kword:
-            qs = qs.filter(type=kword)
+        filters = self.get_filters()
+        qs = filter_fields(Field.objects.with_primary_image(), filters)
+        if filters.get('q'):
+            # ordenado por relevancia dentro de la BD
+            qs = full_text_search(qs, filters['q'])
         return qs
 
+    def paginate_queryset(self, queryset, page_size):
+        if self.get_filters().get('q'):
+            # resultados por relevancia (acotados): paginación clásica ?page=N
+            return super().paginate_queryset(queryset, page_size)
+        # paginación por cursor: ?cursor=... en lugar de ?page=N
+        sort = self.get_filters().get('sort', '')
+        page = keyset_paginate(
+            queryset, LISTING_ORDERS[sort],
+            cursor=self.request.GET.get('cursor'), per_page=page_size, tag=sort or '-id',
+        )
+        return None, page, page.object_list, page.has_next or not page.is_first
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx['selected_type'] = self.request.GET.get('kword', '')
+        filters = self.get_filters()
+        ctx['filter_form'] = self.filter_form
+        ctx['filters_active'] = any(k not in ('sort', 'q') for k in filters)
+        ctx['search_query'] = filters.get('q', '')
+        page = ctx.get('page_obj')
+        if ctx.get('is_paginated'):
+            if ctx['paginator'] is None:
+                ctx['on_first_page'] = page.is_first
+                ctx['next_cursor'] = page.next_cursor
+            else:
+                ctx['on_first_page'] = page.number == 1
+                ctx['next_page'] = page.next_page_number() if page.has_next() else None
+        ctx['selected_type'] = filters.get('kword', '')
         ctx['type_choices'] = Field._meta.get_field('type').choices
         return ctx
 
@@ -25,4 +64,43 @@ class fieldCreateCreateView(CreateView):
     model = Field
     template_name = "field_create.html"
     fields = ['name', 'type', 'address', 'description', 'price_hour', 'has_lights', 'extra_equipment']
-    success_url = '/scheduling/'
\ No newline at end of file
+    success_url = '/scheduling/'
+
+
+@require_GET
+def nearby_view(request):
+    """
+    Canchas cercanas (JSON) ordenadas por distancia.
+    GET ?lat=-12.12&lng=-77.03&radius=5&limit=20   (radio en km)
+    """
+    try:
+        lat = float(request.GET['lat'])
+        lng = float(request.GET['lng'])
+        radius = float(request.GET.get('radius', 5))
+        limit = int(request.GET.get('limit', 20))
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Parámetros inválidos.'}, status=400)
+
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return JsonResponse({'error': 'Coordenadas fuera de rango.'}, status=400)
+    if not 0 < radius <= MAX_NEARBY_RADIUS_KM:
+        return JsonResponse({'error': f'El radio debe ser de hasta {MAX_NEARBY_RADIUS_KM} km.'}, status=400)
+    if not 1 <= limit <= MAX_NEARBY_RESULTS:
+        return JsonResponse({'error': f'Se pueden pedir de 1 a {MAX_NEARBY_RESULTS} canchas.'}, status=400)
+
+    results = []
+    for field, km in nearby_fields(lat, lng, radius, limit):
+        album = field.primary_image
+        results.append({
+            'id': field.id,
+            'name': field.name,
+            'type': field.type,
+            'address': field.address,
+            'price_hour': str(field.price_hour),
+            'lat': field.latitude,
+            'lng': field.longitude,
+            'distance_km': round(km, 3),
+            'image': album.thumb_url if album else None,
+        })
+    return JsonResponse({'results': results})
+
@@ -1,17 +1,15 @@
 from functools import wraps
 from django.shortcuts import redirect
 from django.urls import reverse
-from applications.users.models import UserRole, User
+from applications.users.models import UserRole
+from applications.users.utils import get_session_user
 
 def partner_required_session(viewfunc):
     @wraps(viewfunc)
     def _wrapped(request, *args, **kwargs):
-        uid = request.session.get('user_id')
-        if not uid:
-            return redirect(reverse('users:login'))
-        try:
-            u = User.objects.get(pk=uid, estado=True)
-        except User.DoesNotExist:
+        # reutiliza el usuario ya resuelto en este request (middleware / caché)
+        u = get_session_user(request)
+        if u is None or not u.estado:
             return redirect(reverse('users:login'))
         if u.rol != UserRole.PARTNER:
             # si no es partner lo envío al listado público
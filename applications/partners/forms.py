@@ -5,11 +5,16 @@ from applications.field.models import Field
 class FieldEditForm(forms.ModelForm):
     class Meta:
         model = Field
-        fields = ['name', 'type', 'address', 'price_hour', 'has_lights']
+        fields = ['name', 'type', 'address', 'price_hour', 'has_lights', 'lights_surcharge', 'lights_from',
+                  'latitude', 'longitude']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'input'}),
             'address': forms.TextInput(attrs={'class': 'input'}),
             'price_hour': forms.NumberInput(attrs={'class': 'input', 'step': '0.10'}),
+            'lights_surcharge': forms.NumberInput(attrs={'class': 'input', 'step': '0.10'}),
+            'lights_from': forms.TimeInput(attrs={'class': 'input', 'type': 'time'}, format='%H:%M'),
+            'latitude': forms.NumberInput(attrs={'class': 'input', 'step': 'any', 'placeholder': '-12.0464'}),
+            'longitude': forms.NumberInput(attrs={'class': 'input', 'step': 'any', 'placeholder': '-77.0428'}),
         }
 
 # --- Widget que SÍ permite múltiples archivos ---
@@ -1,10 +1,21 @@
+from array import array
+from collections import Counter
+from decimal import Decimal
 from datetime import datetime, time, timedelta, date
 from calendar import day_name, monthrange
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Sum, Count
-from django.db.models.functions import TruncDate, ExtractHour
-from applications.booking.models import Booking, BookingStatus
-from applications.field.models import Field
+from django.db.models import F, Q, Sum, Count, FilteredRelation
+from applications.booking.models import Booking, BookingExtra, BookingStatus
+from applications.booking.quotes import rate_table
+from applications.booking.rates import from_cents, to_cents
+from applications.booking.timeline import SlotTimeline
+from applications.field.models import Equipment, Field
+from applications.reporting.services import REPORT_STATUSES, rollup_days, rollup_summary, with_extras_total
+from applications.scheduling.calendar import covers
+from applications.scheduling.services import grid_hours, open_masks
+
+CENTS = Decimal('0.01')
 
 def partner_fields(user):
     return Field.objects.filter(owner=user)
@@ -20,20 +31,15 @@ def bookings_for_range(partner, start_dt, end_dt):
             .select_related('user','field')
             .order_by('start'))
 
-def build_halfhour_slots(day, start_hour=8, end_hour=22):
-    """Devuelve lista de (slot_start, slot_end) cada 30 min para el día dado (naive local)."""
-    slots = []
-    t = datetime.combine(day, time(hour=start_hour))
-    end = datetime.combine(day, time(hour=end_hour))
-    while t < end:
-        slots.append((t, t + timedelta(minutes=30)))
-        t += timedelta(minutes=30)
-    return slots
+def use_rollups() -> bool:
+    """Los reportes leen los acumulados de reporting en vez de las reservas crudas."""
+    return getattr(settings, 'GP_REPORTING_ROLLUPS', False)
 
 def monthly_summary(partner, year, month):
     """Ingresos/estadísticas del mes (naive)."""
-    from datetime import date
-    from calendar import monthrange
+    if use_rollups():
+        summary = rollup_summary(partner, date(year, month, 1), date(year, month, monthrange(year, month)[1]))
+        return {'total_amount': summary['total_amount'], 'count': summary['count']}
     d0 = datetime(year, month, 1)
     d1 = datetime(year, month, monthrange(year, month)[1], 23, 59, 59)
     qs = bookings_for_range(partner, d0, d1 + timedelta(seconds=1))
@@ -54,90 +60,171 @@ def week_bounds(ref_day: date):
     sunday = monday + timedelta(days=6)
     return monday, sunday
 
-def build_week_slots(monday: date, start_hour=8, end_hour=22):
+def hours_timeline(masks, first_day, days=7, start_hour=None, end_hour=None, slot_minutes=30):
     """
-    Devuelve:
-      - rows: lista de (slot_start_time, slot_end_time) para cada fila (media hora)
-      - days: lista de dates [mon..sun]
+    SlotTimeline de los días pedidos; sin horas explícitas abarca el horario de
+    atención de las canchas (`masks` de scheduling.open_masks), o 08-22 si no hay.
     """
-    days = [monday + timedelta(days=i) for i in range(7)]
-    # filas: usamos el lunes para sacar los cortes horarios (solo importa la hora)
-    row_slots = []
-    t = datetime.combine(monday, time(hour=start_hour))
-    end = datetime.combine(monday, time(hour=end_hour))
-    while t < end:
-        row_slots.append((t.time(), (t + timedelta(minutes=30)).time()))
-        t += timedelta(minutes=30)
-    return row_slots, days
-
-def weekly_grid(partner, monday: date, start_hour=8, end_hour=22):
+    if start_hour is None or end_hour is None:
+        start_hour, end_hour = grid_hours(m for per_day in masks.values() for m in per_day)
+    return SlotTimeline(first_day, days=days, slot_minutes=slot_minutes,
+                        start_hour=start_hour, end_hour=end_hour)
+
+def slot_open(mask, timeline, row):
+    """True si la cancha con `mask` atiende en la fila `row` de un día del timeline."""
+    m0 = timeline.start_hour * 60 + row * timeline.slot_minutes
+    return covers(mask, m0, m0 + timeline.slot_minutes)
+
+def weekly_grid(partner, monday: date, start_hour=None, end_hour=None, slot_minutes=30):
     """
     Construye la grilla semanal:
       - header_days: [{'date': d, 'label': 'Lun 14'} ...]
       - rows: lista de horas ['08:00', '08:30', ...]
-      - cells: matriz [len(rows)] x 7, cada celda {'status': 'free'|'busy', 'label': str}
+      - cells: matriz [len(rows)] x 7, cada celda {'status': 'free'|'busy'|'closed', 'label': str}
+    Las reservas se reparten en los slots de la semana en un solo pase (SlotTimeline).
+    Sin start_hour/end_hour las filas cubren el horario de atención de las canchas
+    (scheduling); un slot libre en que ninguna cancha atiende queda 'closed'.
     """
-    row_slots, days = build_week_slots(monday, start_hour, end_hour)
-
-    # Rango de consulta
-    start_dt = datetime.combine(monday, time(0, 0, 0))
-    end_dt   = datetime.combine(days[-1], time(23, 59, 59))
-    qs = bookings_for_range(partner, start_dt, end_dt) \
-            .select_related('user', 'field')
-
-    # Indexamos por día para chequear overlaps más rápido
-    by_day = {d: [] for d in days}
-    for b in qs:
-        bday = b.start.date()
-        # Reservas que tocan varios días (raro en canchas) se reparten
-        for d in days:
-            if b.start.replace(tzinfo=None) < datetime.combine(d, time(23, 59, 59)) \
-               and b.end.replace(tzinfo=None) > datetime.combine(d, time(0, 0, 0)):
-                by_day[d].append(b)
-
-    # Armamos celdas
-    rows = [f"{rs[0].strftime('%H:%M')}" for rs in row_slots]
+    days = [monday + timedelta(days=i) for i in range(7)]
+    masks = open_masks(partner_fields(partner).values_list('id', flat=True), days)
+    timeline = hours_timeline(masks, monday, 7, start_hour, end_hour, slot_minutes)
+    owners = timeline.bucket(bookings_for_range(partner, timeline.range_start, timeline.range_end))
+
+    free = {'status': 'free', 'label': 'LIBRE'}
+    closed = {'status': 'closed', 'label': 'CERRADO'}
+    busy = {}  # una celda por reserva, compartida por todos sus slots
+    per_day = timeline.per_day
     cells = []
-    for rs, re in row_slots:
+    for r in range(per_day):
         row_cells = []
-        for d in days:
-            s = datetime.combine(d, rs)
-            e = datetime.combine(d, re)
-            overlaps = [b for b in by_day[d] if (b.start.replace(tzinfo=None) < e and b.end.replace(tzinfo=None) > s)]
-            if overlaps:
-                b = overlaps[0]
-                row_cells.append({
-                    'status': 'busy',
-                    'label': f"{b.user.nombre} · {b.field.name}"
-                })
+        for d in range(7):
+            b = owners[d * per_day + r]
+            if b is None:
+                is_open = not masks or any(slot_open(m[d], timeline, r) for m in masks.values())
+                row_cells.append(free if is_open else closed)
             else:
-                row_cells.append({'status': 'free', 'label': 'LIBRE'})
+                if b.id not in busy:
+                    busy[b.id] = {'status': 'busy', 'label': f"{b.user.nombre} · {b.field.name}"}
+                row_cells.append(busy[b.id])
         cells.append(row_cells)
 
-    # Header formateado (Lun/Mar/…)
+    return {
+        'rows': timeline.row_labels(),
+        'cells': cells,
+        **week_header(monday),
+    }
+
+def week_header(monday: date):
+    """Días de la semana, etiquetas (Lun/Mar/…) y navegación anterior/siguiente."""
+    days = [monday + timedelta(days=i) for i in range(7)]
     day_labels = ["Lun","Mar","Mié","Jue","Vie","Sáb","Dom"]
     header_days = [{'date': d, 'label': f"{day_labels[i]} {d.day}"} for i, d in enumerate(days)]
-
     return {
-        'rows': rows,
         'header_days': header_days,
         'days': days,
-        'cells': cells,
         'prev_monday': (monday - timedelta(days=7)).strftime("%Y-%m-%d"),
         'next_monday': (monday + timedelta(days=7)).strftime("%Y-%m-%d"),
         'this_monday': week_bounds(timezone.localdate())[0].strftime("%Y-%m-%d"),
     }
-    
+
+class WeekLanes:
+    """
+    Grilla semanal con un carril por cancha, respaldada por un array plano:
+    cells[(fila * n_días + día) * n_canchas + carril] = índice en `labels`,
+    -1 si está libre o -2 si la cancha no atiende (ver close()).
+    """
+
+    def __init__(self, timeline: SlotTimeline, fields):
+        self.timeline = timeline
+        self.fields = fields                                   # [(id, name), ...]
+        self.lanes = {fid: i for i, (fid, _) in enumerate(fields)}
+        self.labels = []
+        self.n_days = len(timeline.days)
+        self.cells = array('i', [-1]) * (len(timeline) * len(fields))
+
+    def add(self, field_id, start, end, label):
+        lane, n = self.lanes[field_id], len(self.fields)
+        idx = len(self.labels)
+        self.labels.append(label)
+        per_day = self.timeline.per_day
+        for i0, i1 in self.timeline.spans(start, end):
+            for i in range(i0, i1):
+                day, row = divmod(i, per_day)
+                pos = (row * self.n_days + day) * n + lane
+                if self.cells[pos] < 0:
+                    self.cells[pos] = idx
+
+    def close(self, field_id, masks):
+        """Marca los slots fuera del horario de la cancha (`masks` = una máscara por día)."""
+        lane, n = self.lanes[field_id], len(self.fields)
+        for day, mask in enumerate(masks):
+            if mask is None:
+                continue
+            for row in range(self.timeline.per_day):
+                if not slot_open(mask, self.timeline, row):
+                    self.cells[(row * self.n_days + day) * n + lane] = -2
+
+    def cell(self, row, day, lane):
+        idx = self.cells[(row * self.n_days + day) * len(self.fields) + lane]
+        return self.labels[idx] if idx >= 0 else None
+
+    def rows(self):
+        """Filas para el template: {'time': '08:00', 'cells': [día0/cancha0, día0/cancha1, ...]}."""
+        # índice -2 -> cerrado, -1 -> libre (indexación negativa sobre la lista)
+        busy = [{'status': 'busy', 'label': label} for label in self.labels]
+        states = busy + [{'status': 'closed', 'label': 'CERRADO'}, {'status': 'free', 'label': 'LIBRE'}]
+        width = self.n_days * len(self.fields)
+        for r, time_label in enumerate(self.timeline.row_labels()):
+            chunk = self.cells[r * width:(r + 1) * width]
+            yield {'time': time_label, 'cells': [states[i] for i in chunk]}
+
+
+def weekly_lanes(partner, monday: date, start_hour=None, end_hour=None, slot_minutes=30) -> WeekLanes:
+    """
+    Grilla semanal con una columna por cancha del partner dentro de cada día.
+    Una sola consulta: canchas LEFT JOIN reservas de la semana (FilteredRelation),
+    de modo que las canchas sin reservas también obtienen su carril. Sin
+    start_hour/end_hour las filas cubren el horario de atención de las canchas.
+    """
+    tz = timezone.get_current_timezone()
+    week_start = timezone.make_aware(datetime.combine(monday, time.min), tz)
+    week_end = timezone.make_aware(datetime.combine(monday + timedelta(days=7), time.min), tz)
+    statuses = [BookingStatus.CONFIRMED]
+    if hasattr(BookingStatus, "PAID"):
+        statuses.append(BookingStatus.PAID)
+    rows = (
+        Field.objects.filter(owner=partner)
+        .annotate(week=FilteredRelation('bookings', condition=Q(
+            bookings__status__in=statuses,
+            bookings__start__lt=week_end,
+            bookings__end__gt=week_start,
+        )))
+        .order_by('id', 'week__start')
+        .values_list('id', 'name', 'week__start', 'week__end', 'week__user__nombre')
+    )
+
+    fields, bookings = [], []
+    for fid, name, b_start, b_end, user_name in rows:
+        if not fields or fields[-1][0] != fid:
+            fields.append((fid, name))
+        if b_start is not None:
+            bookings.append((fid, b_start, b_end, user_name))
+
+    masks = open_masks([fid for fid, _ in fields], [monday + timedelta(days=i) for i in range(7)])
+    lanes = WeekLanes(hours_timeline(masks, monday, 7, start_hour, end_hour, slot_minutes), fields)
+    for fid, per_day in masks.items():
+        lanes.close(fid, per_day)
+    for fid, b_start, b_end, user_name in bookings:
+        lanes.add(fid, b_start, b_end, user_name)
+    return lanes
+
 def _partner_bookings_month(partner, year: int, month: int):
     """QuerySet de reservas del mes para canchas del partner."""
-    fields = partner_fields(partner)
-    if not fields.exists():
-        return Booking.objects.none()
-
     # rango del mes
+    tz = timezone.get_current_timezone()
     last_day = monthrange(year, month)[1]
-    start = datetime(year, month, 1, 0, 0, 0)
-    end = datetime(year, month, last_day, 23, 59, 59)
+    start = timezone.make_aware(datetime(year, month, 1, 0, 0, 0), tz)
+    end = timezone.make_aware(datetime(year, month, last_day, 23, 59, 59), tz)
 
     statuses = [BookingStatus.CONFIRMED]
     if hasattr(BookingStatus, "PAID"):
@@ -145,7 +232,7 @@ def _partner_bookings_month(partner, year: int, month: int):
 
     return (
         Booking.objects.filter(
-            field__in=fields,
+            field__owner=partner,
             status__in=statuses,
             start__gte=start,
             start__lte=end,
@@ -158,62 +245,59 @@ def monthly_stats(partner, year: int, month: int):
     """
     Calcula métricas para el resumen mensual del partner.
     Devuelve un dict listo para el template.
+    Una sola consulta: las reservas del mes LEFT JOIN sus extras (una fila por
+    extra, o una fila con extra nulo) y todas las métricas en un pase en Python.
+    Con GP_REPORTING_ROLLUPS las métricas por día/hora salen de los acumulados.
     """
-    qs = _partner_bookings_month(partner, year, month)
+    if use_rollups():
+        return {**_monthly_stats_from_rollups(partner, year, month), **_month_nav(year, month)}
 
-    # Ingresos totales
-    total_income = qs.aggregate(total=Sum("total_amount"))["total"] or 0
+    rows = _partner_bookings_month(partner, year, month).values_list(
+        "id", "start", "total_amount", "user_id", "user__nombre",
+        "extras__field_equipment__equipment__type", "extras__quantity",
+    )
+
+    seen = set()
+    total_income = 0
+    per_day, per_user, per_hour, per_equipment = Counter(), Counter(), Counter(), Counter()
+    user_names = {}
+    for bid, start, amount, uid, nombre, eq_type, qty in rows:
+        if eq_type is not None:
+            per_equipment[eq_type] += qty
+        if bid in seen:
+            continue
+        seen.add(bid)
+        local_start = timezone.localtime(start)
+        total_income += amount
+        per_day[local_start.date()] += 1
+        per_hour[local_start.hour] += 1
+        per_user[uid] += 1
+        user_names[uid] = nombre
 
     # Días con más reservas
-    days_top = (
-        qs.annotate(d=TruncDate("start"))
-        .values("d")
-        .annotate(c=Count("id"))
-        .order_by("-c", "d")[:5]
-    )
+    days_top = [
+        {"d": d, "c": c}
+        for d, c in sorted(per_day.items(), key=lambda kv: (-kv[1], kv[0]))[:5]
+    ]
 
     # Usuarios más frecuentes
-    top_users = (
-        qs.values("user__id", "user__nombre")
-        .annotate(c=Count("id"))
-        .order_by("-c", "user__nombre")[:5]
-    )
+    top_users = [
+        {"user__id": uid, "user__nombre": user_names[uid], "c": c}
+        for uid, c in sorted(per_user.items(), key=lambda kv: (-kv[1], user_names[kv[0]]))[:5]
+    ]
 
     # Hora del día más reservada
-    hours = (
-        qs.annotate(h=ExtractHour("start"))
-        .values("h")
-        .annotate(c=Count("id"))
-        .order_by("-c", "h")
-    )
-    top_hour = hours[0]["h"] if hours else None
+    top_hour = min(per_hour.items(), key=lambda kv: (-kv[1], kv[0]))[0] if per_hour else None
 
     # Media de reservas por día del mes (sobre días con al menos 1 reserva)
-    distinct_days = (
-        qs.annotate(d=TruncDate("start"))
-        .values("d")
-        .distinct()
-        .count()
-    )
-    avg_per_day = (qs.count() / distinct_days) if distinct_days else 0
-
-    # Equipamiento más solicitado (si tienes BookingItem con FK a Equipment)
-    # Si aún no lo implementaste, esto quedará vacío sin romper nada.
-    try:
-        from applications.booking.models import BookingItem  # ajusta nombre real
-        top_equipment = (
-            BookingItem.objects.filter(booking__in=qs)
-            .values("equipment__type")
-            .annotate(qty=Sum("quantity"))
-            .order_by("-qty")[:5]
-        )
-    except Exception:
-        top_equipment = []
+    avg_per_day = (len(seen) / len(per_day)) if per_day else 0
 
-    # Prev / next month helpers
-    this_month = date(year, month, 1)
-    prev_month = (this_month - timedelta(days=1)).replace(day=1)
-    next_month = (this_month + timedelta(days=32)).replace(day=1)
+    # Equipamiento más solicitado (BookingExtra)
+    equipment_labels = dict(Equipment.TYPE_CHOICES)
+    top_equipment = [
+        {"equipment__type": t, "label": equipment_labels.get(t, t), "qty": q}
+        for t, q in sorted(per_equipment.items(), key=lambda kv: (-kv[1], kv[0]))[:5]
+    ]
 
     return {
         "total_income": total_income,
@@ -222,12 +306,106 @@ def monthly_stats(partner, year: int, month: int):
         "top_equipment": top_equipment,
         "avg_per_day": round(avg_per_day, 2),
         "top_hour": top_hour,
+        **_month_nav(year, month),
+    }
+
+def _monthly_stats_from_rollups(partner, year: int, month: int):
+    """
+    Métricas del mes desde reporting: ingresos, días top, hora top y media diaria
+    salen de los acumulados; usuarios y equipamiento top se agrupan en la BD.
+    """
+    days = rollup_days(partner, date(year, month, 1), date(year, month, monthrange(year, month)[1]))
+    histogram = [sum(col) for col in zip(*(d['histogram'] for d in days.values()))]
+    count = sum(d['count'] for d in days.values())
+
+    qs = _partner_bookings_month(partner, year, month)
+    top_users = list(
+        qs.values("user__id", "user__nombre")
+        .annotate(c=Count("id"))
+        .order_by("-c", "user__nombre")[:5]
+    )
+    equipment_labels = dict(Equipment.TYPE_CHOICES)
+    top_equipment = [
+        {"equipment__type": r["t"], "label": equipment_labels.get(r["t"], r["t"]), "qty": r["qty"]}
+        for r in (
+            BookingExtra.objects.filter(booking__in=qs.order_by().values("id"))
+            .values(t=F("field_equipment__equipment__type"))
+            .annotate(qty=Sum("quantity"))
+            .order_by("-qty", "t")[:5]
+        )
+    ]
+
+    return {
+        "total_income": sum(d['total'] for d in days.values()),
+        "days_top": [
+            {"d": d, "c": v['count']}
+            for d, v in sorted(days.items(), key=lambda kv: (-kv[1]['count'], kv[0]))[:5]
+        ],
+        "top_users": top_users,
+        "top_equipment": top_equipment,
+        "avg_per_day": round(count / len(days), 2) if days else 0,
+        "top_hour": max(range(24), key=lambda h: (histogram[h], -h)) if count else None,
+    }
+
+def _month_nav(year: int, month: int):
+    """Prev / next month helpers."""
+    this_month = date(year, month, 1)
+    prev_month = (this_month - timedelta(days=1)).replace(day=1)
+    next_month = (this_month + timedelta(days=32)).replace(day=1)
+    return {
         "prev_year": prev_month.year,
         "prev_month": prev_month.month,
         "next_year": next_month.year,
         "next_month": next_month.month,
     }
 
+def income_rows(partner, start, end, chunk_size=2000):
+    """
+    Generador de filas de ingresos del partner para reservas que empiezan en [start, end):
+    {"user", "field", "field_id", "start", "end", "hours", "base_amount", "extras_amount", "total"}.
+    Lee con un cursor del servidor (iterator) y los extras llegan en la misma
+    consulta vía una subconsulta anotada sobre BookingExtra.
+    """
+    qs = (
+        with_extras_total(Booking.objects.filter(
+            field__owner=partner,
+            status__in=REPORT_STATUSES,
+            start__gte=start,
+            start__lt=end,
+        ))
+        .order_by("start", "id")
+        .values_list("start", "end", "total_amount", "extras_total",
+                     "user_id", "user__nombre", "user__email", "field_id", "field__name")
+    )
+    for b_start, b_end, total, extras, uid, nombre, email, field_id, field_name in qs.iterator(chunk_size=chunk_size):
+        extras = extras.quantize(CENTS)
+        yield {
+            "user": nombre or email or f"User {uid}",
+            "field": field_name,
+            "field_id": field_id,
+            "start": b_start,
+            "end": b_end,
+            "hours": round((b_end - b_start).total_seconds() / 3600, 2),
+            "base_amount": total - extras,
+            "extras_amount": extras,
+            "total": total,
+        }
+
+def income_by_band(partner, rows):
+    """
+    Ingresos por cancha (sin extras) repartidos por franja de tarifa:
+    [(franja, Decimal), ...] de mayor a menor. Cada reserva se reparte según
+    la tabla compilada de su cancha (ver booking/rates.py), sin consultas por fila.
+    """
+    fields = {f.pk: f for f in partner_fields(partner).only("id", "pricing_version", *Field.PRICING_FIELDS)}
+    totals = Counter()
+    for r in rows:
+        field = fields.get(r["field_id"])
+        if field is None:
+            continue
+        totals.update(rate_table(field).split(to_cents(r["base_amount"]), r["start"], r["end"]))
+    return [(band, from_cents(cents)) for band, cents in totals.most_common() if cents]
+
 def monthly_income_rows(partner, year: int, month: int):
     """
     Devuelve filas de ingresos del mes para el partner:
@@ -243,77 +421,17 @@ def monthly_income_rows(partner, year: int, month: int):
       },
       ...
     ]
-    Maneja distintos esquemas de campos sin romper.
+    ordenadas por fecha, más los totales del mes y el reparto por franja (by_band).
     """
-    qs = _partner_bookings_month(partner, year, month)
-
-    rows = []
-    total_base = 0
-    total_extras = 0
-    total_total = 0
-
-    # Si existe BookingItem con equipment/extras, intentamos sumar
-    try:
-        from applications.booking.models import BookingItem
-        has_booking_item = True
-    except Exception:
-        has_booking_item = False
-
-    for b in qs:
-        # Duración en horas
-        if b.start and b.end:
-            seconds = (b.end - b.start).total_seconds()
-            hours = round(seconds / 3600, 2)
-        else:
-            hours = 0
-
-        # Total
-        total = getattr(b, "total_amount", None)
-        if total is None:
-            total = getattr(b, "amount", 0) or 0
-
-        # Extras (si hay campo específico)
-        extras = getattr(b, "extras_amount", None)
-        if extras is None:
-            # Si no hay campo pero existe BookingItem, podríamos calcularlo aquí.
-            # Lo dejamos simple: suma de (price * qty) marcados como extra, si tu esquema lo soporta.
-            if has_booking_item:
-                try:
-                    extras = (
-                        BookingItem.objects
-                        .filter(booking=b, is_extra=True)
-                        .aggregate(x=Sum("subtotal"))["x"] or 0
-                    )
-                except Exception:
-                    extras = 0
-            else:
-                extras = 0
-
-        # Base
-        base = total - extras if total is not None else 0
-
-        total_base += base
-        total_extras += extras
-        total_total += total
-
-        user_name = getattr(b.user, "nombre", None) or getattr(b.user, "email", "") or f"User {b.user_id}"
-
-        rows.append({
-            "user": user_name,
-            "start": b.start,
-            "end": b.end,
-            "hours": hours,
-            "base_amount": base,
-            "extras_amount": extras,
-            "total": total,
-        })
-
-    # Ordenamos: por fecha
-    rows.sort(key=lambda r: (r["start"] or 0))
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime(year, month, 1), tz)
+    end = timezone.make_aware(datetime(year, month, monthrange(year, month)[1]) + timedelta(days=1), tz)
 
+    rows = list(income_rows(partner, start, end))
     return {
         "rows": rows,
-        "sum_base": total_base,
-        "sum_extras": total_extras,
-        "sum_total": total_total,
+        "by_band": income_by_band(partner, rows),
+        "sum_base": sum(r["base_amount"] for r in rows),
+        "sum_extras": sum(r["extras_amount"] for r in rows),
+        "sum_total": sum(r["total"] for r in rows),
     }
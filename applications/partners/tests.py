@@ -1,3 +1,165 @@
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from applications.users.models import User, UserRole
+from applications.field.models import Field, Equipment, FieldEquipment, FieldRate
+from applications.booking.quotes import compiled_rates
+from applications.scheduling.models import OpeningHours
+from applications.scheduling.services import materialize_calendar
+from applications.booking.models import Booking, BookingExtra, BookingStatus
+from applications.partners.services import weekly_grid, weekly_lanes, week_bounds, monthly_stats, monthly_income_rows
 
-# Create your tests here.
+
+class PartnerCalendarTests(TestCase):
+    def setUp(self):
+        self.partner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+        self.player = User.objects.create(nombre="Ana", email="a@e.com", password="x", rol=UserRole.REGULAR)
+        self.field = Field.objects.create(owner=self.partner, name="C1", type="futbol", address="X", price_hour=50)
+        self.monday, _ = week_bounds(timezone.localdate())
+        self.day = self.monday + timedelta(days=2)
+        Booking.objects.create(
+            user=self.player, field=self.field, status=BookingStatus.CONFIRMED,
+            start=timezone.make_aware(datetime.combine(self.day, time(10))),
+            end=timezone.make_aware(datetime.combine(self.day, time(11))),
+        )
+        session = self.client.session
+        session["user_id"] = self.partner.id
+        session.save()
+
+    def test_weekly_grid_buckets_booking(self):
+        grid = weekly_grid(self.partner, self.monday)
+        self.assertEqual(grid['rows'][0], "08:00")
+        busy = [(r, d) for r, row in enumerate(grid['cells']) for d, c in enumerate(row) if c['status'] == 'busy']
+        self.assertEqual(busy, [(4, 2), (5, 2)])
+        self.assertEqual(grid['cells'][4][2]['label'], "Ana · C1")
+
+    def test_day_view(self):
+        resp = self.client.get(reverse('partners:day'), {'date': self.day.isoformat()})
+        self.assertEqual(resp.status_code, 200)
+        busy = [s for s in resp.context['slot_data'] if s['status'] == 'busy']
+        self.assertEqual(len(busy), 2)
+        self.assertEqual(timezone.localtime(busy[0]['start']).time(), time(10))
+
+    def test_weekly_lanes_one_query(self):
+        other = Field.objects.create(owner=self.partner, name="C2", type="futbol", address="X", price_hour=50)
+        materialize_calendar(self.monday, 7)
+        with self.assertNumQueries(2):   # canchas + reservas en una consulta, y el calendario de slots
+            lanes = weekly_lanes(self.partner, self.monday)
+        self.assertEqual(lanes.fields, [(self.field.id, "C1"), (other.id, "C2")])
+        self.assertEqual(lanes.cell(4, 2, 0), "Ana")
+        self.assertIsNone(lanes.cell(4, 2, 1))
+        self.assertIsNone(lanes.cell(3, 2, 0))
+
+    def test_grids_follow_opening_hours(self):
+        OpeningHours.objects.create(field=self.field, weekday=2, opens=time(9), closes=time(12))
+        OpeningHours.objects.create(field=self.field, weekday=5, opens=time(7), closes=time(23))
+        grid = weekly_grid(self.partner, self.monday)
+        self.assertEqual((grid['rows'][0], grid['rows'][-1]), ("07:00", "22:30"))
+        wednesday = [row[2]['status'] for row in grid['cells']]
+        # 07:00-09:00 cerrado, 09:00-10:00 libre, 10:00-11:00 reservado, 11:00-12:00 libre, luego cerrado
+        self.assertEqual(wednesday[:12], ['closed'] * 4 + ['free'] * 2 + ['busy'] * 2 + ['free'] * 2 + ['closed'] * 2)
+        self.assertEqual(grid['cells'][0][2]['label'], 'CERRADO')
+        self.assertEqual({row[0]['status'] for row in grid['cells']}, {'closed'})   # lunes sin horario
+
+        lanes = weekly_lanes(self.partner, self.monday)
+        self.assertEqual(lanes.cell(6, 2, 0), "Ana")
+        self.assertEqual(next(iter(lanes.rows()))['cells'][0]['status'], 'closed')
+
+    def test_week_view_lanes_mode(self):
+        resp = self.client.get(reverse('partners:week'), {'monday': self.monday.isoformat(), 'lanes': '1'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, "wg-head lane")
+        resp = self.client.get(reverse('partners:week'), {'monday': self.monday.isoformat()})
+        self.assertContains(resp, "Ana · C1")
+
+
+class MonthlyStatsTests(TestCase):
+    def setUp(self):
+        self.partner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+        self.ana = User.objects.create(nombre="Ana", email="a@e.com", password="x", rol=UserRole.REGULAR)
+        self.beto = User.objects.create(nombre="Beto", email="b@e.com", password="x", rol=UserRole.REGULAR)
+        self.field = Field.objects.create(owner=self.partner, name="C1", type="futbol", address="X", price_hour=50)
+        self.fe = FieldEquipment.objects.create(field=self.field, equipment=Equipment.objects.create(type='chalecos'),
+                                                stock=10, price_per_unit=2)
+
+    def book(self, user, day, hour, total, status=BookingStatus.CONFIRMED):
+        start = timezone.make_aware(datetime(2025, 3, day, hour))
+        return Booking.objects.create(user=user, field=self.field, status=status, total_amount=total,
+                                      start=start, end=start + timedelta(hours=1))
+
+    def test_single_query(self):
+        b = self.book(self.ana, 3, 19, 60)
+        BookingExtra.objects.create(booking=b, field_equipment=self.fe, quantity=5, unit_price=2)
+        self.book(self.ana, 3, 20, 50)
+        self.book(self.beto, 4, 19, 50)
+        self.book(self.beto, 5, 19, 50, status=BookingStatus.CANCELED)
+
+        with self.assertNumQueries(1):
+            stats = monthly_stats(self.partner, 2025, 3)
+        self.assertEqual(stats["total_income"], 160)
+        self.assertEqual(stats["days_top"][0]["c"], 2)
+        self.assertEqual(stats["top_users"][0]["user__nombre"], "Ana")
+        self.assertEqual(stats["top_hour"], 19)
+        self.assertEqual(stats["avg_per_day"], 1.5)
+        self.assertEqual(stats["top_equipment"], [
+            {"equipment__type": "chalecos", "label": "Chalecos de Entrenamiento", "qty": 5},
+        ])
+
+
+class IncomeExportTests(TestCase):
+    def setUp(self):
+        self.partner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+        ana = User.objects.create(nombre="Ana", email="a@e.com", password="x", rol=UserRole.REGULAR)
+        field = Field.objects.create(owner=self.partner, name="C1", type="futbol", address="X", price_hour=50)
+        fe = FieldEquipment.objects.create(field=field, equipment=Equipment.objects.create(type='conos'),
+                                           stock=10, price_per_unit=2)
+        for month, total in ((1, 56), (6, 50)):
+            start = timezone.make_aware(datetime(2024, month, 10, 18))
+            Booking.objects.create(user=ana, field=field, status=BookingStatus.CONFIRMED, total_amount=total,
+                                   start=start, end=start + timedelta(hours=1))
+        BookingExtra.objects.create(booking=Booking.objects.get(start__month=1), field_equipment=fe,
+                                    quantity=3, unit_price=2)
+        session = self.client.session
+        session["user_id"] = self.partner.id
+        session.save()
+
+    def test_monthly_rows_use_extras_subquery(self):
+        compiled_rates.cache_clear()
+        with self.assertNumQueries(3):   # filas (extras en subconsulta) + canchas + franjas
+            data = monthly_income_rows(self.partner, 2024, 1)
+        self.assertEqual(len(data["rows"]), 1)
+        self.assertEqual(data["sum_extras"], 6)
+        self.assertEqual(data["sum_base"], 50)
+        self.assertEqual(data["by_band"], [("Tarifa base", 50)])
+
+    def test_income_split_by_band(self):
+        compiled_rates.cache_clear()
+        field = Field.objects.get()
+        # 10/01/2024 fue miércoles: la reserva 18:00-19:00 cae mitad en cada franja
+        FieldRate.objects.create(field=field, weekday=2, start_time=time(18, 30), end_time=time(23, 0),
+                                 price_hour=70, label="Hora punta")
+        field.refresh_from_db()
+        data = monthly_income_rows(self.partner, 2024, 1)
+        self.assertEqual(dict(data["by_band"]), {"Hora punta": Decimal("29.17"), "Tarifa base": Decimal("20.83")})
+
+    def test_streaming_csv_and_jsonl(self):
+        url = reverse('partners:income_export')
+        resp = self.client.get(url, {'from': '2024-01-01', 'to': '2025-12-31', 'format': 'csv'})
+        self.assertTrue(resp.streaming)
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "user,field,start,end,hours,base_amount,extras_amount,total")
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith(",50.00,6.00,56.00"))
+
+        resp = self.client.get(url, {'from': '2024-06-01', 'to': '2024-06-30', 'format': 'jsonl'})
+        records = [json.loads(l) for l in b"".join(resp.streaming_content).decode().splitlines()]
+        self.assertEqual([r["total"] for r in records], ["50.00"])
+
+    def test_invalid_export_params_are_bad_requests(self):
+        url = reverse('partners:income_export')
+        for params in ({'from': '2024-13-01'}, {'from': '2024-06-30', 'to': '2024-06-01'}, {'format': 'xlsx'}):
+            resp = self.client.get(url, params)
+            self.assertEqual(resp.status_code, 400, params)
@@ -9,6 +9,7 @@ urlpatterns = [
     path('month/', views.month_summary_view, name='month'),
     path('month/', views.month_summary_view, name='month'),
     path('income/', views.monthly_income_view, name='income'),
+    path('income/export/', views.income_export_view, name='income_export'),
     path('edit-field/', views.edit_field_view, name='edit_field'),
 
 ]
@@ -1,9 +1,19 @@
-from datetime import datetime, timedelta
-from django.shortcuts import render
+import csv
+import json
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from django.shortcuts import render, redirect
 from django.utils import timezone
-from django.http import Http404
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.contrib import messages
+from django.core.serializers.json import DjangoJSONEncoder
 from .decorators import partner_required_session
-from .services import bookings_for_range, build_halfhour_slots, monthly_summary, partner_fields, week_bounds, weekly_grid, monthly_stats, monthly_income_rows
+from .forms import FieldEditForm, AlbumUploadForm
+from applications.users.utils import get_session_user, login_required_session
+from applications.field.models import Field
+from applications.field.services import add_album_images
+from applications.scheduling.services import open_masks
+from .services import bookings_for_range, hours_timeline, monthly_summary, partner_fields, slot_open, week_bounds, week_header, weekly_grid, weekly_lanes, monthly_stats, monthly_income_rows, income_rows
 
 @partner_required_session
 def day_calendar_view(request):
@@ -19,23 +29,22 @@ def day_calendar_view(request):
     else:
         day = timezone.localdate()
 
-    start_dt = datetime.combine(day, datetime.min.time()).replace(tzinfo=None)
-    end_dt   = start_dt + timedelta(days=1)
-
-    bookings = bookings_for_range(request.gp_user, start_dt, end_dt)
-    slots = build_halfhour_slots(day)
+    # filas según el horario de atención de las canchas del partner (scheduling)
+    masks = open_masks(partner_fields(request.gp_user).values_list('id', flat=True), [day])
+    timeline = hours_timeline(masks, day, days=1)
+    bookings = bookings_for_range(request.gp_user, timeline.range_start, timeline.range_end)
 
-    # mapa: para cada slot, si hay overlap con alguna reserva
+    # un solo pase: cada reserva marca los slots que ocupa
     slot_data = []
-    for s, e in slots:
-        # reservas que tocan este slot
-        overlaps = [b for b in bookings if (b.start.replace(tzinfo=None) < e and b.end.replace(tzinfo=None) > s)]
-        if overlaps:
-            b = overlaps[0]
+    for i, b in enumerate(timeline.bucket(bookings)):
+        s, e = timeline.slot_bounds(i)
+        if b is not None:
             label = f"Reservado por {b.user.nombre} · {b.field.name}"
             slot_data.append({'start': s, 'end': e, 'status':'busy', 'label': label})
-        else:
+        elif not masks or any(slot_open(m[0], timeline, i) for m in masks.values()):
             slot_data.append({'start': s, 'end': e, 'status':'free', 'label': 'LIBRE'})
+        else:
+            slot_data.append({'start': s, 'end': e, 'status':'closed', 'label': 'CERRADO'})
 
     return render(request, 'partners/day.html', {
         'day': day,
@@ -85,23 +94,29 @@ def week_calendar_view(request):
     else:
         monday, _ = week_bounds(timezone.localdate())
 
-    grid = weekly_grid(request.gp_user, monday, start_hour=8, end_hour=22)
-
-    # Emparejamos cada fila con sus celdas para iterar simple en el template
-    rows = grid['rows']          # ej: ["08:00","08:30",...]
-    cells = grid['cells']        # matriz: filas × 7
-    rows_data = [{'time': rows[i], 'cells': cells[i]} for i in range(len(rows))]
-
+    lanes_mode = request.GET.get('lanes') == '1'
     ctx = {
         'section': 'week',
         'monday': monday,
-        'header_days': grid['header_days'],
-        'days': grid['days'],
-        'prev_monday': grid['prev_monday'],
-        'next_monday': grid['next_monday'],
-        'this_monday': grid['this_monday'],
-        'rows_data': rows_data,   # <- NUEVO
+        'lanes_mode': lanes_mode,
+        **week_header(monday),
     }
+
+    if lanes_mode:
+        # Un carril por cancha dentro de cada día
+        lanes = weekly_lanes(request.gp_user, monday)
+        ctx.update({
+            'lane_fields': [name for _, name in lanes.fields],
+            'lanes_count': len(lanes.fields),
+            'columns_count': 7 * len(lanes.fields),
+            'rows_data': lanes.rows(),
+        })
+    else:
+        grid = weekly_grid(request.gp_user, monday)
+        # Emparejamos cada fila con sus celdas para iterar simple en el template
+        rows = grid['rows']          # ej: ["08:00","08:30",...]
+        cells = grid['cells']        # matriz: filas × 7
+        ctx['rows_data'] = [{'time': rows[i], 'cells': cells[i]} for i in range(len(rows))]
     return render(request, 'partners/week.html', ctx)
 
 @partner_required_session
@@ -146,20 +161,70 @@ def monthly_income_view(request):
         "section": "income",
         "year": year,
         "month": month,
+        "month_start": date(year, month, 1),
+        "month_end": date(year, month, monthrange(year, month)[1]),
         **data,
     }
     return render(request, "partners/income.html", ctx)
 
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib import messages
-from applications.users.utils import login_required_session
-from applications.field.models import Field, Album
-from .forms import FieldEditForm, AlbumUploadForm
-from applications.users.models import User
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla."""
+    def write(self, value):
+        return value
+
+@partner_required_session
+def income_export_view(request):
+    """
+    Exporta ingresos del partner en streaming (CSV o JSONL) para cualquier rango.
+    GET ?from=YYYY-MM-DD&to=YYYY-MM-DD&format=csv|jsonl  (ambas fechas inclusive)
+    """
+    today = timezone.localdate()
+    try:
+        d0 = datetime.strptime(request.GET.get("from", ""), "%Y-%m-%d").date() if request.GET.get("from") else today.replace(day=1)
+        d1 = datetime.strptime(request.GET.get("to", ""), "%Y-%m-%d").date() if request.GET.get("to") else today
+    except ValueError:
+        return HttpResponseBadRequest("Fecha inválida: usa YYYY-MM-DD.")
+    if d1 < d0:
+        return HttpResponseBadRequest("Rango inválido: 'to' debe ser igual o posterior a 'from'.")
+    fmt = request.GET.get("format", "csv")
+    if fmt not in ("csv", "jsonl"):
+        return HttpResponseBadRequest("Formato inválido: usa csv o jsonl.")
+
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(d0, datetime.min.time()), tz)
+    end = timezone.make_aware(datetime.combine(d1 + timedelta(days=1), datetime.min.time()), tz)
+    rows = income_rows(request.gp_user, start, end)
+    columns = ["user", "field", "start", "end", "hours", "base_amount", "extras_amount", "total"]
+
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        def stream():
+            yield writer.writerow(columns)
+            for r in rows:
+                yield writer.writerow([
+                    r["user"], r["field"],
+                    timezone.localtime(r["start"]).isoformat(), timezone.localtime(r["end"]).isoformat(),
+                    r["hours"], r["base_amount"], r["extras_amount"], r["total"],
+                ])
+        content_type = "text/csv; charset=utf-8"
+    else:
+        def stream():
+            for r in rows:
+                r["start"] = timezone.localtime(r["start"])
+                r["end"] = timezone.localtime(r["end"])
+                yield json.dumps(r, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+        content_type = "application/x-ndjson; charset=utf-8"
+
+    response = StreamingHttpResponse(stream(), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="ingresos_{d0:%Y%m%d}_{d1:%Y%m%d}.{fmt}"'
+    return response
 
 @login_required_session
 def edit_field_view(request, ):
-    user = get_object_or_404(User, pk=request.session.get('user_id'))
+    user = get_session_user(request)
+    if user is None:
+        raise Http404("Usuario no encontrado")
 
     # Validamos que el usuario es el dueño
     field = Field.objects.filter(owner=user).first()
@@ -174,9 +239,9 @@ def edit_field_view(request, ):
         if form.is_valid() and album_form.is_valid():
             form.save()
 
-            images = request.FILES.getlist("images")
-            for img in images:
-                Album.objects.create(field=field, image=img)
+            _, rejected = add_album_images(field, request.FILES.getlist("images"))
+            for error in rejected:
+                messages.warning(request, f"Foto no subida — {error}")
 
             messages.success(request, "Local actualizado correctamente.")
             return redirect("partners:day")
@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Payment
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'booking', 'status', 'amount', 'card_brand', 'last4', 'created_at')
+    list_filter = ('status', 'card_brand')
+    list_select_related = ('booking', 'booking__field')
+    search_fields = ('idempotency_key', 'gateway_ref', 'auth_code')
+    readonly_fields = ('idempotency_key', 'gateway_ref', 'auth_code', 'message', 'created_at', 'updated_at')
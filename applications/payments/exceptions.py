@@ -0,0 +1,18 @@
+class PaymentError(Exception):
+    """Base domain error for payments."""
+
+
+class PaymentDeclined(PaymentError):
+    """The gateway declined the charge."""
+
+
+class GatewayTimeout(PaymentError):
+    """The gateway did not answer within the configured timeout."""
+
+
+class GatewayUnavailable(PaymentError):
+    """The gateway failed or has no free connection in the pool."""
+
+
+class PaymentInProgress(PaymentError):
+    """Another request with the same idempotency key is still being processed."""
@@ -25,6 +25,8 @@ class PaymentForm(forms.Form):
     exp_month   = forms.IntegerField(label='Mes', min_value=1, max_value=12)
     exp_year    = forms.IntegerField(label='Año', min_value=date.today().year, max_value=date.today().year+15)
     cvv         = forms.CharField(label='CVV', min_length=3, max_length=4)
+    # generada al mostrar el checkout; se repite en cada reenvío del mismo formulario
+    idempotency_key = forms.RegexField(regex=r'^[0-9a-f]{32}$', widget=forms.HiddenInput, required=False)
 
     def clean_card_number(self):
         num = self.cleaned_data['card_number'].replace(' ', '').replace('-', '')
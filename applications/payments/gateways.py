@@ -0,0 +1,132 @@
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .exceptions import GatewayTimeout, GatewayUnavailable
+
+DEFAULT_GATEWAY = {
+    'BACKEND': 'applications.payments.gateways.SimulatedGateway',
+    'TIMEOUT': 5.0,      # segundos máximos por cobro (incluye esperar conexión libre)
+    'OPTIONS': {},
+}
+
+
+@dataclass(frozen=True)
+class ChargeRequest:
+    amount: Decimal
+    holder_name: str
+    card_brand: str
+    last4: str
+    idempotency_key: str
+    currency: str = 'PEN'
+
+
+@dataclass(frozen=True)
+class ChargeResult:
+    approved: bool
+    reference: str
+    auth_code: str = ''
+    message: str = ''
+
+
+class PaymentGateway:
+    """
+    Interfaz de pasarela. `charge` debe respetar `timeout` (lanza GatewayTimeout)
+    y ser idempotente por `request.idempotency_key`: reintentar un cobro con la
+    misma clave devuelve el resultado original sin cobrar dos veces.
+    """
+
+    def charge(self, request: ChargeRequest, timeout: float) -> ChargeResult:
+        raise NotImplementedError
+
+    def lookup(self, idempotency_key: str) -> ChargeResult | None:
+        """Resultado de un cobro anterior con esa clave, o None si la pasarela no lo registró."""
+        raise NotImplementedError
+
+
+class SimulatedGateway(PaymentGateway):
+    """
+    Pasarela en proceso para desarrollo y pruebas de carga.
+    - latency_ms: (mín, máx) de espera simulada por cobro.
+    - failure_rate: probabilidad de error de la pasarela (GatewayUnavailable).
+    - decline_rate: probabilidad de rechazo; además las tarjetas terminadas en
+      0002 siempre se rechazan (como las tarjetas de prueba de las pasarelas reales).
+    - max_connections: tamaño del pool; si no hay conexión libre dentro del
+      timeout se lanza GatewayUnavailable en vez de encolar sin límite.
+    """
+    DECLINED_LAST4 = '0002'
+
+    def __init__(self, latency_ms=(50, 200), failure_rate=0.0, decline_rate=0.0,
+                 max_connections=8, remember=10000, seed=None):
+        self.latency_ms = tuple(latency_ms)
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self._pool = threading.BoundedSemaphore(max_connections)
+        self._results = OrderedDict()
+        self._results_lock = threading.Lock()
+        self._remember = remember
+        self._random = random.Random(seed)
+
+    def charge(self, request, timeout):
+        deadline = time.monotonic() + timeout
+        with self._results_lock:
+            if request.idempotency_key in self._results:
+                return self._results[request.idempotency_key]
+
+        if not self._pool.acquire(timeout=timeout):
+            raise GatewayUnavailable('Pasarela saturada: no hay conexiones libres.')
+        try:
+            latency = self._random.uniform(*self.latency_ms) / 1000
+            remaining = deadline - time.monotonic()
+            if latency > remaining:
+                time.sleep(max(0.0, remaining))
+                raise GatewayTimeout('La pasarela no respondió a tiempo.')
+            time.sleep(latency)
+            if self._random.random() < self.failure_rate:
+                raise GatewayUnavailable('Error de la pasarela.')
+            declined = request.last4 == self.DECLINED_LAST4 or self._random.random() < self.decline_rate
+            result = ChargeResult(
+                approved=not declined,
+                reference=uuid.uuid4().hex[:16],
+                auth_code='' if declined else f'{self._random.randrange(10 ** 6):06d}',
+                message='Tarjeta rechazada.' if declined else 'Aprobado',
+            )
+        finally:
+            self._pool.release()
+
+        with self._results_lock:
+            self._results[request.idempotency_key] = result
+            while len(self._results) > self._remember:
+                self._results.popitem(last=False)
+        return result
+
+    def lookup(self, idempotency_key):
+        with self._results_lock:
+            return self._results.get(idempotency_key)
+
+
+def gateway_settings():
+    return {**DEFAULT_GATEWAY, **getattr(settings, 'GP_PAYMENT_GATEWAY', {})}
+
+
+@lru_cache(maxsize=1)
+def get_gateway() -> PaymentGateway:
+    """Instancia única (por proceso) de la pasarela configurada en GP_PAYMENT_GATEWAY."""
+    conf = gateway_settings()
+    return import_string(conf['BACKEND'])(**conf['OPTIONS'])
+
+
+@receiver(setting_changed)
+def _reset_gateway(setting, **kwargs):
+    if setting == 'GP_PAYMENT_GATEWAY':
+        get_gateway.cache_clear()
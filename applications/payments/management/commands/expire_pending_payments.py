@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from applications.payments.services import expire_pending_payments
+
+
+class Command(BaseCommand):
+    help = ("Cierra los pagos PENDING más viejos que GP_PAYMENT_PENDING_TTL y libera sus horarios. "
+            "Con --interval queda corriendo y repite cada N segundos.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=None,
+                            help='Segundos (default GP_PAYMENT_PENDING_TTL)')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Segundos entre pasadas; 0 = una sola vez (para cron)')
+
+    def handle(self, *args, **opts):
+        max_age = settings.GP_PAYMENT_PENDING_TTL if opts['max_age'] is None else max(0, opts['max_age'])
+        while True:
+            closed = expire_pending_payments(max_age=max_age)
+            self.stdout.write(f"{timezone.now():%Y-%m-%d %H:%M:%S} pagos pendientes vencidos: {closed}")
+            if opts['interval'] <= 0:
+                return
+            time.sleep(opts['interval'])
@@ -5,9 +5,10 @@ class PaymentMethod(models.TextChoices):
     CARD = 'card', 'Tarjeta'
 
 class PaymentStatus(models.TextChoices):
-    PENDING   = 'pending',   'Pendiente'
+    PENDING   = 'pending',   'Pendiente'    # en curso o sin respuesta (timeout)
     APPROVED  = 'approved',  'Aprobado'
     DECLINED  = 'declined',  'Rechazado'
+    FAILED    = 'failed',    'Fallido'      # pasarela caída o pendiente vencido
 
 class Payment(models.Model):
     booking = models.ForeignKey('booking.Booking', on_delete=models.CASCADE, related_name='payments')
@@ -18,7 +19,12 @@ class Payment(models.Model):
     card_brand  = models.CharField(max_length=20, blank=True, null=True)
     last4       = models.CharField(max_length=4,  blank=True, null=True)
     auth_code   = models.CharField(max_length=16, blank=True, null=True)
+    # clave que envía el checkout: un POST repetido devuelve este mismo pago
+    idempotency_key = models.CharField(max_length=64, unique=True, blank=True, null=True)
+    gateway_ref = models.CharField(max_length=64, blank=True, null=True)
+    message     = models.CharField(max_length=255, blank=True, default='')
     created_at  = models.DateTimeField(auto_now_add=True)
+    updated_at  = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f'Payment {self.id} · {self.status} · S/ {self.amount}'
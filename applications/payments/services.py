@@ -1,72 +1,177 @@
 # applications/payments/services.py
-from decimal import Decimal
-from django.db import transaction
-from applications.booking.models import Booking, BookingExtra, BookingStatus
+from datetime import timedelta
+from uuid import uuid4
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from applications.booking.models import BookingStatus
+from applications.booking.factories import BookingFactory
+from applications.booking.exceptions import SlotNotAvailable
+from .exceptions import GatewayTimeout, GatewayUnavailable, PaymentDeclined, PaymentError, PaymentInProgress
+from .gateways import ChargeRequest, gateway_settings, get_gateway
+from .models import Payment, PaymentStatus
 
 
-def compute_total(price_hour, start, end, extras):
-    """Calcula total = horas * precio + extras."""
-    duration_hours = (end - start).total_seconds() / 3600
-    if duration_hours <= 0:
-        raise ValueError("La hora de fin debe ser posterior a la hora de inicio.")
+def confirm_payment_and_create_booking(*, user, field, quote, form, idempotency_key=None):
+    """
+    Reserva + pago de la cotización `quote` (booking/quotes.py) sin tener la
+    BD bloqueada mientras responde la pasarela:
+    1) transacción corta: reserva PENDING (retiene el horario) + Payment PENDING;
+    2) cobro en la pasarela configurada, acotado por su timeout;
+    3) transacción corta: aprobado -> reserva CONFIRMED; si no -> reserva CANCELED.
+    Con la misma `idempotency_key` un reintento (doble clic, F5) devuelve el
+    resultado del primer intento en vez de volver a reservar y cobrar.
+    Devuelve (booking, payment, payment_info).
+    """
+    key = idempotency_key or uuid4().hex
+    payment = _payment_for_key(user, key)
+    if payment is not None:
+        return _replay(payment)
 
-    base = Decimal(price_hour) * Decimal(duration_hours)
+    try:
+        with transaction.atomic():
+            booking = BookingFactory.create(
+                user=user,
+                field=field,
+                quote=quote,
+                status=BookingStatus.PENDING,
+            )
+            payment = Payment.objects.create(
+                booking=booking,
+                amount=booking.total_amount,
+                holder_name=form.cleaned_data.get("holder_name"),
+                card_brand=form.card_brand(),
+                last4=form.card_last4(),
+                idempotency_key=key,
+            )
+    except (IntegrityError, SlotNotAvailable):
+        # carrera con otro POST de la misma clave: ese ya tomó el horario o la clave
+        payment = _payment_for_key(user, key)
+        if payment is None:
+            raise
+        return _replay(payment)
 
-    extras_total = sum(
-        Decimal(e["quantity"]) * Decimal(e["unit_price"]) for e in extras
+    return _charge(payment)
+
+
+def _charge(payment):
+    """
+    Cobra `payment` con su idempotency_key y lo cierra según la respuesta.
+    Si la pasarela no responde a tiempo el resultado es desconocido: el pago
+    queda PENDING y la reserva retiene el horario; reintentar con la misma
+    clave vuelve a preguntar sin cobrar dos veces (ver _replay).
+    """
+    conf = gateway_settings()
+    charge = ChargeRequest(
+        amount=payment.amount,
+        holder_name=payment.holder_name or "",
+        card_brand=payment.card_brand or "",
+        last4=payment.last4 or "",
+        idempotency_key=payment.idempotency_key,
+    )
+    try:
+        result = get_gateway().charge(charge, timeout=conf["TIMEOUT"])
+    except GatewayTimeout:
+        raise GatewayTimeout(
+            "La pasarela no respondió a tiempo. Reintenta el pago: no se cobrará dos veces."
+        )
+    except PaymentError as e:
+        # error definitivo (sin conexión libre, caída): no hubo cobro
+        _settle(payment, PaymentStatus.FAILED, message=str(e))
+        raise
+
+    _settle(payment, PaymentStatus.APPROVED if result.approved else PaymentStatus.DECLINED, result)
+    return _outcome(payment)
+
+
+def _payment_for_key(user, key):
+    return (
+        Payment.objects.select_related("booking")
+        .filter(idempotency_key=key, booking__user=user)
+        .first()
     )
 
-    return base + extras_total
-
-
-@transaction.atomic
-def confirm_payment_and_create_booking(*, user, field, start, end, extras, form):
-    """Crea la reserva + extras (pago simulado)."""
-
-    print(">> confirm_payment_and_create_booking")  # DEBUG
-    print("   user:", user.id, "field:", field.id)
-    print("   start/end:", start, end)
-    print("   extras len:", len(extras))
-    overlap = Booking.objects.filter(
-        field=field,
-        status__in=[BookingStatus.PENDING, BookingStatus.CONFIRMED],
-        start__lt=end,
-        end__gt=start,
-    ).exists()
-    print("   overlap?", overlap)  # DEBUG
-    if overlap:
-        raise ValueError("La cancha ya tiene una reserva en ese horario.")
-
-    # 2) Total
-    total = compute_total(field.price_hour, start, end, [
-        {"quantity": e["quantity"], "unit_price": e["unit_price"]} for e in extras
-    ])
-    print("   computed total:", total)  # DEBUG
-    # 3) Booking
-    booking = Booking.objects.create(
-        user=user,
-        field=field,
-        start=start,
-        end=end,
-        status=BookingStatus.CONFIRMED,
-        total_amount=total,
+
+def _payment_info(payment):
+    return {"brand": payment.card_brand, "last4": payment.last4, "amount": payment.amount}
+
+
+def _replay(payment):
+    """
+    Resultado de un intento anterior con la misma clave. Un pago PENDING
+    recién creado sigue en curso en otro request; pasado el timeout de la
+    pasarela se le vuelve a preguntar con la misma clave, y pasado
+    GP_PAYMENT_PENDING_TTL se da por vencido (ver expire_payment).
+    """
+    if payment.status == PaymentStatus.PENDING:
+        age = timezone.now() - payment.created_at
+        if age < timedelta(seconds=gateway_settings()["TIMEOUT"]):
+            raise PaymentInProgress("Tu pago se está procesando; revisa tus reservas en unos segundos.")
+        if age < timedelta(seconds=settings.GP_PAYMENT_PENDING_TTL):
+            return _charge(payment)
+        expire_payment(payment)
+    return _outcome(payment)
+
+
+def _outcome(payment):
+    """Resultado de un pago ya cerrado: la reserva o la excepción de su estado."""
+    if payment.status == PaymentStatus.APPROVED:
+        return payment.booking, payment, _payment_info(payment)
+    if payment.status == PaymentStatus.DECLINED:
+        raise PaymentDeclined(payment.message or "Pago rechazado.")
+    raise GatewayUnavailable(payment.message or "No se pudo procesar el pago.")
+
+
+def expire_payment(payment):
+    """
+    Cierra un pago PENDING abandonado (timeout sin reintento, caída entre las
+    dos transacciones): si la pasarela conoce la clave se asienta su resultado;
+    si no, nunca se cobró y se marca FAILED liberando el horario.
+    """
+    result = get_gateway().lookup(payment.idempotency_key)
+    if result is None:
+        _settle(payment, PaymentStatus.FAILED, message="Pago vencido sin respuesta de la pasarela.")
+    else:
+        _settle(payment, PaymentStatus.APPROVED if result.approved else PaymentStatus.DECLINED, result)
+
+
+def expire_pending_payments(max_age=None):
+    """Vence los pagos PENDING creados hace más de `max_age` segundos. Devuelve cuántos cerró."""
+    max_age = settings.GP_PAYMENT_PENDING_TTL if max_age is None else max_age
+    stale = (
+        Payment.objects.select_related("booking")
+        .filter(status=PaymentStatus.PENDING, created_at__lt=timezone.now() - timedelta(seconds=max_age))
+        .order_by("created_at")
     )
-    print("   booking saved id:", booking.id)  # DEBUG
-    
-    # 4) Extras
-    for e in extras:
-        BookingExtra.objects.create(
-            booking=booking,
-            field_equipment=e["fe"],
-            quantity=e["quantity"],
-            unit_price=e["unit_price"],
+    count = 0
+    for payment in stale.iterator():
+        expire_payment(payment)
+        count += 1
+    return count
+
+
+def _settle(payment, status, result=None, message=""):
+    """
+    Cierra el pago y confirma o libera la reserva (save() para que corran las
+    señales). Solo cierra pagos aún PENDING: si otro request o el vencimiento
+    ya lo cerró, deja `payment` con el estado guardado y no toca la reserva.
+    """
+    if result is not None:
+        message = result.message
+    with transaction.atomic():
+        closed = Payment.objects.filter(pk=payment.pk, status=PaymentStatus.PENDING).update(
+            status=status,
+            gateway_ref=result.reference if result is not None else payment.gateway_ref,
+            auth_code=(result.auth_code or None) if result is not None else payment.auth_code,
+            message=message[:255],
+            updated_at=timezone.now(),
+        )
+        payment.refresh_from_db(fields=["status", "gateway_ref", "auth_code", "message", "updated_at"])
+        if not closed:
+            return
+
+        booking = payment.booking
+        booking.status = (
+            BookingStatus.CONFIRMED if status == PaymentStatus.APPROVED else BookingStatus.CANCELED
         )
-    print("   extras saved")  # DEBUG
-    # 5) Pago simulado
-    payment = None
-    payment_info = {
-        "brand": form.card_brand(),
-        "last4": form.card_last4(),
-        "amount": total,
-    }
-    return booking, payment, payment_info
+        booking.save(update_fields=["status"])
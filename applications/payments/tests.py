@@ -1,3 +1,152 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from applications.users.models import User, UserRole
+from applications.field.models import Field, Equipment, FieldEquipment
+from applications.booking.intervals import availability_index
+from applications.booking.models import Booking, BookingStatus
+from applications.booking.quotes import build_quote
+from applications.booking.services import field_is_free
+from .exceptions import GatewayTimeout, PaymentDeclined
+from .forms import PaymentForm
+from .gateways import SimulatedGateway, get_gateway
+from .models import Payment, PaymentStatus
+from .services import confirm_payment_and_create_booking, expire_pending_payments
 
-# Create your tests here.
+FAST_GATEWAY = {
+    'BACKEND': 'applications.payments.gateways.SimulatedGateway',
+    'TIMEOUT': 1.0,
+    'OPTIONS': {'latency_ms': (0, 0)},
+}
+
+
+@override_settings(GP_PAYMENT_GATEWAY=FAST_GATEWAY)
+class PaymentPipelineTests(TestCase):
+    def setUp(self):
+        availability_index.clear()
+        get_gateway.cache_clear()  # el simulador recuerda claves entre tests
+        self.user = User.objects.create(nombre="Reg", email="r@e.com", password="x", rol=UserRole.REGULAR)
+        self.field = Field.objects.create(owner=self.user, name="C1", type="futbol", address="X", price_hour=50)
+        self.fe = FieldEquipment.objects.create(
+            field=self.field, equipment=Equipment.objects.create(type='chalecos'), stock=10, price_per_unit=3,
+        )
+        self.start = (timezone.now() + timedelta(days=1)).replace(hour=19, minute=0, second=0, microsecond=0)
+        self.end = self.start + timedelta(hours=1)
+
+    def pay(self, card="4242424242424242", key="a" * 32):
+        form = PaymentForm({
+            'holder_name': 'Reg', 'card_number': card, 'exp_month': 12,
+            'exp_year': timezone.now().year + 1, 'cvv': '123', 'idempotency_key': key,
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        return confirm_payment_and_create_booking(
+            user=self.user, field=self.field,
+            quote=build_quote(self.field, self.start, self.end, [(self.fe, 2)]), form=form,
+            idempotency_key=form.cleaned_data['idempotency_key'],
+        )
+
+    def test_approved_payment_is_persisted_and_confirms_booking(self):
+        booking, payment, info = self.pay()
+        payment.refresh_from_db()
+        booking.refresh_from_db()
+        self.assertEqual(payment.status, PaymentStatus.APPROVED)
+        self.assertEqual(payment.amount, booking.total_amount)
+        self.assertEqual((payment.card_brand, payment.last4), ('VISA', '4242'))
+        self.assertTrue(payment.auth_code)
+        self.assertEqual(booking.status, BookingStatus.CONFIRMED)
+        self.assertEqual(info['amount'], booking.total_amount)
+
+    def test_retry_with_same_key_returns_original_result(self):
+        booking, payment, _ = self.pay()
+        with mock.patch.object(SimulatedGateway, 'charge') as charge:
+            again, same_payment, _ = self.pay()
+        charge.assert_not_called()
+        self.assertEqual((again.pk, same_payment.pk), (booking.pk, payment.pk))
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_declined_card_releases_the_slot(self):
+        with self.assertRaises(PaymentDeclined):
+            self.pay(card="4000000000000002")
+        payment = Payment.objects.get()
+        self.assertEqual(payment.status, PaymentStatus.DECLINED)
+        self.assertEqual(payment.booking.status, BookingStatus.CANCELED)
+        self.assertTrue(field_is_free(self.field, self.start, self.end, strict=True))
+        # el mismo formulario reenviado no vuelve a intentar el cobro
+        with self.assertRaises(PaymentDeclined):
+            self.pay(card="4000000000000002")
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_gateway_timeout_keeps_slot_and_retry_charges_once(self):
+        slow = {**FAST_GATEWAY, 'TIMEOUT': 0.01, 'OPTIONS': {'latency_ms': (200, 200)}}
+        with override_settings(GP_PAYMENT_GATEWAY=slow), self.assertRaises(GatewayTimeout):
+            self.pay()
+        payment = Payment.objects.get()
+        self.assertEqual(payment.status, PaymentStatus.PENDING)
+        self.assertEqual(payment.booking.status, BookingStatus.PENDING)
+        self.assertFalse(field_is_free(self.field, self.start, self.end, strict=True))
+
+        # el reintento (ya fuera del timeout) vuelve a cobrar con la misma clave
+        Payment.objects.update(created_at=timezone.now() - timedelta(seconds=30))
+        booking, payment, _ = self.pay()
+        self.assertEqual(payment.status, PaymentStatus.APPROVED)
+        self.assertEqual(Booking.objects.get().status, BookingStatus.CONFIRMED)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_stale_pending_payment_is_expired(self):
+        slow = {**FAST_GATEWAY, 'TIMEOUT': 0.01, 'OPTIONS': {'latency_ms': (200, 200)}}
+        with override_settings(GP_PAYMENT_GATEWAY=slow), self.assertRaises(GatewayTimeout):
+            self.pay()
+        self.assertEqual(expire_pending_payments(), 0)
+        Payment.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        out = StringIO()
+        call_command('expire_pending_payments', stdout=out)
+        self.assertIn('pagos pendientes vencidos: 1', out.getvalue())
+        payment = Payment.objects.get()
+        self.assertEqual(payment.status, PaymentStatus.FAILED)
+        self.assertEqual(payment.booking.status, BookingStatus.CANCELED)
+        self.assertTrue(field_is_free(self.field, self.start, self.end, strict=True))
+
+    def test_double_submitted_checkout_creates_one_booking(self):
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        url = reverse('payments:checkout', args=[self.field.id])
+        ctx = self.client.get(url, {
+            'date': f"{self.start:%Y-%m-%d}", 'start_time': '19:00', 'end_time': '20:00',
+        }).context
+        key = ctx['form']['idempotency_key'].value()
+        data = {
+            'quote': ctx['quote_token'],
+            'holder_name': 'Reg', 'card_number': '4242424242424242', 'exp_month': 12,
+            'exp_year': timezone.now().year + 1, 'cvv': '123', 'idempotency_key': key,
+        }
+        for _ in range(2):
+            resp = self.client.post(url, data)
+            self.assertRedirects(resp, reverse('users:history'), fetch_redirect_response=False)
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(Payment.objects.get().idempotency_key, key)
+        self.assertEqual(Booking.objects.get().total_amount, ctx['quote'].total)
+
+    def test_checkout_requotes_when_prices_changed(self):
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        url = reverse('payments:checkout', args=[self.field.id])
+        token = self.client.get(url, {
+            'date': f"{self.start:%Y-%m-%d}", 'start_time': '19:00', 'end_time': '20:00',
+            f'quantity_{self.fe.id}': 2,
+        }).context['quote_token']
+        self.field.price_hour = 80
+        self.field.save()
+        resp = self.client.post(url, {
+            'quote': token, 'holder_name': 'Reg', 'card_number': '4242424242424242',
+            'exp_month': 12, 'exp_year': timezone.now().year + 1, 'cvv': '123', 'idempotency_key': 'b' * 32,
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertIn(f'quantity_{self.fe.id}=2', resp.url)
+        self.assertFalse(Booking.objects.exists())
@@ -1,64 +1,101 @@
 from datetime import datetime
+from urllib.parse import urlencode
+from uuid import uuid4
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse
 from django.contrib import messages
-from applications.users.utils import login_required_session
-from applications.users.models import User
+from django.http import Http404
+from django.utils import timezone
+from applications.users.utils import get_session_user, login_required_session
 from applications.field.models import Field, FieldEquipment
+from applications.booking.exceptions import BookingError, QuoteExpired, QuoteInvalid
+from applications.booking.quotes import build_quote, load_quote
+from .exceptions import GatewayTimeout, PaymentError, PaymentInProgress
 from .forms import PaymentForm
-from .services import confirm_payment_and_create_booking, compute_total
+from .services import confirm_payment_and_create_booking
+
+
+def _quote_request(field, data):
+    """Cotiza la fecha/horas y extras que llegan del detalle de la cancha."""
+    start = datetime.strptime(f"{data.get('date')} {data.get('start_time')}", "%Y-%m-%d %H:%M")
+    end = datetime.strptime(f"{data.get('end_time')}", "%H:%M").replace(year=start.year, month=start.month, day=start.day)
+    extras = []
+    for fe in FieldEquipment.objects.filter(field=field).select_related('equipment'):
+        qty = int(data.get(f'quantity_{fe.id}', 0) or 0)
+        if qty > 0:
+            extras.append((fe, qty))
+    return build_quote(field, start, end, extras)
+
+
+def _requote_url(field, quote):
+    """URL del checkout que vuelve a cotizar lo mismo que `quote` con los precios actuales."""
+    start, end = timezone.localtime(quote.start), timezone.localtime(quote.end)
+    params = {'date': f"{start:%Y-%m-%d}", 'start_time': f"{start:%H:%M}", 'end_time': f"{end:%H:%M}"}
+    params.update({f'quantity_{line.fe_id}': line.quantity for line in quote.lines})
+    return f"{reverse('payments:checkout', args=[field.id])}?{urlencode(params)}"
+
 
 @login_required_session
 def checkout_view(request, field_id):
-    print(">> checkout_view", request.method)  # DEBUG
+    """
+    GET (o POST desde el detalle de la cancha): cotiza y muestra el resumen con
+    la cotización firmada en el formulario. POST con `quote`: verifica la firma
+    y cobra ese total, sin recalcular precios ni volver a leer los extras.
+    """
     field = get_object_or_404(Field, pk=field_id)
-    user  = get_object_or_404(User, pk=request.session.get('user_id'))
+    user  = get_session_user(request)
+    if user is None:
+        raise Http404("Usuario no encontrado")
 
-    data = request.POST if request.method == 'POST' else request.GET
-    print("   data keys:", list(data.keys()))  # DEBUG
-    try:
-        start = datetime.strptime(f"{data.get('date')} {data.get('start_time')}", "%Y-%m-%d %H:%M")
-        end   = datetime.strptime(f"{data.get('end_time')}", "%H:%M").replace(year=start.year, month=start.month, day=start.day)
-        print("   parsed start/end OK:", start, end)  # DEBUG
-    except Exception:
-        print("   ERROR parsing date/time:", e)  # DEBUG
-        messages.error(request, "Debes proporcionar fecha y horas válidas.")
-        return redirect(reverse('field:list'))
-
-    # extras solicitados
-    fe_list = list(FieldEquipment.objects.filter(field=field).select_related('equipment'))
-    requested_extras = []
-    for fe in fe_list:
-        qty = int(data.get(f'quantity_{fe.id}', 0) or 0)
-        if qty > 0:
-            requested_extras.append({'fe': fe, 'quantity': qty, 'unit_price': fe.price_per_unit})
-    print("   extras count:", len(requested_extras))  # DEBUG
+    token = request.POST.get('quote') if request.method == 'POST' else None
+    if token is None:
+        data = request.POST if request.method == 'POST' else request.GET
+        try:
+            quote = _quote_request(field, data)
+        except (ValueError, BookingError):
+            messages.error(request, "Debes proporcionar fecha y horas válidas.")
+            return redirect(reverse('field:list'))
+        form = PaymentForm(initial={'idempotency_key': uuid4().hex})
+    else:
+        try:
+            quote = load_quote(token, field)
+        except QuoteExpired as e:
+            messages.warning(request, str(e))
+            if e.quote is None:
+                return redirect(reverse('field:list'))
+            return redirect(_requote_url(field, e.quote))
+        except QuoteInvalid as e:
+            messages.error(request, str(e))
+            return redirect(reverse('field:list'))
 
-    total = compute_total(field.price_hour, start, end, [
-        {'quantity': r['quantity'], 'unit_price': r['unit_price']} for r in requested_extras
-    ])
-    print("   total:", total)  # DEBUG
-    
-    if request.method == 'POST':
         form = PaymentForm(request.POST)
-        print("   POST form valid?", form.is_valid())  # DEBUG
         if form.is_valid():
             try:
-                booking, payment, _ = confirm_payment_and_create_booking(
-                    user=user, field=field, start=start, end=end,
-                    extras=requested_extras, form=form
+                confirm_payment_and_create_booking(
+                    user=user, field=field, quote=quote, form=form,
+                    idempotency_key=form.cleaned_data.get('idempotency_key'),
                 )
-                print("   BOOKING CREATED ID:", booking.id)  # DEBUG
-            except ValueError as e:
-                print("   ERROR confirm_payment:", e)  # DEBUG
+            except PaymentInProgress as e:
+                messages.info(request, str(e))
+                return redirect('users:history')
+            except GatewayTimeout as e:
+                # resultado desconocido: el horario sigue retenido y el formulario
+                # vuelve con la misma clave para reintentar sin doble cobro
+                messages.warning(request, str(e))
+                return render(request, 'payments/checkout.html', {
+                    'field': field, 'quote': quote, 'quote_token': token,
+                    'start': quote.start, 'end': quote.end, 'total': quote.total, 'form': form,
+                })
+            except QuoteExpired as e:
+                messages.warning(request, str(e))
+                return redirect(_requote_url(field, quote))
+            except (BookingError, PaymentError) as e:
                 messages.error(request, str(e))
                 return redirect(reverse('field:list'))
             messages.success(request, "¡Pago realizado y reserva creada!")
             return redirect('users:history')
-    else:
-        form = PaymentForm()
 
     return render(request, 'payments/checkout.html', {
-        'field': field, 'start': start, 'end': end,
-        'extras': requested_extras, 'total': total, 'form': form,
+        'field': field, 'quote': quote, 'quote_token': token or quote.sign(),
+        'start': quote.start, 'end': quote.end, 'total': quote.total, 'form': form,
     })
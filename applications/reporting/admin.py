@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import FieldDailyRollup
 
-# Register your models here.
+
+@admin.register(FieldDailyRollup)
+class FieldDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('field', 'day', 'bookings_count', 'hours_booked', 'base_revenue', 'extras_revenue')
+    list_filter = ('day',)
+    search_fields = ('field__name',)
+    list_select_related = ('field', 'field__owner')
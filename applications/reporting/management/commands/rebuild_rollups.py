@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from applications.booking.models import Booking
+from applications.reporting.services import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los acumulados diarios por cancha (reporting) a partir de las reservas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='YYYY-MM-DD (por defecto: primera reserva)')
+        parser.add_argument('--to', dest='date_to', help='YYYY-MM-DD (por defecto: última reserva)')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Días por tramo (default 31)')
+
+    def handle(self, *args, **opts):
+        bounds = Booking.objects.aggregate(first=Min('start'), last=Max('start'))
+        if bounds['first'] is None and not (opts['date_from'] and opts['date_to']):
+            self.stdout.write("No hay reservas; nada que reconstruir.")
+            return
+        try:
+            date_from = (datetime.strptime(opts['date_from'], "%Y-%m-%d").date() if opts['date_from']
+                         else timezone.localtime(bounds['first']).date())
+            date_to = (datetime.strptime(opts['date_to'], "%Y-%m-%d").date() if opts['date_to']
+                       else timezone.localtime(bounds['last']).date())
+        except ValueError:
+            raise CommandError("Las fechas deben tener el formato YYYY-MM-DD.")
+        if date_to < date_from or opts['chunk_days'] < 1:
+            raise CommandError("Rango o tamaño de tramo inválido.")
+
+        written = rebuild_rollups(date_from, date_to, chunk_days=opts['chunk_days'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Acumulados reconstruidos del {date_from} al {date_to}: {written} filas."
+        ))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:45
+
+import applications.reporting.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('field', '0011_fieldequipment_price_per_unit_alter_equipment_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FieldDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bookings_count', models.PositiveIntegerField(default=0)),
+                ('hours_booked', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('base_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('extras_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('hour_histogram', models.JSONField(default=applications.reporting.models.empty_histogram)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='field.field')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'field'], name='reporting_f_day_896651_idx')],
+                'constraints': [models.UniqueConstraint(fields=('field', 'day'), name='uniq_rollup_field_day')],
+            },
+        ),
+    ]
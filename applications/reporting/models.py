@@ -1,3 +1,35 @@
 from django.db import models
 
-# Create your models here.
+
+def empty_histogram():
+    return [0] * 24
+
+
+class FieldDailyRollup(models.Model):
+    """
+    Acumulado diario por cancha de las reservas confirmadas (día local de inicio).
+    Se mantiene desde las señales de Booking/BookingExtra y se reconstruye con
+    `manage.py rebuild_rollups`.
+    """
+    field = models.ForeignKey('field.Field', on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    bookings_count = models.PositiveIntegerField(default=0)
+    hours_booked = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    base_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    extras_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # reservas por hora de inicio: índice 0..23
+    hour_histogram = models.JSONField(default=empty_histogram)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['field', 'day'], name='uniq_rollup_field_day'),
+        ]
+        indexes = [models.Index(fields=['day', 'field'])]
+
+    def __str__(self):
+        return f'Rollup {self.field_id} · {self.day} · {self.bookings_count} reservas'
+
+    @property
+    def total_revenue(self):
+        return self.base_revenue + self.extras_revenue
@@ -0,0 +1,156 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, ExtractMonth
+from django.utils import timezone
+
+from applications.booking.models import Booking, BookingExtra, BookingStatus
+from .models import FieldDailyRollup, empty_histogram
+
+REPORT_STATUSES = [BookingStatus.CONFIRMED]
+if hasattr(BookingStatus, "PAID"):
+    REPORT_STATUSES.append(BookingStatus.PAID)
+
+
+def with_extras_total(qs):
+    """Anota `extras_total` (suma de quantity * unit_price) con una subconsulta correlacionada."""
+    extras = (
+        BookingExtra.objects.filter(booking=OuterRef('pk'))
+        .order_by()
+        .values('booking')
+        .annotate(s=Sum(F('quantity') * F('unit_price')))
+        .values('s')
+    )
+    money = DecimalField(max_digits=12, decimal_places=2)
+    return qs.annotate(extras_total=Coalesce(Subquery(extras, output_field=money), Value(Decimal('0')), output_field=money))
+
+
+def _day_bounds(d0, d1):
+    """[d0 00:00, d1+1 00:00) aware en la zona actual."""
+    tz = timezone.get_current_timezone()
+    return (timezone.make_aware(datetime.combine(d0, time.min), tz),
+            timezone.make_aware(datetime.combine(d1 + timedelta(days=1), time.min), tz))
+
+
+def aggregate_rollups(rows):
+    """
+    Agrupa filas (field_id, start, end, total_amount, extras_total) por (cancha, día local).
+    Devuelve {(field_id, day): FieldDailyRollup sin guardar}.
+    """
+    out = {}
+    for field_id, start, end, total, extras in rows:
+        local = timezone.localtime(start)
+        key = (field_id, local.date())
+        r = out.get(key)
+        if r is None:
+            r = out[key] = FieldDailyRollup(field_id=field_id, day=key[1], hour_histogram=empty_histogram(),
+                                            hours_booked=Decimal('0'), base_revenue=Decimal('0'),
+                                            extras_revenue=Decimal('0'))
+        r.bookings_count += 1
+        r.hours_booked += Decimal((end - start).total_seconds()) / 3600
+        r.base_revenue += total - extras
+        r.extras_revenue += extras
+        r.hour_histogram[local.hour] += 1
+    for r in out.values():
+        r.hours_booked = r.hours_booked.quantize(Decimal('0.01'))
+    return out
+
+
+def _rollup_rows(qs):
+    return with_extras_total(qs).values_list('field_id', 'start', 'end', 'total_amount', 'extras_total')
+
+
+def refresh_rollup(field_id, day):
+    """Recalcula el acumulado de una (cancha, día) desde las reservas crudas de ese día."""
+    d0, d1 = _day_bounds(day, day)
+    qs = Booking.objects.filter(field_id=field_id, status__in=REPORT_STATUSES, start__gte=d0, start__lt=d1)
+    rollup = aggregate_rollups(_rollup_rows(qs)).get((field_id, day))
+    with transaction.atomic():
+        if rollup is None:
+            FieldDailyRollup.objects.filter(field_id=field_id, day=day).delete()
+            return
+        FieldDailyRollup.objects.update_or_create(field_id=field_id, day=day, defaults={
+            'bookings_count': rollup.bookings_count,
+            'hours_booked': rollup.hours_booked,
+            'base_revenue': rollup.base_revenue,
+            'extras_revenue': rollup.extras_revenue,
+            'hour_histogram': rollup.hour_histogram,
+        })
+
+
+def rebuild_rollups(date_from, date_to, chunk_days=31):
+    """
+    Reconstruye los acumulados de [date_from, date_to] por tramos de `chunk_days`,
+    leyendo las reservas con un cursor (iterator) para no cargarlas todas en memoria.
+    Devuelve la cantidad de filas escritas.
+    """
+    written = 0
+    d = date_from
+    while d <= date_to:
+        chunk_end = min(date_to, d + timedelta(days=chunk_days - 1))
+        t0, t1 = _day_bounds(d, chunk_end)
+        qs = Booking.objects.filter(status__in=REPORT_STATUSES, start__gte=t0, start__lt=t1).order_by()
+        rollups = aggregate_rollups(_rollup_rows(qs).iterator(chunk_size=2000))
+        with transaction.atomic():
+            FieldDailyRollup.objects.filter(day__gte=d, day__lte=chunk_end).delete()
+            FieldDailyRollup.objects.bulk_create(rollups.values(), batch_size=500)
+        written += len(rollups)
+        d = chunk_end + timedelta(days=1)
+    return written
+
+
+def partner_rollups(partner, date_from, date_to):
+    """QuerySet de acumulados de las canchas del partner en [date_from, date_to]."""
+    return FieldDailyRollup.objects.filter(field__owner=partner, day__gte=date_from, day__lte=date_to)
+
+
+def rollup_summary(partner, date_from, date_to):
+    """Totales del rango leyendo solo acumulados (una consulta, sin tocar Booking)."""
+    agg = partner_rollups(partner, date_from, date_to).aggregate(
+        count=Sum('bookings_count'),
+        hours=Sum('hours_booked'),
+        base=Sum('base_revenue'),
+        extras=Sum('extras_revenue'),
+    )
+    base, extras = agg['base'] or 0, agg['extras'] or 0
+    return {
+        'count': agg['count'] or 0,
+        'hours': agg['hours'] or 0,
+        'base_amount': base,
+        'extras_amount': extras,
+        'total_amount': base + extras,
+    }
+
+
+def rollup_days(partner, date_from, date_to):
+    """
+    Por día (sumando canchas): {day: {'count', 'total', 'histogram'}}.
+    Una consulta; sirve para días top, hora top y media diaria.
+    """
+    days = defaultdict(lambda: {'count': 0, 'total': 0, 'histogram': empty_histogram()})
+    rows = partner_rollups(partner, date_from, date_to).values_list(
+        'day', 'bookings_count', 'base_revenue', 'extras_revenue', 'hour_histogram')
+    for day, count, base, extras, histogram in rows:
+        d = days[day]
+        d['count'] += count
+        d['total'] += base + extras
+        d['histogram'] = [a + b for a, b in zip(d['histogram'], histogram)]
+    return dict(days)
+
+
+def yearly_summary(partner, year):
+    """Totales por mes del año agrupados en la BD sobre los acumulados (una consulta)."""
+    months = {m: {'count': 0, 'total': 0} for m in range(1, 13)}
+    rows = (
+        partner_rollups(partner, date(year, 1, 1), date(year, 12, 31))
+        .annotate(m=ExtractMonth('day'))
+        .values('m')
+        .annotate(count=Sum('bookings_count'), base=Sum('base_revenue'), extras=Sum('extras_revenue'))
+        .order_by('m')
+    )
+    for r in rows:
+        months[r['m']] = {'count': r['count'], 'total': r['base'] + r['extras']}
+    return months
@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from applications.booking.models import Booking, BookingExtra
+from .services import refresh_rollup
+
+
+def _schedule(field_id, start):
+    """Recalcula la (cancha, día) afectada al confirmar la transacción."""
+    day = timezone.localtime(start).date()
+    transaction.on_commit(lambda: refresh_rollup(field_id, day))
+
+
+@receiver(pre_save, sender=Booking)
+def remember_previous_slot(sender, instance, **kwargs):
+    # si la reserva cambia de cancha o de día, el día anterior también se recalcula
+    instance._rollup_prev = None
+    if instance.pk:
+        instance._rollup_prev = Booking.objects.filter(pk=instance.pk).values_list('field_id', 'start').first()
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, **kwargs):
+    prev = getattr(instance, '_rollup_prev', None)
+    if prev and prev != (instance.field_id, instance.start):
+        _schedule(*prev)
+    _schedule(instance.field_id, instance.start)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    _schedule(instance.field_id, instance.start)
+
+
+@receiver(post_save, sender=BookingExtra)
+@receiver(post_delete, sender=BookingExtra)
+def extra_changed(sender, instance, **kwargs):
+    def refresh():
+        booking = Booking.objects.filter(pk=instance.booking_id).values_list('field_id', 'start').first()
+        if booking:  # si la reserva se borró, su propia señal ya recalculó el día
+            refresh_rollup(booking[0], timezone.localtime(booking[1]).date())
+    transaction.on_commit(refresh)
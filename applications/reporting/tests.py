@@ -1,3 +1,69 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from applications.users.models import User, UserRole
+from applications.field.models import Field, Equipment, FieldEquipment
+from applications.booking.models import Booking, BookingExtra, BookingStatus
+from applications.partners.services import monthly_stats, monthly_summary
+from applications.reporting.models import FieldDailyRollup
+from applications.reporting.services import yearly_summary
 
-# Create your tests here.
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.partner = User.objects.create(nombre="Socio", email="s@e.com", password="x", rol=UserRole.PARTNER)
+        self.ana = User.objects.create(nombre="Ana", email="a@e.com", password="x", rol=UserRole.REGULAR)
+        self.field = Field.objects.create(owner=self.partner, name="C1", type="futbol", address="X", price_hour=50)
+        self.fe = FieldEquipment.objects.create(field=self.field, equipment=Equipment.objects.create(type='conos'),
+                                                stock=10, price_per_unit=2)
+
+    def book(self, day, hour, total, minutes=60, status=BookingStatus.CONFIRMED):
+        start = timezone.make_aware(datetime(2025, 3, day, hour))
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.create(user=self.ana, field=self.field, status=status, total_amount=total,
+                                          start=start, end=start + timedelta(minutes=minutes))
+
+    def test_incremental_updates(self):
+        b = self.book(3, 19, 56, minutes=90)
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingExtra.objects.create(booking=b, field_equipment=self.fe, quantity=3, unit_price=2)
+        self.book(3, 8, 50, status=BookingStatus.CANCELED)
+
+        r = FieldDailyRollup.objects.get(field=self.field, day=b.start.date())
+        self.assertEqual(r.bookings_count, 1)
+        self.assertEqual(r.hours_booked, Decimal('1.50'))
+        self.assertEqual(r.base_revenue, Decimal('50'))
+        self.assertEqual(r.extras_revenue, Decimal('6'))
+        self.assertEqual(r.hour_histogram[19], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            b.start += timedelta(days=1)
+            b.end += timedelta(days=1)
+            b.save()
+        self.assertEqual(list(FieldDailyRollup.objects.values_list('day', flat=True)), [b.start.date()])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            b.delete()
+        self.assertFalse(FieldDailyRollup.objects.exists())
+
+    def test_rebuild_and_reports_from_rollups(self):
+        self.book(3, 19, 60)
+        self.book(3, 20, 50)
+        self.book(9, 19, 50)
+        FieldDailyRollup.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_rollups', chunk_days=2, stdout=out)
+        self.assertEqual(FieldDailyRollup.objects.count(), 2)
+        self.assertIn(': 2 filas.', out.getvalue())
+
+        raw = monthly_stats(self.partner, 2025, 3)
+        with override_settings(GP_REPORTING_ROLLUPS=True):
+            rolled = monthly_stats(self.partner, 2025, 3)
+            summary = monthly_summary(self.partner, 2025, 3)
+        for key in ("total_income", "days_top", "top_hour", "avg_per_day", "top_users"):
+            self.assertEqual(rolled[key], raw[key], key)
+        self.assertEqual(summary, {'total_amount': Decimal('160'), 'count': 3})
+        self.assertEqual(yearly_summary(self.partner, 2025)[3], {'count': 3, 'total': Decimal('160')})
@@ -1,5 +1,21 @@
 from django.contrib import admin
-from .models import Schedule
+from .models import ClosureException, OpeningHours, Schedule
 # Register your models here.
 
-admin.site.register(Schedule)   
+admin.site.register(Schedule)
+
+
+@admin.register(OpeningHours)
+class OpeningHoursAdmin(admin.ModelAdmin):
+    list_display = ('field', 'weekday', 'opens', 'closes')
+    list_filter = ('weekday',)
+    list_select_related = ('field',)
+    autocomplete_fields = ('field',)
+
+
+@admin.register(ClosureException)
+class ClosureExceptionAdmin(admin.ModelAdmin):
+    list_display = ('field', 'date', 'opens', 'closes', 'reason')
+    list_select_related = ('field',)
+    date_hierarchy = 'date'
+    autocomplete_fields = ('field',)
@@ -0,0 +1,51 @@
+"""
+Bitsets de un día: el bit i representa el slot [i*SLOT_MINUTES, (i+1)*SLOT_MINUTES)
+en hora local; 1 = reservable. Un día cabe en un int de 96 bits.
+"""
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+MASK_BYTES = (SLOTS_PER_DAY + 7) // 8
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+
+def minutes_of_day(t):
+    return t.hour * 60 + t.minute
+
+
+def window_bits(m0, m1):
+    """Bits de los slots que toca [m0, m1) (minutos del día)."""
+    i0 = m0 // SLOT_MINUTES
+    i1 = min(SLOTS_PER_DAY, -(-m1 // SLOT_MINUTES))
+    return ((1 << (i1 - i0)) - 1) << i0 if i1 > i0 else 0
+
+
+def day_mask(windows):
+    """Máscara del día con los [(m0, m1), ...] abiertos."""
+    mask = 0
+    for m0, m1 in windows:
+        mask |= window_bits(m0, m1)
+    return mask
+
+
+def covers(mask, m0, m1):
+    """True si todos los slots de [m0, m1) están abiertos en `mask` (None = abierta)."""
+    if mask is None:
+        return True
+    need = window_bits(m0, m1)
+    return mask & need == need
+
+
+def open_span(mask):
+    """(primer minuto abierto, minuto de cierre) del día, o None si está cerrado."""
+    if not mask:
+        return None
+    first = (mask & -mask).bit_length() - 1
+    return first * SLOT_MINUTES, mask.bit_length() * SLOT_MINUTES
+
+
+def to_bytes(mask):
+    return None if mask is None else mask.to_bytes(MASK_BYTES, 'little')
+
+
+def from_bytes(raw):
+    return None if raw is None else int.from_bytes(bytes(raw), 'little')
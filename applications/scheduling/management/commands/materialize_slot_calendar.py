@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from applications.scheduling.models import SlotCalendar
+from applications.scheduling.services import CALENDAR_HORIZON_DAYS, materialize_calendar
+
+
+class Command(BaseCommand):
+    help = "Materializa el calendario de slots reservables (SlotCalendar) de los próximos días."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='YYYY-MM-DD (por defecto: hoy)')
+        parser.add_argument('--days', type=int, default=CALENDAR_HORIZON_DAYS,
+                            help=f'Días hacia adelante (default {CALENDAR_HORIZON_DAYS})')
+        parser.add_argument('--field', type=int, action='append', dest='fields',
+                            help='Solo esta cancha (se puede repetir)')
+        parser.add_argument('--prune', action='store_true', help='Borra los días anteriores a --from')
+
+    def handle(self, *args, **opts):
+        try:
+            date_from = (datetime.strptime(opts['date_from'], "%Y-%m-%d").date() if opts['date_from']
+                         else timezone.localdate())
+        except ValueError:
+            raise CommandError("La fecha debe tener el formato YYYY-MM-DD.")
+        if opts['days'] < 1:
+            raise CommandError("--days debe ser al menos 1.")
+
+        written = materialize_calendar(date_from, opts['days'], field_ids=opts['fields'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Calendario materializado desde {date_from} ({opts['days']} días): {written} filas."
+        ))
+        if opts['prune']:
+            removed, _ = SlotCalendar.objects.filter(date__lt=date_from).delete()
+            self.stdout.write(f"Días pasados borrados: {removed}")
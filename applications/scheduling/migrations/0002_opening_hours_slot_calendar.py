@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0019_field_rates'),
+        ('scheduling', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('opens', models.TimeField(verbose_name='abre')),
+                ('closes', models.TimeField(verbose_name='cierra')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='día')),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_hours', to='field.field')),
+            ],
+            options={
+                'verbose_name_plural': 'opening hours',
+                'ordering': ['field', 'weekday', 'opens'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClosureException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='fecha')),
+                ('opens', models.TimeField(blank=True, null=True, verbose_name='abre')),
+                ('closes', models.TimeField(blank=True, null=True, verbose_name='cierra')),
+                ('reason', models.CharField(blank=True, max_length=120, verbose_name='motivo')),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closures', to='field.field')),
+            ],
+            options={
+                'ordering': ['field', 'date', 'opens'],
+                'indexes': [models.Index(fields=['field', 'date'], name='closure_field_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SlotCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bits', models.BinaryField(null=True)),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_calendar', to='field.field')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('field', 'date'), name='uniq_slot_calendar_field_date')],
+            },
+        ),
+    ]
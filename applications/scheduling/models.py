@@ -1,5 +1,8 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 
+from .calendar import SLOT_MINUTES, minutes_of_day
+
 # Create your models here.
 class Schedule(models.Model):
     field = models.ForeignKey('field.Field', on_delete=models.CASCADE, related_name='schedules')
@@ -10,4 +13,101 @@ class Schedule(models.Model):
     estado = models.CharField(max_length=50, default='true')  # true= disponible, false= no ocupado
 
     def __str__(self):
-        return f'Schedule {self.id} - {self.field.nombre} - {self.user.nombre}'
\ No newline at end of file
+        return f'Schedule {self.id} - {self.field.nombre} - {self.user.nombre}'
+
+
+WEEKDAY_CHOICES = (
+    (0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'),
+    (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo'),
+)
+
+
+class _Window(models.Model):
+    """Ventana [opens, closes) dentro de un día; closes 00:00 = hasta la medianoche."""
+    opens = models.TimeField('abre')
+    closes = models.TimeField('cierra')
+
+    class Meta:
+        abstract = True
+
+    @property
+    def minutes(self):
+        return minutes_of_day(self.opens), minutes_of_day(self.closes) or 24 * 60
+
+    def clean(self):
+        super().clean()
+        if self.opens is None or self.closes is None:
+            return
+        m0, m1 = self.minutes
+        if m0 >= m1:
+            raise ValidationError({'closes': 'Debe cerrar después de abrir.'})
+        if m0 % SLOT_MINUTES or m1 % SLOT_MINUTES:
+            raise ValidationError(f'Las horas deben ser múltiplos de {SLOT_MINUTES} minutos.')
+
+
+class OpeningHours(_Window):
+    """
+    Horario semanal de atención de la cancha (puede haber varios tramos por día).
+    Una cancha sin ningún tramo no tiene horario definido: se puede reservar a
+    cualquier hora, como hasta ahora.
+    """
+    field = models.ForeignKey('field.Field', on_delete=models.CASCADE, related_name='opening_hours')
+    weekday = models.PositiveSmallIntegerField('día', choices=WEEKDAY_CHOICES)
+
+    class Meta:
+        ordering = ['field', 'weekday', 'opens']
+        verbose_name_plural = 'opening hours'
+
+    def __str__(self):
+        return f'{self.get_weekday_display()} {self.opens:%H:%M}-{self.closes:%H:%M}'
+
+
+class ClosureException(_Window):
+    """
+    Excepción de un día concreto (feriado, mantenimiento, evento): sin horas la
+    cancha está cerrada todo el día; con horas, ese día abre solo en ese tramo
+    (reemplaza al horario semanal).
+    """
+    field = models.ForeignKey('field.Field', on_delete=models.CASCADE, related_name='closures')
+    date = models.DateField('fecha')
+    opens = models.TimeField('abre', null=True, blank=True)
+    closes = models.TimeField('cierra', null=True, blank=True)
+    reason = models.CharField('motivo', max_length=120, blank=True)
+
+    class Meta:
+        ordering = ['field', 'date', 'opens']
+        indexes = [models.Index(fields=['field', 'date'], name='closure_field_date_idx')]
+
+    def __str__(self):
+        if self.opens is None:
+            return f'{self.date:%d/%m/%Y} cerrado'
+        return f'{self.date:%d/%m/%Y} {self.opens:%H:%M}-{self.closes:%H:%M}'
+
+    @property
+    def closed_all_day(self):
+        return self.opens is None
+
+    def clean(self):
+        if (self.opens is None) != (self.closes is None):
+            raise ValidationError('Indica ambas horas o ninguna (cerrado todo el día).')
+        super().clean()
+
+
+class SlotCalendar(models.Model):
+    """
+    Slots reservables de una cancha en un día, materializados desde OpeningHours
+    y ClosureException: un bit por slot de SLOT_MINUTES (96 bits = 12 bytes por
+    día) en lugar de una fila por slot. bits NULL = sin horario definido (abierta).
+    Lo genera `manage.py materialize_slot_calendar` (ver scheduling/services.py).
+    """
+    field = models.ForeignKey('field.Field', on_delete=models.CASCADE, related_name='slot_calendar')
+    date = models.DateField()
+    bits = models.BinaryField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['field', 'date'], name='uniq_slot_calendar_field_date'),
+        ]
+
+    def __str__(self):
+        return f'SlotCalendar {self.field_id} {self.date}'
@@ -0,0 +1,174 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from applications.field.models import Field
+
+from .calendar import covers, day_mask, from_bytes, open_span, to_bytes
+from .models import ClosureException, OpeningHours, SlotCalendar
+
+# Días que se materializan por defecto hacia adelante
+CALENDAR_HORIZON_DAYS = 120
+# Horario de las grillas cuando ninguna cancha tiene horario definido
+DEFAULT_HOURS = (8, 22)
+
+
+def _templates(field_ids):
+    """{field_id: {día: [(m0, m1), ...]}} del horario semanal."""
+    out = defaultdict(lambda: defaultdict(list))
+    for row in OpeningHours.objects.filter(field_id__in=field_ids):
+        out[row.field_id][row.weekday].append(row.minutes)
+    return out
+
+
+def _closures(field_ids, first_day, last_day):
+    """{(field_id, fecha): [(m0, m1), ...]}; lista vacía = cerrada todo el día."""
+    out = {}
+    rows = ClosureException.objects.filter(field_id__in=field_ids, date__gte=first_day, date__lte=last_day)
+    for row in rows.order_by('opens'):
+        windows = out.setdefault((row.field_id, row.date), [])
+        if row.closed_all_day:
+            windows.clear()
+            windows.append(None)
+        elif None not in windows:
+            windows.append(row.minutes)
+    return out
+
+
+def compute_masks(field_ids, days):
+    """
+    {(field_id, fecha): máscara} desde el horario semanal y sus excepciones
+    (dos consultas para todas las canchas y días). None = sin horario definido.
+    """
+    field_ids, days = list(field_ids), list(days)
+    if not field_ids or not days:
+        return {}
+    templates = _templates(field_ids)
+    closures = _closures(field_ids, min(days), max(days))
+    masks = {}
+    for fid in field_ids:
+        week = templates.get(fid)
+        for day in days:
+            exception = closures.get((fid, day))
+            if exception is not None:
+                masks[fid, day] = 0 if None in exception else day_mask(exception)
+            elif week is not None:
+                masks[fid, day] = day_mask(week.get(day.weekday(), ()))
+            else:
+                masks[fid, day] = None
+    return masks
+
+
+def materialize_calendar(date_from, days=CALENDAR_HORIZON_DAYS, field_ids=None, chunk_size=200):
+    """
+    Escribe (o reescribe) SlotCalendar de [date_from, date_from + days) por
+    tramos de canchas: dos lecturas y un upsert por tramo. Devuelve filas escritas.
+    """
+    if field_ids is None:
+        field_ids = Field.objects.order_by('id').values_list('id', flat=True)
+    field_ids = list(field_ids)
+    dates = [date_from + timedelta(days=i) for i in range(days)]
+    written = 0
+    for i in range(0, len(field_ids), chunk_size):
+        masks = compute_masks(field_ids[i:i + chunk_size], dates)
+        rows = [SlotCalendar(field_id=fid, date=day, bits=to_bytes(mask)) for (fid, day), mask in masks.items()]
+        SlotCalendar.objects.bulk_create(
+            rows, batch_size=1000,
+            update_conflicts=True, unique_fields=['field', 'date'], update_fields=['bits'],
+        )
+        written += len(rows)
+    return written
+
+
+def refresh_calendar(field_id):
+    """Rehace los días ya materializados (de hoy en adelante) de una cancha tras cambiar su horario."""
+    dates = sorted(SlotCalendar.objects.filter(field_id=field_id, date__gte=timezone.localdate())
+                   .values_list('date', flat=True))
+    if not dates:
+        return 0
+    masks = compute_masks([field_id], dates)
+    SlotCalendar.objects.bulk_create(
+        [SlotCalendar(field_id=field_id, date=day, bits=to_bytes(mask)) for (_, day), mask in masks.items()],
+        update_conflicts=True, unique_fields=['field', 'date'], update_fields=['bits'],
+    )
+    return len(dates)
+
+
+def schedule_refresh(field_id):
+    transaction.on_commit(lambda: refresh_calendar(field_id))
+
+
+def open_masks(field_ids, days):
+    """
+    {field_id: [máscara por día]} leyendo SlotCalendar (una consulta); los días
+    aún no materializados se calculan al vuelo desde el horario.
+    """
+    field_ids, days = list(field_ids), list(days)
+    found = {
+        (fid, day): from_bytes(bits)
+        for fid, day, bits in SlotCalendar.objects.filter(field_id__in=field_ids, date__in=days)
+        .values_list('field_id', 'date', 'bits')
+    }
+    missing_fields = {fid for fid in field_ids for day in days if (fid, day) not in found}
+    if missing_fields:
+        computed = compute_masks(missing_fields, days)
+        for key, mask in computed.items():
+            found.setdefault(key, mask)
+    return {fid: [found[fid, day] for day in days] for fid in field_ids}
+
+
+def _day_parts(start, end):
+    """[(fecha, minuto inicial, minuto final), ...] de [start, end) partido por días locales."""
+    start, end = timezone.localtime(start), timezone.localtime(end)
+    parts = []
+    day = start.date()
+    while True:
+        midnight = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+        m0 = 0 if parts else start.hour * 60 + start.minute
+        if end <= midnight:
+            m1 = end.hour * 60 + end.minute if end < midnight else 24 * 60
+            if end.second or end.microsecond:
+                m1 += 1
+            parts.append((day, m0, m1))
+            return parts
+        parts.append((day, m0, 24 * 60))
+        day += timedelta(days=1)
+
+
+def is_open(field, start, end):
+    """True si la cancha atiende durante todo [start, end) según su calendario."""
+    parts = _day_parts(start, end)
+    masks = open_masks([field.pk], [day for day, _, _ in parts])[field.pk]
+    return all(covers(mask, m0, m1) for mask, (_, m0, m1) in zip(masks, parts))
+
+
+def closed_fields(fields, start, end):
+    """
+    Ids de `fields` (queryset de Field) que no atienden durante todo [start, end).
+    Solo se leen máscaras de las canchas con horario o con alguna excepción esos
+    días: sin ninguno de los dos una cancha atiende siempre.
+    """
+    parts = _day_parts(start, end)
+    days = [day for day, _, _ in parts]
+    scheduled = fields.order_by().filter(
+        Exists(OpeningHours.objects.filter(field=OuterRef('pk')))
+        | Exists(ClosureException.objects.filter(field=OuterRef('pk'), date__in=days))
+    ).values_list('pk', flat=True)
+    return {
+        fid for fid, masks in open_masks(scheduled, days).items()
+        if not all(covers(mask, m0, m1) for mask, (_, m0, m1) in zip(masks, parts))
+    }
+
+
+def grid_hours(masks, default=DEFAULT_HOURS):
+    """(hora de apertura, hora de cierre) que abarca todas las máscaras (horas completas)."""
+    spans = [open_span(mask) for mask in masks if mask is not None]
+    spans = [span for span in spans if span]
+    if not spans:
+        return default
+    first = min(m0 for m0, _ in spans)
+    last = max(m1 for _, m1 in spans)
+    return first // 60, -(-last // 60)
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ClosureException, OpeningHours
+from .services import schedule_refresh
+
+
+@receiver(post_save, sender=OpeningHours)
+@receiver(post_delete, sender=OpeningHours)
+@receiver(post_save, sender=ClosureException)
+@receiver(post_delete, sender=ClosureException)
+def hours_changed(sender, instance, **kwargs):
+    """Un cambio de horario rehace los días ya materializados de esa cancha (tras el commit)."""
+    schedule_refresh(instance.field_id)
@@ -1,3 +1,89 @@
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from applications.users.models import User, UserRole
+from applications.field.models import Field
+from applications.field.services import filter_fields
+from applications.booking.exceptions import FieldClosed
+from applications.booking.factories import BookingFactory
+from applications.booking.intervals import availability_index
+from applications.booking.models import Booking
+from .calendar import SLOTS_PER_DAY, from_bytes, window_bits
+from .models import ClosureException, OpeningHours, SlotCalendar
+from .services import is_open, materialize_calendar, open_masks
 
-# Create your tests here.
+
+class SlotCalendarTests(TestCase):
+    def setUp(self):
+        availability_index.clear()
+        self.user = User.objects.create(nombre="Reg", email="r@e.com", password="x", rol=UserRole.REGULAR)
+        self.field = Field.objects.create(owner=self.user, name="C1", type="futbol", address="X", price_hour=50)
+        self.other = Field.objects.create(owner=self.user, name="C2", type="futbol", address="X", price_hour=50)
+        # lunes y martes 08:00-22:00; el martes también de 23:00 a medianoche
+        for weekday in (0, 1):
+            OpeningHours.objects.create(field=self.field, weekday=weekday, opens=time(8), closes=time(22))
+        OpeningHours.objects.create(field=self.field, weekday=1, opens=time(23), closes=time(0))
+        self.monday = date(2030, 5, 6)
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def test_materialize_one_row_per_field_and_day(self):
+        self.assertEqual(materialize_calendar(self.monday, 7), 14)
+        row = SlotCalendar.objects.get(field=self.field, date=self.monday)
+        self.assertEqual(len(bytes(row.bits)), SLOTS_PER_DAY // 8)
+        self.assertEqual(from_bytes(row.bits), window_bits(8 * 60, 22 * 60))
+        self.assertEqual(from_bytes(SlotCalendar.objects.get(field=self.field, date=self.monday + timedelta(days=2)).bits), 0)
+        self.assertIsNone(SlotCalendar.objects.get(field=self.other, date=self.monday).bits)
+
+    def test_is_open(self):
+        materialize_calendar(self.monday, 7)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_open(self.field, self.at(self.monday, 20), self.at(self.monday, 22)))
+        self.assertFalse(is_open(self.field, self.at(self.monday, 21), self.at(self.monday, 22, 30)))
+        self.assertFalse(is_open(self.field, self.at(self.monday, 7, 45), self.at(self.monday, 9)))
+        # martes 23:00 -> miércoles 00:30 cruza a un día cerrado
+        tuesday = self.monday + timedelta(days=1)
+        self.assertTrue(is_open(self.field, self.at(tuesday, 23), self.at(tuesday, 23, 59)))
+        self.assertFalse(is_open(self.field, self.at(tuesday, 23), self.at(tuesday + timedelta(days=1), 0, 30)))
+        # sin horario definido: siempre abierta
+        self.assertTrue(is_open(self.other, self.at(self.monday, 3), self.at(self.monday, 4)))
+
+    def test_unmaterialized_days_fall_back_to_templates(self):
+        masks = open_masks([self.field.id, self.other.id], [self.monday, self.monday + timedelta(days=3)])
+        self.assertEqual(masks[self.field.id], [window_bits(8 * 60, 22 * 60), 0])
+        self.assertEqual(masks[self.other.id], [None, None])
+
+    def test_listing_window_skips_closed_fields(self):
+        materialize_calendar(self.monday, 7)
+        qs = Field.objects.order_by('id')
+        night = {'window': (self.at(self.monday, 22), self.at(self.monday, 23))}
+        self.assertEqual(list(filter_fields(qs, night)), [self.other])
+        evening = {'window': (self.at(self.monday, 20), self.at(self.monday, 21))}
+        self.assertEqual(list(filter_fields(qs, evening)), [self.field, self.other])
+
+    def test_closure_exceptions_and_refresh(self):
+        materialize_calendar(self.monday, 7)
+        with self.captureOnCommitCallbacks(execute=True):
+            ClosureException.objects.create(field=self.field, date=self.monday, reason="Feriado")
+            ClosureException.objects.create(field=self.other, date=self.monday, opens=time(10), closes=time(12))
+        self.assertFalse(is_open(self.field, self.at(self.monday, 10), self.at(self.monday, 11)))
+        self.assertTrue(is_open(self.other, self.at(self.monday, 10), self.at(self.monday, 12)))
+        self.assertFalse(is_open(self.other, self.at(self.monday, 12), self.at(self.monday, 13)))
+
+    def test_factory_rejects_closed_slot_without_touching_bookings(self):
+        day = timezone.localdate() + timedelta(days=7)
+        OpeningHours.objects.create(field=self.other, weekday=day.weekday(), opens=time(9), closes=time(12))
+        with self.assertRaises(FieldClosed):
+            BookingFactory.create(user=self.user, field=self.other, start=self.at(day, 12), end=self.at(day, 13))
+        BookingFactory.create(user=self.user, field=self.other, start=self.at(day, 10), end=self.at(day, 11))
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('materialize_slot_calendar', '--from', '2030-05-06', '--days', '3',
+                     '--field', str(self.field.id), stdout=out)
+        self.assertIn("3 filas", out.getvalue())
+        self.assertEqual(SlotCalendar.objects.filter(field=self.field).count(), 3)
@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+def purge_expired_sessions(batch_size=5000):
+    """
+    Borra de django_session las sesiones vencidas por lotes (transacciones cortas,
+    sin bloquear la tabla). En la caché ya expiran solas. Devuelve cuántas borró.
+    """
+    now = timezone.now()
+    total = 0
+    while True:
+        keys = list(
+            Session.objects.filter(expire_date__lt=now)
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            return total
+        total += Session.objects.filter(session_key__in=keys).delete()[0]
+
+
+class Command(BaseCommand):
+    help = "Borra las sesiones vencidas. Con --interval queda corriendo y repite cada N segundos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Filas por lote (default 5000)')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Segundos entre pasadas; 0 = una sola vez (para cron)')
+
+    def handle(self, *args, **opts):
+        while True:
+            removed = purge_expired_sessions(batch_size=max(1, opts['batch_size']))
+            self.stdout.write(f"{timezone.now():%Y-%m-%d %H:%M:%S} sesiones vencidas borradas: {removed}")
+            if opts['interval'] <= 0:
+                return
+            time.sleep(opts['interval'])
@@ -1,13 +1,15 @@
-from .models import User
+from django.utils.functional import SimpleLazyObject
+
+from .utils import get_session_user
+
 
 class GPAuthMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        uid = request.session.get("user_id")
-        user = User.objects.filter(pk=uid).only("id","nombre","rol").first() if uid else None
-        request.gp_user = user
-        request.gp_role = getattr(user, "rol", None)
-        request.gp_is_auth = bool(user)
+        # perezosos: la consulta (o el hit de caché) ocurre solo si alguien los usa
+        request.gp_user = SimpleLazyObject(lambda: get_session_user(request))
+        request.gp_role = SimpleLazyObject(lambda: getattr(get_session_user(request), "rol", None))
+        request.gp_is_auth = SimpleLazyObject(lambda: get_session_user(request) is not None)
         return self.get_response(request)
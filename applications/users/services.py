@@ -1,11 +1,28 @@
-from applications.booking.models import Booking
+from django.db.models import Prefetch
+from applications.booking.models import Booking, BookingExtra
+from applications.field.pagination import keyset_paginate
 from django.utils import timezone
 
+HISTORY_PAGE_SIZE = 20
+# más recientes primero; id desempata reservas con el mismo inicio
+HISTORY_ORDER = [('start', True), ('id', True)]
+
 def user_bookings(user):
-    """Devuelve todas las reservas del usuario autenticado."""
+    """Reservas del usuario con su cancha, imagen principal y extras (sin consultas por fila)."""
     return (
         Booking.objects
         .filter(user=user)
-        .select_related("field", "field__owner")
-        .order_by("-start")
+        .select_related("field", "field__owner", "field__primary_album")
+        .prefetch_related(Prefetch(
+            "extras",
+            queryset=BookingExtra.objects.select_related("field_equipment__equipment"),
+        ))
+        .order_by("-start", "-id")
     )
+
+def user_bookings_page(user, cursor=None, per_page=HISTORY_PAGE_SIZE):
+    """
+    Una página del historial por cursor (índice user, -start, -id): cuesta lo
+    mismo la primera que la página 30. Devuelve un KeysetPage.
+    """
+    return keyset_paginate(user_bookings(user), HISTORY_ORDER, cursor=cursor, per_page=per_page, tag="hist")
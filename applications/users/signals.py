@@ -0,0 +1,13 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import User
+from .utils import user_cache_key
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Un cambio de rol/estado/datos debe verse en el siguiente request, no al vencer el TTL."""
+    cache.delete(user_cache_key(instance.pk))
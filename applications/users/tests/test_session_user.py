@@ -0,0 +1,67 @@
+import io
+from datetime import timedelta
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from applications.users.models import User, UserRole
+
+
+class SessionUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.partner = User.objects.create(nombre="Socio", email="p@e.com", password="x", rol=UserRole.PARTNER)
+        session = self.client.session
+        session["user_id"] = self.partner.id
+        session.save()
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return sum(1 for q in ctx.captured_queries if 'FROM "users_user"' in q["sql"])
+
+    def test_one_lookup_shared_by_middleware_decorator_and_templates(self):
+        self.assertEqual(self.user_queries(reverse("partners:day")), 1)
+
+    def test_anonymous_pages_do_not_touch_users(self):
+        self.client.session.flush()
+        self.client.cookies.clear()
+        self.assertEqual(self.user_queries(reverse("field:list")), 0)
+
+    @override_settings(GP_USER_CACHE_TTL=30)
+    def test_cached_between_requests_and_invalidated_on_save(self):
+        url = reverse("partners:day")
+        self.assertEqual(self.user_queries(url), 1)
+        self.assertEqual(self.user_queries(url), 0)
+
+        self.partner.rol = UserRole.REGULAR
+        self.partner.save()
+        resp = self.client.get(url)
+        self.assertRedirects(resp, reverse("field:list"), fetch_redirect_response=False)
+
+
+class CachedSessionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(nombre="Reg", email="r@e.com", password="x", rol=UserRole.REGULAR)
+
+    def test_session_read_from_cache(self):
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("field:list"))
+        self.assertFalse([q for q in ctx.captured_queries if "django_session" in q["sql"]])
+
+    def test_purge_removes_only_expired(self):
+        now = timezone.now()
+        Session.objects.create(session_key="old1", session_data="", expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key="old2", session_data="", expire_date=now - timedelta(days=2))
+        Session.objects.create(session_key="live", session_data="", expire_date=now + timedelta(days=1))
+        call_command("purge_sessions", "--batch-size", "1", stdout=io.StringIO())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live"])
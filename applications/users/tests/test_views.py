@@ -1,7 +1,11 @@
 # applications/users/tests/test_views.py
+from datetime import timedelta
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from applications.users.models import User, Regular, UserRole
+from applications.booking.models import Booking, BookingExtra
+from applications.field.models import Equipment, Field, FieldEquipment
 
 class CreateRegularViewTests(TestCase):
     def test_get_renders_form(self):
@@ -33,3 +37,36 @@ class CreateRegularViewTests(TestCase):
         resp = self.client.post(url, data={"nombre": "", "email": "", "password": ""})
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, "error", status_code=200)
+
+
+class HistoryViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(nombre="Reg", email="r@e.com", password="x", rol=UserRole.REGULAR)
+        field = Field.objects.create(owner=self.user, name="C1", type="futbol", address="X", price_hour=50)
+        fe = FieldEquipment.objects.create(field=field, equipment=Equipment.objects.create(type="chalecos"), stock=9)
+        base = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.bookings = []
+        for i in range(25):
+            # dos reservas por hora para ejercitar el desempate por id
+            b = Booking.objects.create(user=self.user, field=field, start=base + timedelta(hours=i // 2),
+                                       end=base + timedelta(hours=i // 2, minutes=30))
+            BookingExtra.objects.create(booking=b, field_equipment=fe, quantity=1, unit_price=2)
+            self.bookings.append(b)
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+
+    def test_keyset_pages_newest_first_with_constant_queries(self):
+        expected = [b.id for b in sorted(self.bookings, key=lambda b: (b.start, b.id), reverse=True)]
+        url = reverse("users:history")
+
+        with self.assertNumQueries(3):  # usuario, reservas (+cancha/imagen), extras
+            first = self.client.get(url)
+        page = first.context["page"]
+        self.assertEqual([b.id for b in page.object_list], expected[:20])
+        self.assertContains(first, "Chalecos de Entrenamiento ×1")
+
+        with self.assertNumQueries(3):
+            second = self.client.get(url, {"cursor": page.next_cursor})
+        self.assertEqual([b.id for b in second.context["page"].object_list], expected[20:])
+        self.assertFalse(second.context["page"].has_next)
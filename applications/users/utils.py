@@ -1,11 +1,48 @@
 from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import redirect
 from django.urls import reverse
 
+from .models import User
+
+_MISSING = object()
+
+
+def user_cache_key(uid):
+    return f"gp:user:{uid}"
+
+
+def _load_user(uid):
+    """Una consulta como máximo; con GP_USER_CACHE_TTL > 0 ni eso mientras esté en caché."""
+    ttl = getattr(settings, "GP_USER_CACHE_TTL", 0)
+    if ttl:
+        user = cache.get(user_cache_key(uid), _MISSING)
+        if user is not _MISSING:
+            return user
+    user = User.objects.filter(pk=uid).first()
+    if ttl:
+        # también se cachea el "no existe" para sesiones que apuntan a usuarios borrados
+        cache.set(user_cache_key(uid), user, ttl)
+    return user
+
+
+def get_session_user(request):
+    """
+    Usuario de la sesión (o None), resuelto una sola vez por request: el
+    middleware, el context processor, los decoradores y las vistas comparten
+    el mismo objeto.
+    """
+    if not hasattr(request, "_gp_user_cache"):
+        uid = request.session.get("user_id")
+        request._gp_user_cache = _load_user(uid) if uid else None
+    return request._gp_user_cache
+
+
 def login_required_session(view_func):
     @wraps(view_func)
     def _wrapped(request, *args, **kwargs):
         if not request.session.get("user_id"):
             return redirect(f"{reverse('users:login')}?next={request.get_full_path()}")
         return view_func(request, *args, **kwargs)
-    return _wrapped
\ No newline at end of file
+    return _wrapped
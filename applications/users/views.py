@@ -4,9 +4,9 @@ from django.contrib import messages
 from django.core.exceptions import ValidationError
 from .forms import RegularCreateForm
 from .factories import UserFactory, RegularUserInput
-from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from .services import user_bookings
+from .services import user_bookings_page
+from .utils import login_required_session
 
 def crear_usuario_regular_view(request):
     if request.method == "POST":
@@ -85,16 +85,17 @@ def logout_view(request):
     messages.info(request, "Sesión cerrada correctamente")
     return redirect('users:login')
 
-@login_required
+@login_required_session
 def history_view(request):
     user = getattr(request, "gp_user", None)
     if not user:
         return redirect("users:login")
 
-    bookings = user_bookings(user)
+    page = user_bookings_page(user, cursor=request.GET.get("cursor"))
 
     ctx = {
-        "bookings": bookings,
+        "bookings": page.object_list,
+        "page": page,
         "today": timezone.now(),
     }
     return render(request, "users/history.html", ctx)
\ No newline at end of file